@@ -0,0 +1,476 @@
+"""Thin client for a work log server, see server.py.
+
+RemoteRepo stands in for a DataRepo and RemoteTaskController for a
+TaskController, so the CLI views work unchanged against a shared server.
+"""
+
+import http.client
+import json
+from collections.abc import Sequence
+from urllib.parse import urlsplit
+from marshmallow.exceptions import ValidationError
+import views
+from controllers import TaskController
+from models import FastTaskLoader, Task, TaskSchema
+from queries import QueryResult
+from repositories import ConflictError
+from server import record_tag
+
+
+class RemoteRepo:
+    """Repository interface to a work log server.
+
+    Requests go over one kept-alive connection, reopened if it drops. There
+    is no pool, requests from one RemoteRepo are sent one at a time, so use
+    a RemoteRepo per thread to have several in flight.
+
+    Args:
+        url (str): Server address, e.g. http://127.0.0.1:8000.
+        timeout (float): Seconds to wait for the server to answer.
+
+    Attributes:
+        records (list): Always empty, tasks stay on the server.
+        fast_loader (:obj:`FastTaskLoader`): Builds Tasks from the server's replies.
+
+    Notes:
+        The record_tag of each task read is kept and sent with edits and
+        deletes, so the server refuses them if the task changed since.
+
+    Raises:
+        ValueError: If url isn't an http address.
+    """
+
+    def __init__(self, url, timeout=60):
+        parts = urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError("Server address must be http://host:port, not " + url)
+        self.connection = http.client.HTTPConnection(
+            parts.hostname, parts.port or 80, timeout=timeout
+        )
+        self.data_schema = TaskSchema()
+        self.fast_loader = FastTaskLoader()
+        self.records = []
+        self._tags = {}
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request and read the reply.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Server route.
+            body: JSON serialisable request body, if any.
+            headers (dict): Extra request headers.
+
+        Returns:
+            (int, dict): HTTP status and deserialised reply.
+
+        Raises:
+            OSError: If the server can't be reached.
+        """
+        headers = dict(headers or {})
+        content = None
+        if body is not None:
+            content = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            self.connection.request(method, path, content, headers)
+            response = self.connection.getresponse()
+            return response.status, json.loads(response.read())
+        except OSError:
+            self.connection.close()
+            raise
+
+    def status(self):
+        """Check the server is up.
+
+        Returns:
+            (dict): Server status, {"tasks": number of tasks held}.
+        """
+        return self.request("GET", "/status")[1]
+
+    def _task(self, reply):
+        """Build the Task in a reply.
+
+        Args:
+            reply (dict): Server reply holding a task.
+
+        Returns:
+            (:obj:`Task`): Deserialised task.
+        """
+        return self._load(reply["task"])
+
+    def _load(self, record):
+        """Build a Task from a record the server sent, noting its tag.
+
+        Args:
+            record (dict): Task record.
+
+        Returns:
+            (:obj:`Task`): Deserialised task.
+        """
+        task = self.fast_loader.load(record)
+        self._tags[task.id] = record_tag(record)
+        return task
+
+    def _if_match(self, task):
+        """Headers making a change conditional on the task being as last read.
+
+        Args:
+            task (:obj:`Task`): Task to change.
+
+        Returns:
+            (dict): If-Match header, empty if the task wasn't read from the server.
+        """
+        tag = self._tags.get(task.id)
+        return {"If-Match": '"{}"'.format(tag)} if tag else {}
+
+    def _refresh(self, task):
+        """Update a local Task to the server's current version of it.
+
+        Args:
+            task (:obj:`Task`): Task to update.
+        """
+        try:
+            current = self.get_record(task.id)
+        except KeyError:
+            return
+        for field in Task.fields:
+            setattr(task, field, getattr(current, field))
+
+    def _check_reply(self, status, reply, expected):
+        """Raise the errors in a reply to a change the server didn't make.
+
+        Args:
+            status (int): HTTP status of the reply.
+            reply (dict): Server reply.
+            expected (int): Status of a successful reply.
+
+        Raises:
+            ConflictError: If the status is 409.
+            ValidationError: For any other unexpected status.
+        """
+        if status == 409:
+            raise ConflictError(reply["errors"])
+        if status != expected:
+            raise ValidationError(reply["errors"])
+
+    def get_records(self):
+        """Tasks are read from the server a page at a time as queries run.
+
+        Returns:
+            (list): Empty list.
+        """
+        return self.records
+
+    def wait_until_loaded(self):
+        """Nothing to wait for, the server loads its tasks before serving.
+        """
+
+    def get_record(self, task_id):
+        """Find a Task by id.
+
+        Args:
+            task_id (int): Task id.
+
+        Returns:
+            (:obj:`Task`): Task with the id.
+
+        Raises:
+            KeyError: If no Task has the id.
+        """
+        status, reply = self.request("GET", "/tasks/{}".format(task_id))
+        if status == 404:
+            raise KeyError(task_id)
+        return self._task(reply)
+
+    def validate_fields(self, fields):
+        """Check an incomplete list of field values for edits before sending them.
+
+        Args:
+            fields (dict): Field and data to validate.
+
+        Returns:
+            (dict): fields unchanged, the server deserialises them itself.
+
+        Raises:
+            ValidationError: If a field is invalid or is the Task id.
+        """
+        if "id" in fields:
+            raise ValidationError({"id": ["Task ids can't be changed."]})
+        self.data_schema.load(fields, partial=True)
+        return fields
+
+    def add_record(self, data):
+        """Add a task on the server.
+
+        Args:
+            data (dict): {field: content} task data.
+
+        Returns:
+            :obj:`Task`: New Task, with the id the server gave it.
+
+        Raises:
+            ValidationError: If the server rejected the task.
+        """
+        status, reply = self.request("POST", "/tasks", data)
+        self._check_reply(status, reply, 201)
+        return self._task(reply)
+
+    def update_record(self, task, fields):
+        """Change a task on the server, then update the local Task to match.
+
+        Args:
+            task (:obj:`Task`): Task to modify.
+            fields (dict): {field: content} changes from validate_fields.
+
+        Raises:
+            ConflictError: If the task changed on the server since it was read,
+                the local Task is updated to match.
+            ValidationError: If the server rejected the change, or another
+                client has deleted the task.
+        """
+        status, reply = self.request(
+            "PATCH", "/tasks/{}".format(task.id), fields, self._if_match(task)
+        )
+        try:
+            self._check_reply(status, reply, 200)
+        except ConflictError:
+            self._refresh(task)
+            raise
+        updated = self._task(reply)
+        for field in fields:
+            setattr(task, field, getattr(updated, field))
+
+    def delete_record(self, task):
+        """Remove a task on the server.
+
+        Args:
+            task (:obj:`Task`): Task to remove.
+
+        Raises:
+            ConflictError: If the task changed on the server since it was read,
+                the local Task is updated to match.
+            ValidationError: If the server refused, or another client has
+                deleted the task.
+        """
+        status, reply = self.request(
+            "DELETE", "/tasks/{}".format(task.id), headers=self._if_match(task)
+        )
+        try:
+            self._check_reply(status, reply, 200)
+        except ConflictError:
+            self._refresh(task)
+            raise
+        self._tags.pop(task.id, None)
+
+    def search(self, condition, offset, limit, count=False):
+        """Read one page of a query's results.
+
+        Args:
+            condition (:obj:`queries.Condition`): Query to run.
+            offset (int): Position of the first Task wanted.
+            limit (int): Most Tasks wanted.
+            count (bool): Count every match so the reply has the exact length.
+
+        Returns:
+            (:obj:`list` of :obj:`Task`, int, int): Tasks in date order, number
+            of matches or None if not counted yet, and most the query could match.
+
+        Raises:
+            ValueError: If the server rejected the query.
+        """
+        status, reply = self.request(
+            "POST",
+            "/search",
+            {
+                "query": condition.dump(),
+                "offset": offset,
+                "limit": limit,
+                "count": count,
+            },
+        )
+        if status != 200:
+            raise ValueError(reply["errors"])
+        tasks = [self._load(record) for record in reply["tasks"]]
+        return tasks, reply["length"], reply["estimate"]
+
+    def explain(self, condition):
+        """Describe how the server would run a query.
+
+        Args:
+            condition (:obj:`queries.Condition`): Query to plan.
+
+        Returns:
+            (:obj:`list` of str): One line per condition, see Plan.explain.
+        """
+        status, reply = self.request("POST", "/explain", {"query": condition.dump()})
+        if status != 200:
+            raise ValueError(reply["errors"])
+        return reply["plan"]
+
+    def check_for_changes(self):
+        """Nothing to merge here, the server merges changes to its task file.
+
+        Returns:
+            None: Always.
+        """
+        return None
+
+    def flush(self):
+        """Nothing to do, the server writes changes.
+        """
+
+
+class RemoteResult(Sequence):
+    """Tasks matching a query on a server, fetched a page at a time as they're read.
+
+    Has the interface of :obj:`queries.QueryResult`.
+
+    Args:
+        repo (:obj:`RemoteRepo`): Server to query.
+        condition (:obj:`queries.Condition`): Query to run.
+
+    Attributes:
+        estimate (int): Most Tasks the query could match.
+
+    Notes:
+        Each page is read from the server's current result, so changes other
+        clients make between pages can shift later pages.
+    """
+
+    page_size = QueryResult.page_size
+
+    def __init__(self, repo, condition):
+        self.repo = repo
+        self.condition = condition
+        self._pages = {}
+        self._length = None
+        self._fetch(0)
+
+    def _fetch(self, page, count=False):
+        """Read a page of Tasks from the server.
+
+        Args:
+            page (int): Page number.
+            count (bool): Also count every match.
+        """
+        tasks, length, self.estimate = self.repo.search(
+            self.condition, page * self.page_size, self.page_size, count
+        )
+        self._pages[page] = tasks
+        if length is not None:
+            self._length = length
+        elif len(tasks) < self.page_size:
+            self._length = page * self.page_size + len(tasks)
+
+    def known_length(self):
+        """Number of matching Tasks if known without asking the server.
+
+        Returns:
+            (int): Exact count.
+            None: If the server hasn't counted them yet.
+        """
+        return self._length
+
+    def __len__(self):
+        if self._length is None:
+            self._fetch(0, count=True)
+        return self._length
+
+    def __bool__(self):
+        return bool(self._pages[0])
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[index] for index in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if position < 0:
+            raise IndexError(position)
+        page, offset = divmod(position, self.page_size)
+        if page not in self._pages:
+            self._fetch(page)
+        tasks = self._pages[page]
+        if offset >= len(tasks):
+            raise IndexError(position)
+        return tasks[offset]
+
+
+class RemotePlan:
+    """Plan the server chose for a query.
+
+    Args:
+        lines (:obj:`list` of str): Plan description from the server.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def explain(self):
+        """Describe the plan, see queries.Plan.explain.
+
+        Returns:
+            (:obj:`list` of str): One line per condition.
+        """
+        return self.lines
+
+
+class RemoteTaskController(TaskController):
+    """TaskController whose queries run on a work log server.
+
+    Args:
+        data_repo (:obj:`RemoteRepo`): Server connection.
+    """
+
+    def show_screen(self, screen):
+        """Run one screen method, going back to the main menu if the server is lost.
+
+        Args:
+            screen (:obj:`method`): Screen to show.
+
+        Returns:
+            (:obj:`method`): Next screen, None to stop.
+        """
+        try:
+            return screen()
+        except OSError as err:
+            message = "Lost connection to the work log server: {}".format(err)
+            views.write_screen(views.format_error(message))
+            return self.main_menu
+
+    def run_query(self, condition):
+        """Run a query on the server.
+
+        Args:
+            condition (:obj:`queries.Condition`): Query to run.
+
+        Returns:
+            result (:obj:`RemoteResult`): Task objects matching search criteria in date order.
+            None: If negative search result.
+        """
+        result = RemoteResult(self.data_repo, condition)
+        if result:
+            return result
+        return None
+
+    def plan_query(self, condition):
+        """Ask the server how it would run a query.
+
+        Args:
+            condition (:obj:`queries.Condition`): Query to plan.
+
+        Returns:
+            (:obj:`RemotePlan`): Server's plan, see RemotePlan.explain.
+        """
+        return RemotePlan(self.data_repo.explain(condition))
+
+    def stream_search(self, condition):
+        """Read Tasks matching a query from the server a page at a time.
+
+        Args:
+            condition (:obj:`queries.Condition`): Query to run.
+
+        Returns:
+            (:obj:`iterator` of :obj:`Task`): Matching Tasks in date order.
+        """
+        return iter(self.run_query(condition) or ())
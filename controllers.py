@@ -1,7 +1,9 @@
 import re
 from marshmallow.exceptions import ValidationError
 import pendulum
+import queries
 import views
+from repositories import ConflictError
 
 
 class TaskController:
@@ -12,6 +14,10 @@ class TaskController:
 
     Attributes:
         tasks (:obj:`list` of :obj:`Task`): Current set of Task objects.
+
+    Raises:
+        JSONDecodeError: If the task file is not valid JSON, for the caller to
+            report along with the file name.
     """
 
     def __init__(self, data_repo):
@@ -19,8 +25,30 @@ class TaskController:
         try:
             self.tasks = self.data_repo.get_records()
         except ValidationError as err:
-            print("Problem with source data: {}".format(err))
-            exit(1)
+            self.load_failed(err)
+
+    def load_failed(self, err):
+        """Report invalid source data and exit.
+
+        Args:
+            err (:obj:`ValidationError`): Error raised while loading.
+        """
+        print("Problem with source data: {}".format(err))
+        exit(1)
+
+    def wait_for_records(self):
+        """Block until the repository has finished loading tasks.
+
+        Streaming stores load in the background while the main menu is shown,
+        so load errors surface here instead of at startup.
+
+        Raises:
+            JSONDecodeError: If the task file is not valid JSON.
+        """
+        try:
+            self.data_repo.wait_until_loaded()
+        except ValidationError as err:
+            self.load_failed(err)
 
     def render_view(self, view, confirmation=False, error=None):
         """Call current view's print to screen method, passing in any confirmation or error messages.
@@ -41,7 +69,69 @@ class TaskController:
         return view.present_view()
 
     def start(self):
+        """Run the app, moving between screens until the user quits.
+
+        Each screen method shows its view, acts on the user's choice and
+        returns the next screen method, or None to stop. Navigation happens
+        in this loop, so the call stack stays the same depth however long
+        the session runs. Changes another program made to the task file are
+        merged before each screen.
+        """
+        screen = self.main_menu
+        while screen is not None:
+            self.merge_changes()
+            screen = self.show_screen(screen)
+
+    def show_screen(self, screen):
+        """Run one screen method.
+
+        Args:
+            screen (:obj:`method`): Screen to show.
+
+        Returns:
+            (:obj:`method`): Next screen, None to stop.
+        """
+        return screen()
+
+    def merge_changes(self):
+        """Merge changes another program made to the task file and say what changed.
+        """
+        try:
+            merge = self.data_repo.check_for_changes()
+        except ConflictError as err:
+            merge = err.merge
+            self.report_conflict(err)
+        except ValidationError as err:
+            views.write_screen(views.format_validation_error(err))
+            return
+        if merge:
+            views.write_screen(
+                views.format_error(
+                    "Another program added {}, changed {} and deleted {} tasks".format(
+                        len(merge.added), len(merge.changed), len(merge.deleted)
+                    )
+                )
+            )
+
+    def report_conflict(self, err):
+        """Show which unsaved changes were dropped for another program's.
+
+        Args:
+            err (:obj:`ConflictError`): Conflicting tasks by id.
+        """
+        views.write_screen(
+            views.format_error(
+                "Kept another program's version of tasks {}".format(
+                    ", ".join(str(task_id) for task_id in sorted(err.messages))
+                )
+            )
+        )
+
+    def main_menu(self):
         """Present app root view and bind options to methods.
+
+        Returns:
+            (:obj:`method`): Next screen chosen by the user.
         """
         index_choices = {
             "a": self.add_new_task,
@@ -50,67 +140,64 @@ class TaskController:
         }
         index_view = views.MainView(index_choices)
         user_choice = self.render_view(index_view)
-        index_choices[user_choice]()
+        return index_choices[user_choice]
 
     def add_new_task(self):
         """Create a new task from user input.
 
         Returns:
-            start (:obj:`method`): Redirect to main root view.
+            main_menu (:obj:`method`): Redirect to main root view.
         """
+        self.wait_for_records()
         new_task_view = views.NewTaskView()
-        new_task_success = False
-        view_options = None
-        while not new_task_success:
-            if view_options:
-                task = self.render_view(new_task_view, **view_options)
-            else:
-                task = self.render_view(new_task_view)
+        view_options = {}
+        while True:
+            task = self.render_view(new_task_view, **view_options)
             try:
-                self.tasks.append(self.data_repo.add_record(task))
-                new_task_success = True
+                self.data_repo.add_record(task)
             except ValidationError as err:
-                view_options = {"confirmation": False, "error": err}
+                view_options = {"error": err}
                 continue
-            else:
-                view_options = {"confirmation": True, "error": None}
-                self.render_view(new_task_view, **view_options)
-                return self.start()
+            self.render_view(new_task_view, confirmation=True)
+            return self.main_menu
 
     def search_existing(self):
         """Present list of search methods and handle choice.
 
         Collects search results and presents calls to handle_search_results.
+
+        Returns:
+            (:obj:`method`): search_existing to search again, or main_menu.
         """
+        self.wait_for_records()
         search_methods = {
             "a": self.date_search,
             "b": self.date_range_search,
             "c": self.time_search,
             "d": self.text_search,
             "e": self.regex_search,
-            "f": self.start,
+            "f": self.date_time_search,
+            "g": self.main_menu,
         }
         search_view = views.SearchView(search_methods)
         user_choice = self.render_view(search_view)
-        if user_choice == "f":
-            return search_methods[user_choice]()
-        else:
+        while user_choice != "g":
             search_result = search_methods[user_choice](search_view)
-        while not search_result:
+            if search_result:
+                break
             user_choice = self.render_view(search_view, error="No results found")
-            if user_choice == "f":
-                return search_methods[user_choice]()
-            search_result = search_methods[user_choice](search_view)
+        else:
+            return self.main_menu
         editing = True
         while editing:
             editing = self.handle_search_results(search_result)
-        self.search_existing()
+        return self.search_existing
 
     def handle_search_results(self, search_result):
         """Present search results to user, process edit/delete requests.
 
         Args:
-            search_result (:obj:`list` of :obj:`Task`): Tasks matching search parameters.
+            search_result (:obj:`queries.QueryResult`): Tasks matching search parameters.
 
         Returns:
             (bool): True/False switch to stay in edit mode or return to search results.
@@ -136,17 +223,48 @@ class TaskController:
                 edit_confirmed = True
         return edit_confirmed
 
-    def sort_result(self, results, field):
-        """Sort search results by given Task attribute
+    def run_query(self, condition):
+        """Plan and run a query against the repository's indexes.
+
+        Args:
+            condition (:obj:`queries.Condition`): Query to run.
+
+        Returns:
+            result (:obj:`queries.QueryResult`): Task objects matching search criteria in date order.
+            None: If negative search result.
+
+        Notes:
+            Results are cached until a matching task is added, edited or deleted.
+        """
+        result = queries.run_query(self.data_repo, condition)
+        if result:
+            return result
+        return None
+
+    def plan_query(self, condition):
+        """Plan a query without running it.
+
+        Args:
+            condition (:obj:`queries.Condition`): Query to plan.
+
+        Returns:
+            (:obj:`queries.Plan`): Chosen plan, see Plan.explain.
+        """
+        return queries.plan_query(self.data_repo, condition)
+
+    def stream_search(self, condition):
+        """Find Tasks matching a query without building a result list where possible.
 
         Args:
-            results (:obj:`list` of :obj:`Task`): Tasks matching given search criteria
-            field (str): Name of Task attribute to sort by.
+            condition (:obj:`queries.Condition`): Query to run.
 
         Returns:
-            (:obj:`list` of :obj:`Task:): List of Task objects sorted by attribute.
+            (:obj:`iterator` of :obj:`Task`): Matching Tasks in date order. Plans
+            driven by the date index, or scanning in date order, find each
+            Task as the iterator reaches it.
         """
-        return sorted(results, key=lambda x: getattr(x, field))
+        self.wait_for_records()
+        return queries.run_plan(self.data_repo, self.plan_query(condition))
 
     def date_search(self, view):
         """Present view for date search parameter input.
@@ -155,20 +273,74 @@ class TaskController:
             view (:obj:`View`): View instance
 
         Returns:
-            result (:obj:`list` of :obj:`Task`): Task objects matching search criteria
+            result (:obj:`queries.QueryResult`): Task objects matching search criteria
             None: If negative search result.
 
         """
         date = view.exact_date()
+        date_range = self.parse_date_range(date, date)
+        if not date_range:
+            return None
+        return self.run_query(queries.DateRange(*date_range))
+
+    def parse_date_range(self, start_date, end_date):
+        """Parse user inputted date range bounds.
+
+        Args:
+            start_date (str): Start date in DD/MM/YYYY format.
+            end_date (str): End date in DD/MM/YYYY format.
+
+        Returns:
+            (:obj:`pendulum.DateTime`, :obj:`pendulum.DateTime`): Parsed start and end dates.
+            None: If either date is invalid or the range is nonsensical.
+        """
         try:
-            date_stamp = pendulum.from_format(date, "DD/MM/YYYY").naive().timestamp()
+            start = pendulum.from_format(start_date, "DD/MM/YYYY")
+            end = pendulum.from_format(end_date, "DD/MM/YYYY")
+            if start > end:
+                raise ValueError("Start date must be earlier than end date!")
         except ValueError as err:
             print("\n{}".format(err))
             return None
-        result = [task for task in self.tasks if task.date.timestamp() == date_stamp]
-        if result:
-            return self.sort_result(result, 'date')
-        return None
+        return start, end
+
+    def parse_time_range(self, min_time, max_time):
+        """Parse user inputted time spent bounds.
+
+        Args:
+            min_time (str): Least time spent in minutes.
+            max_time (str): Most time spent in minutes, or None for no upper bound.
+
+        Returns:
+            (int, int): Parsed bounds, max is None for no upper bound.
+            None: If either bound is invalid or the range is nonsensical.
+        """
+        try:
+            min_minutes = int(min_time)
+            max_minutes = None if max_time is None else int(max_time)
+        except ValueError:
+            print("Please enter correct time value in whole minutes.")
+            return None
+        if max_minutes is not None and min_minutes > max_minutes:
+            print("\nMinimum time must be less than maximum time!")
+            return None
+        return min_minutes, max_minutes
+
+    def parse_pattern(self, regex_pattern):
+        """Compile a user inputted regex pattern, ignoring case.
+
+        Args:
+            regex_pattern (str): Regular expression.
+
+        Returns:
+            (:obj:`re.Pattern`): Compiled pattern.
+            None: If the pattern is invalid.
+        """
+        try:
+            return re.compile(regex_pattern, re.IGNORECASE)
+        except re.error:
+            print("Invalid regex pattern entered, please check and try again.")
+            return None
 
     def date_range_search(self, view):
         """Present view for date range search parameters.
@@ -177,31 +349,13 @@ class TaskController:
             view (:obj:`View`): View instance
 
         Returns:
-            result (:obj:`list` of :obj:`Task`): Task objects matching search criteria
+            result (:obj:`queries.QueryResult`): Task objects matching search criteria
             None: If negative search result.
-
-        Raises:
-            ValueError: Raised if nonsensical date range is passed.
         """
-        start_date, end_date = view.date_range()
-        try:
-            start_date_stamp = pendulum.from_format(
-                start_date, "DD/MM/YYYY"
-            ).timestamp()
-            end_date_stamp = pendulum.from_format(end_date, "DD/MM/YYYY").timestamp()
-            if start_date_stamp > end_date_stamp:
-                raise ValueError("Start date must be earlier than end date!")
-        except ValueError as err:
-            print("\n{}".format(err))
+        date_range = self.parse_date_range(*view.date_range())
+        if not date_range:
             return None
-        result = [
-            task
-            for task in self.tasks
-            if start_date_stamp <= task.date.timestamp() <= end_date_stamp
-        ]
-        if result:
-            return self.sort_result(result, 'date')
-        return None
+        return self.run_query(queries.DateRange(*date_range))
 
     def time_search(self, view):
         """Present view for time spent search.
@@ -210,18 +364,33 @@ class TaskController:
             view (:obj:`View): View instance
 
         Returns:
-            result (:obj:`list` of :obj:`Task`): Task objects matching search criteria
+            result (:obj:`queries.QueryResult`): Task objects matching search criteria
             None: If negative search result.
         """
-        time_value = view.time_spent_lookup()
-        try:
-            result = [task for task in self.tasks if task.time_spent == int(time_value)]
-        except ValueError:
-            print("Please enter correct time value in whole minutes.")
+        time_range = self.parse_time_range(*view.time_spent_lookup())
+        if not time_range:
             return None
-        if result:
-            return self.sort_result(result, 'date')
-        return None
+        return self.run_query(queries.TimeSpent(*time_range))
+
+    def date_time_search(self, view):
+        """Present views for a combined date range and time spent search.
+
+        Args:
+            view (:obj:`View`): View instance
+
+        Returns:
+            result (:obj:`queries.QueryResult`): Task objects matching search criteria
+            None: If negative search result.
+        """
+        date_range = self.parse_date_range(*view.date_range())
+        if not date_range:
+            return None
+        time_range = self.parse_time_range(*view.time_spent_lookup())
+        if not time_range:
+            return None
+        return self.run_query(
+            queries.And(queries.DateRange(*date_range), queries.TimeSpent(*time_range))
+        )
 
     def text_search(self, view):
         """Present view for text search string input.
@@ -230,20 +399,11 @@ class TaskController:
             view (:obj:`View`): View instance
 
         Returns:
-            result (:obj:`list` of :obj:`Task`): Task objects matching search criteria
+            result (:obj:`queries.QueryResult`): Task objects matching search criteria
             None: If negative search result.
         """
         match_text = view.exact_match()
-        result = [
-            task
-            for task in self.tasks
-            if any(
-                match_text.lower() in str(val).lower() for val in vars(task).values()
-            )
-        ]
-        if result:
-            return self.sort_result(result, 'date')
-        return None
+        return self.run_query(queries.TextContains(match_text))
 
     def regex_search(self, view):
         """Present view for regex string input.
@@ -252,28 +412,13 @@ class TaskController:
             view (:obj:`View`): View instance
 
         Returns:
-            result (:obj:`list` of :obj:`Task`): Task objects matching search criteria
+            result (:obj:`queries.QueryResult`): Task objects matching search criteria
             None: If negative search result.
         """
-        regex_pattern = view.regex_pattern()
-        try:
-            pattern_match = re.compile(regex_pattern, re.IGNORECASE)
-        except re.error:
-            print("Invalid regex pattern entered, please check and try again.")
+        pattern_match = self.parse_pattern(view.regex_pattern())
+        if not pattern_match:
             return None
-        else:
-            result = [
-                task
-                for task in self.tasks
-                if any(
-                    pattern_match.findall(val)
-                    for val in vars(task).values()
-                    if isinstance(val, str)
-                )
-            ]
-        if result:
-            return self.sort_result(result, 'date')
-        return None
+        return self.run_query(queries.RegexMatch(pattern_match))
 
     def edit_task(self, task, error=None):
         """Calls EditView and affects changes requested by user.
@@ -295,12 +440,11 @@ class TaskController:
                 valid_data = self.data_repo.validate_fields(
                     {task_changes["field"]: task_changes["content"]}
                 )
+                self.data_repo.update_record(task, valid_data)
             except ValidationError as err:
                 error = err
                 task_changes = self.render_view(edit_view, error=error)
                 continue
-            setattr(task, task_changes["field"], valid_data[task_changes["field"]])
-            self.data_repo.save_changes(self.tasks)
             print("Task {} edited.".format(task_changes["field"]))
             task_changes = self.render_view(edit_view, error=error)
         return "back"
@@ -313,14 +457,31 @@ class TaskController:
 
         Returns:
               False when record no longer exists.
+              "back" (str): If another program changed the task first, it's kept.
         """
-        for idx, cur_task in enumerate(self.tasks):
-            if cur_task is task:
-                del self.tasks[idx]
-                self.data_repo.save_changes(self.tasks)
+        try:
+            self.data_repo.delete_record(task)
+        except ValidationError as err:
+            views.write_screen(views.format_validation_error(err))
+            return "back"
         print("\nDeleted.\n")
         return False
 
     def quit(self):
-        """Exit app"""
-        exit()
+        """Write out any batched changes and exit app.
+
+        Returns:
+            None: Ends the start loop.
+            main_menu (:obj:`method`): If the task file changed and can't be
+                read, so batched changes can't be written yet.
+        """
+        while True:
+            try:
+                self.data_repo.flush()
+            except ConflictError as err:
+                self.report_conflict(err)
+                continue
+            except ValidationError as err:
+                views.write_screen(views.format_validation_error(err))
+                return self.main_menu
+            break
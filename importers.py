@@ -0,0 +1,43 @@
+import csv
+import json
+from marshmallow.exceptions import ValidationError
+
+
+def read_csv(path):
+    """Stream task rows from a CSV file with a header row.
+
+    Args:
+        path (str): Path to CSV file with date, title, time_spent and notes columns.
+
+    Yields:
+        (int, dict): Line number and row, empty cells omitted.
+    """
+    with open(path, "r", newline="") as csv_file:
+        reader = csv.DictReader(csv_file)
+        for row in reader:
+            yield reader.line_num, {
+                field: value for field, value in row.items() if value not in ("", None)
+            }
+
+
+def read_jsonl(path):
+    """Stream task records from a JSON Lines file.
+
+    Args:
+        path (str): Path to JSON Lines file, one task object per line.
+
+    Yields:
+        (int, dict): Line number and record. Lines that aren't valid JSON yield
+        the ValidationError describing why in place of a record.
+    """
+    with open(path, "r") as lines:
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as err:
+                yield line_number, ValidationError({"_schema": [str(err)]})
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
@@ -0,0 +1,672 @@
+import re
+from array import array
+from itertools import chain
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Sequence
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class DateIndex:
+    """Index of Tasks by date timestamp.
+
+    Args:
+        tasks (:obj:`list` of :obj:`Task`): Tasks to index.
+
+    Notes:
+        Tasks are bucketed by timestamp in the order they were added, and a
+        sorted list of the distinct timestamps backs bisect based lookups,
+        so results come back already in date order. Adding or removing a
+        Task only touches its own bucket, and the timestamp list when a date
+        gains its first Task or loses its last.
+    """
+
+    fields = frozenset(["date"])
+
+    def __init__(self, tasks=()):
+        self._buckets = {}
+        for task in tasks:
+            self._buckets.setdefault(task.date.timestamp(), {})[task] = None
+        self._stamps = sorted(self._buckets)
+        self._size = sum(map(len, self._buckets.values()))
+
+    def __len__(self):
+        return self._size
+
+    def add(self, task):
+        """Index a Task after any others with the same date.
+
+        Args:
+            task (:obj:`Task`): Task to index.
+        """
+        stamp = task.date.timestamp()
+        bucket = self._buckets.get(stamp)
+        if bucket is None:
+            bucket = self._buckets[stamp] = {}
+            insort(self._stamps, stamp)
+        bucket[task] = None
+        self._size += 1
+
+    def remove(self, task):
+        """Remove a Task from the index.
+
+        Args:
+            task (:obj:`Task`): Task to remove, located by its current date.
+
+        Raises:
+            ValueError: If task is not indexed under its current date.
+        """
+        stamp = task.date.timestamp()
+        bucket = self._buckets.get(stamp, {})
+        if task not in bucket:
+            raise ValueError("{!r} is not in date index".format(task))
+        del bucket[task]
+        self._size -= 1
+        if not bucket:
+            del self._buckets[stamp]
+            del self._stamps[bisect_left(self._stamps, stamp)]
+
+    def _stamps_between(self, start_stamp, end_stamp):
+        """Distinct timestamps within a range.
+
+        Args:
+            start_stamp (float): Earliest timestamp, inclusive, or None for no lower bound.
+            end_stamp (float): Latest timestamp, inclusive, or None for no upper bound.
+
+        Returns:
+            (:obj:`list` of float): Indexed timestamps in order.
+        """
+        start = 0 if start_stamp is None else bisect_left(self._stamps, start_stamp)
+        if end_stamp is None:
+            end = len(self._stamps)
+        else:
+            end = bisect_right(self._stamps, end_stamp, lo=start)
+        return self._stamps[start:end]
+
+    def range(self, start_stamp, end_stamp):
+        """Find Tasks dated within a range of timestamps.
+
+        Args:
+            start_stamp (float): Earliest timestamp, inclusive.
+            end_stamp (float): Latest timestamp, inclusive.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks in date order.
+        """
+        stamps = self._stamps_between(start_stamp, end_stamp)
+        return list(chain.from_iterable(map(self._buckets.__getitem__, stamps)))
+
+    def count(self, start_stamp, end_stamp):
+        """Count Tasks dated within a range of timestamps.
+
+        Args:
+            start_stamp (float): Earliest timestamp, inclusive.
+            end_stamp (float): Latest timestamp, inclusive.
+
+        Returns:
+            (int): Number of matching Tasks.
+        """
+        return sum(
+            len(self._buckets[stamp])
+            for stamp in self._stamps_between(start_stamp, end_stamp)
+        )
+
+    def iter_range(self, start_stamp=None, end_stamp=None):
+        """Iterate Tasks dated within a range of timestamps.
+
+        Args:
+            start_stamp (float): Earliest timestamp, inclusive, or None for no lower bound.
+            end_stamp (float): Latest timestamp, inclusive, or None for no upper bound.
+
+        Yields:
+            :obj:`Task`: Matching Tasks in date order.
+
+        Notes:
+            Only the timestamps in range are copied up front, so the first
+            Task comes back without gathering the rest. Each bucket is copied
+            as it is reached, so changes made while iterating show up in the
+            buckets not reached yet, and a date whose Tasks were all removed
+            is skipped.
+        """
+        for stamp in self._stamps_between(start_stamp, end_stamp):
+            bucket = self._buckets.get(stamp)
+            if bucket:
+                yield from tuple(bucket)
+
+
+class TimeSpentIndex:
+    """Buckets of Tasks keyed by time spent in minutes.
+
+    Args:
+        tasks (:obj:`list` of :obj:`Task`): Tasks to index.
+
+    Notes:
+        Exact lookups are a single dict access. A sorted list of the distinct
+        minute values backs range lookups. Buckets are insertion ordered
+        dicts, so a Task is removed without searching its bucket.
+    """
+
+    fields = frozenset(["time_spent"])
+
+    def __init__(self, tasks=()):
+        self._buckets = {}
+        for task in tasks:
+            self._buckets.setdefault(task.time_spent, {})[task] = None
+        self._minutes = sorted(self._buckets)
+
+    def add(self, task):
+        """Index a Task under its time spent.
+
+        Args:
+            task (:obj:`Task`): Task to index.
+        """
+        bucket = self._buckets.get(task.time_spent)
+        if bucket is None:
+            bucket = self._buckets[task.time_spent] = {}
+            insort(self._minutes, task.time_spent)
+        bucket[task] = None
+
+    def remove(self, task):
+        """Remove a Task from the index.
+
+        Args:
+            task (:obj:`Task`): Task to remove, located by its current time spent.
+
+        Raises:
+            ValueError: If task is not indexed under its current time spent.
+        """
+        bucket = self._buckets.get(task.time_spent, {})
+        if task not in bucket:
+            raise ValueError("{!r} is not in time spent index".format(task))
+        del bucket[task]
+        if not bucket:
+            del self._buckets[task.time_spent]
+            del self._minutes[bisect_left(self._minutes, task.time_spent)]
+
+    def exact(self, minutes):
+        """Find Tasks with an exact time spent.
+
+        Args:
+            minutes (int): Time spent in minutes.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks.
+        """
+        return list(self._buckets.get(minutes, ()))
+
+    def _minutes_between(self, min_minutes, max_minutes):
+        """Distinct time spent values within a range.
+
+        Args:
+            min_minutes (int): Least time spent, inclusive.
+            max_minutes (int): Most time spent, inclusive, or None for no upper bound.
+
+        Returns:
+            (:obj:`list` of int): Indexed minute values in order.
+        """
+        start = bisect_left(self._minutes, min_minutes)
+        if max_minutes is None:
+            end = len(self._minutes)
+        else:
+            end = bisect_right(self._minutes, max_minutes, lo=start)
+        return self._minutes[start:end]
+
+    def count(self, min_minutes, max_minutes=None):
+        """Count Tasks with time spent within a range.
+
+        Args:
+            min_minutes (int): Least time spent, inclusive.
+            max_minutes (int): Most time spent, inclusive, or None for no upper bound.
+
+        Returns:
+            (int): Number of matching Tasks.
+        """
+        return sum(
+            len(self._buckets[minutes])
+            for minutes in self._minutes_between(min_minutes, max_minutes)
+        )
+
+    def range(self, min_minutes, max_minutes=None):
+        """Find Tasks with time spent within a range.
+
+        Args:
+            min_minutes (int): Least time spent, inclusive.
+            max_minutes (int): Most time spent, inclusive, or None for no upper bound.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks grouped by time spent.
+        """
+        return [
+            task
+            for minutes in self._minutes_between(min_minutes, max_minutes)
+            for task in self._buckets[minutes]
+        ]
+
+
+class TextIndex:
+    """Inverted index of lowercase word tokens in Task titles and notes.
+
+    Args:
+        tasks (:obj:`list` of :obj:`Task`): Tasks to index.
+
+    Notes:
+        Word lookups are a dict access and prefix lookups bisect a sorted
+        vocabulary. Substring queries scan the vocabulary rather than every
+        Task, then candidates are checked against the original text.
+    """
+
+    fields = frozenset(["title", "notes"])
+
+    def __init__(self, tasks=()):
+        self._postings = {}
+        for task in tasks:
+            for token in self.tokens(task):
+                self._postings.setdefault(token, set()).add(task)
+        self._vocabulary = sorted(self._postings)
+
+    @staticmethod
+    def tokens(task):
+        """Distinct lowercase word tokens in a Task's indexed fields.
+
+        Args:
+            task (:obj:`Task`): Task to tokenise.
+
+        Returns:
+            (set of str): Word tokens.
+        """
+        return set(WORD_PATTERN.findall(" ".join(text_fields(task)).lower()))
+
+    def add(self, task):
+        """Index a Task's words.
+
+        Args:
+            task (:obj:`Task`): Task to index.
+        """
+        for token in self.tokens(task):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                insort(self._vocabulary, token)
+            postings.add(task)
+
+    def remove(self, task):
+        """Remove a Task's words from the index.
+
+        Args:
+            task (:obj:`Task`): Task to remove, located by its current text.
+        """
+        for token in self.tokens(task):
+            postings = self._postings[token]
+            postings.discard(task)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def word(self, token):
+        """Find Tasks containing a whole word.
+
+        Args:
+            token (str): Lowercase word.
+
+        Returns:
+            (set of :obj:`Task`): Matching Tasks.
+        """
+        return set(self._postings.get(token, ()))
+
+    def prefix(self, prefix):
+        """Find Tasks containing a word starting with prefix.
+
+        Args:
+            prefix (str): Lowercase word prefix.
+
+        Returns:
+            (set of :obj:`Task`): Matching Tasks.
+        """
+        result = set()
+        start = bisect_left(self._vocabulary, prefix)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            result.update(self._postings[token])
+        return result
+
+    def _matching_tokens(self, predicate):
+        """Find Tasks containing any vocabulary word satisfying predicate.
+
+        Args:
+            predicate (:obj:`callable`): Test applied to each vocabulary word.
+
+        Returns:
+            (set of :obj:`Task`): Matching Tasks.
+        """
+        result = set()
+        for token in self._vocabulary:
+            if predicate(token):
+                result.update(self._postings[token])
+        return result
+
+    def candidates(self, text):
+        """Narrow down Tasks that could contain text as a substring.
+
+        Args:
+            text (str): Lowercase search text.
+
+        Returns:
+            (set of :obj:`Task`): Candidate Tasks, or None if text has no words to look up.
+        """
+        words = WORD_PATTERN.findall(text)
+        if not words:
+            return None
+        open_start = WORD_PATTERN.match(text) is not None
+        open_end = WORD_PATTERN.match(text[-1]) is not None
+        result = None
+        for position, token in enumerate(words):
+            first = position == 0
+            last = position == len(words) - 1
+            if first and last and open_start and open_end:
+                found = self._matching_tokens(lambda word: token in word)
+            elif first and open_start:
+                found = self._matching_tokens(lambda word: word.endswith(token))
+            elif last and open_end:
+                found = self.prefix(token)
+            else:
+                found = self.word(token)
+            result = found if result is None else result & found
+            if not result:
+                break
+        return result
+
+
+class TrigramIndex:
+    """Index of three character substrings in Task titles and notes.
+
+    Args:
+        tasks (:obj:`list` of :obj:`Task`): Tasks to index.
+
+    Notes:
+        Used to narrow regex searches to Tasks containing every literal
+        fragment the pattern requires. Text is casefolded so candidates are a
+        superset of case-insensitive matches.
+    """
+
+    fields = frozenset(["title", "notes"])
+
+    def __init__(self, tasks=()):
+        self._postings = {}
+        for task in tasks:
+            for trigram in self.trigrams(task):
+                self._postings.setdefault(trigram, set()).add(task)
+
+    @staticmethod
+    def trigrams(task):
+        """Distinct trigrams in a Task's indexed fields.
+
+        Args:
+            task (:obj:`Task`): Task to split.
+
+        Returns:
+            (set of str): Casefolded trigrams.
+        """
+        text = "\n".join(text_fields(task)).casefold()
+        return {text[i : i + 3] for i in range(len(text) - 2)}
+
+    def add(self, task):
+        """Index a Task's trigrams.
+
+        Args:
+            task (:obj:`Task`): Task to index.
+        """
+        for trigram in self.trigrams(task):
+            self._postings.setdefault(trigram, set()).add(task)
+
+    def remove(self, task):
+        """Remove a Task's trigrams from the index.
+
+        Args:
+            task (:obj:`Task`): Task to remove, located by its current text.
+        """
+        for trigram in self.trigrams(task):
+            postings = self._postings[trigram]
+            postings.discard(task)
+            if not postings:
+                del self._postings[trigram]
+
+    def candidates(self, pattern):
+        """Narrow down Tasks that could match a compiled regex.
+
+        Args:
+            pattern (:obj:`re.Pattern`): Compiled regular expression.
+
+        Returns:
+            (set of :obj:`Task`): Candidate Tasks, or None if pattern has no usable literals.
+        """
+        result = None
+        for literal in required_literals(pattern):
+            for i in range(len(literal) - 2):
+                found = self._postings.get(literal[i : i + 3], set())
+                result = set(found) if result is None else result & found
+                if not result:
+                    return result
+        return result
+
+
+class ColumnStore:
+    """Columnar copy of Task fields for vectorised filtering.
+
+    Day numbers and time spent live in contiguous arrays, and row i of every
+    column belongs to the same Task. Only the fields filters read are kept.
+
+    Args:
+        tasks (:obj:`list` of :obj:`Task`): Tasks to store.
+
+    Notes:
+        Filters run as NumPy masks over zero copy views of the arrays when
+        NumPy is installed, and as a single pass over the arrays otherwise.
+        Each Task's row is kept in a map, and a removed row is filled with
+        the last one, so adding and removing a Task don't search or shift
+        the columns. Filter results share the Task list until the next
+        change, which copies it once so open results keep their rows.
+    """
+
+    fields = frozenset(["date", "time_spent"])
+
+    # Cost of filtering one row, relative to checking one Task in Python.
+    row_cost = 1 if numpy is None else 0.02
+
+    def __init__(self, tasks=()):
+        self._tasks = list(tasks)
+        self._rows = {task: row for row, task in enumerate(self._tasks)}
+        self._days = array("q", (task.date.toordinal() for task in self._tasks))
+        self._minutes = array("q", (task.time_spent for task in self._tasks))
+        self._shared = False
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def _own_tasks(self):
+        """Copy the Task list before changing it if a filter result shares it.
+        """
+        if self._shared:
+            self._tasks = list(self._tasks)
+            self._shared = False
+
+    def add(self, task):
+        """Append a Task as a new row.
+
+        Args:
+            task (:obj:`Task`): Task to store.
+        """
+        self._own_tasks()
+        self._rows[task] = len(self._tasks)
+        self._tasks.append(task)
+        self._days.append(task.date.toordinal())
+        self._minutes.append(task.time_spent)
+
+    def remove(self, task):
+        """Remove a Task's row, moving the last row into its place.
+
+        Args:
+            task (:obj:`Task`): Task to remove.
+
+        Raises:
+            KeyError: If task is not stored.
+        """
+        row = self._rows.pop(task)
+        self._own_tasks()
+        last = self._tasks.pop()
+        days, minutes = self._days.pop(), self._minutes.pop()
+        if last is not task:
+            self._tasks[row] = last
+            self._days[row] = days
+            self._minutes[row] = minutes
+            self._rows[last] = row
+
+    def filter(
+        self, start_date=None, end_date=None, min_minutes=None, max_minutes=None
+    ):
+        """Find rows matching every given bound.
+
+        Args:
+            start_date (:obj:`datetime.date`): Earliest date, inclusive.
+            end_date (:obj:`datetime.date`): Latest date, inclusive.
+            min_minutes (int): Least time spent, inclusive.
+            max_minutes (int): Most time spent, inclusive.
+
+        Returns:
+            :obj:`TaskRows`: Matching Tasks in date order.
+        """
+        start_day = start_date.toordinal() if start_date else None
+        end_day = end_date.toordinal() if end_date else None
+        bounds = [
+            (self._days, start_day, end_day),
+            (self._minutes, min_minutes, max_minutes),
+        ]
+        if numpy is not None:
+            rows = self._numpy_rows(bounds)
+        else:
+            rows = self._python_rows(bounds)
+        self._shared = True
+        return TaskRows(self._tasks, rows)
+
+    def _numpy_rows(self, bounds):
+        """Row indices within bounds as NumPy masks, ordered by date.
+
+        Args:
+            bounds (:obj:`list` of tuple): (column, low, high) with None for no bound.
+
+        Returns:
+            (:obj:`list` of int): Matching row indices.
+        """
+        mask = numpy.ones(len(self._tasks), dtype=bool)
+        for column, low, high in bounds:
+            values = numpy.frombuffer(column, dtype=numpy.int64)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        rows = numpy.flatnonzero(mask)
+        days = numpy.frombuffer(self._days, dtype=numpy.int64)
+        return rows[numpy.argsort(days[rows], kind="stable")].tolist()
+
+    def _python_rows(self, bounds):
+        """Row indices within bounds in one pass over the columns, ordered by date.
+
+        Args:
+            bounds (:obj:`list` of tuple): (column, low, high) with None for no bound.
+
+        Returns:
+            (:obj:`list` of int): Matching row indices.
+        """
+        rows = range(len(self._tasks))
+        for column, low, high in bounds:
+            if low is None and high is None:
+                continue
+            low = float("-inf") if low is None else low
+            high = float("inf") if high is None else high
+            rows = [row for row in rows if low <= column[row] <= high]
+        return sorted(rows, key=self._days.__getitem__)
+
+
+class TaskRows(Sequence):
+    """Read only sequence of Tasks selected by row index.
+
+    Tasks are only looked up as items are accessed, so a result paging
+    through a large match touches just the rows it shows.
+
+    Args:
+        tasks (:obj:`list` of :obj:`Task`): Tasks by row, not changed after.
+        rows (:obj:`list` of int): Selected row indices.
+    """
+
+    def __init__(self, tasks, rows):
+        self._tasks = tasks
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._tasks[row] for row in self.rows[position]]
+        return self._tasks[self.rows[position]]
+
+
+def required_literals(pattern):
+    """Literal fragments every match of a regex must contain.
+
+    Args:
+        pattern (:obj:`re.Pattern`): Compiled regular expression.
+
+    Returns:
+        (:obj:`list` of str): Lowercase ASCII fragments at least three characters long.
+
+    Notes:
+        Only sequences outside alternations and optional repeats are
+        required, so anything else just ends the current fragment.
+    """
+    fragments = []
+    _collect_literals(sre_parse.parse(pattern.pattern, pattern.flags), fragments)
+    return [fragment for fragment in fragments if len(fragment) >= 3]
+
+
+def _collect_literals(subpattern, fragments):
+    """Append runs of consecutive literal characters in a parsed regex.
+
+    Args:
+        subpattern (:obj:`sre_parse.SubPattern`): Parsed regular expression.
+        fragments (:obj:`list` of str): Fragments found so far.
+    """
+    current = []
+    for op, av in subpattern:
+        if op is sre_parse.LITERAL and av < 128:
+            current.append(chr(av).lower())
+            continue
+        fragments.append("".join(current))
+        current = []
+        if op is sre_parse.SUBPATTERN:
+            _collect_literals(av[-1], fragments)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            _collect_literals(av[2], fragments)
+    fragments.append("".join(current))
+
+
+def text_fields(task):
+    """Text fields of a Task covered by text searches.
+
+    Args:
+        task (:obj:`Task`): Task to read.
+
+    Returns:
+        (:obj:`list` of str): Title and notes.
+    """
+    return [value for value in (task.title, task.notes) if isinstance(value, str)]
@@ -0,0 +1,110 @@
+"""Time loading task records with full validation against the trusted loader.
+
+Generates records like those in tasks.json, loads them with TaskSchema and
+with FastTaskLoader, checks both give the same tasks and reports each
+time, as used by --trusted.
+
+    .env/bin/python load_benchmark.py --records 100000 1000000
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from models import FastTaskLoader, TaskSchema
+
+
+def parse_args(argv=None):
+    """Parse command line options.
+
+    Args:
+        argv (:obj:`list` of str): Arguments to parse, defaults to sys.argv.
+
+    Returns:
+        (:obj:`argparse.Namespace`): Parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Time trusted task loading")
+    parser.add_argument(
+        "--records",
+        type=int,
+        nargs="+",
+        default=[100000, 1000000],
+        help="Numbers of records to load.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    return parser.parse_args(argv)
+
+
+def make_records(count, rng):
+    """Generate task records as they're stored in tasks.json.
+
+    Args:
+        count (int): Number of records.
+        rng (:obj:`random.Random`): Source of dates and times.
+
+    Returns:
+        (:obj:`list` of dict): Task records.
+    """
+    first_day = date(2015, 1, 1)
+    return [
+        {
+            "date": (first_day + timedelta(days=rng.randint(0, 3000))).strftime(
+                "%d/%m/%Y"
+            ),
+            "title": "Task {}".format(number % 50),
+            "time_spent": rng.randint(1, 500),
+            "notes": "Some notes",
+            "id": number,
+        }
+        for number in range(count)
+    ]
+
+
+def timed(load, records):
+    """Load records, timing how long it takes.
+
+    Args:
+        load (:obj:`function`): Loader taking a list of records.
+        records (:obj:`list` of dict): Records to load.
+
+    Returns:
+        (:obj:`list` of :obj:`Task`, float): Loaded tasks and seconds taken.
+    """
+    started = time.perf_counter()
+    tasks = load(records)
+    return tasks, time.perf_counter() - started
+
+
+def main(argv=None):
+    """Run the benchmark and report the results.
+    """
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    print(
+        "{:>10} {:>10} {:>10} {:>8}".format(
+            "records", "schema s", "trusted s", "speedup"
+        )
+    )
+    for count in args.records:
+        records = make_records(count, rng)
+        trusted, trusted_time = timed(FastTaskLoader().load_many, records)
+        validated, schema_time = timed(
+            lambda records: TaskSchema().load(records, many=True), records
+        )
+        for fast, checked in zip(trusted, validated):
+            assert (fast.id, fast.date, fast.title, fast.time_spent, fast.notes) == (
+                checked.id,
+                checked.date,
+                checked.title,
+                checked.time_spent,
+                checked.notes,
+            ), "loaders disagree on task {}".format(checked.id)
+        print(
+            "{:>10} {:>10.2f} {:>10.2f} {:>7.1f}x".format(
+                count, schema_time, trusted_time, schema_time / trusted_time
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Load test a work log server on localhost.
+
+Each simulated user runs on its own thread with its own connection, mostly
+searching and paging through results, sometimes adding, editing and
+deleting a task of its own. Writes add a task and remove it again, so the
+served task file ends up with the same tasks it started with.
+
+    .env/bin/python load_test.py --serve --users 16 --seconds 10
+    .env/bin/python load_test.py --url http://127.0.0.1:8000
+"""
+
+import argparse
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from client import RemoteRepo
+import queries
+
+
+def parse_args(argv=None):
+    """Parse command line options.
+
+    Args:
+        argv (:obj:`list` of str): Arguments to parse, defaults to sys.argv.
+
+    Returns:
+        (:obj:`argparse.Namespace`): Parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Load test a work log server")
+    parser.add_argument(
+        "--url", default="http://127.0.0.1:8000", help="Server to test."
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Serve tasks.json in the current directory on the url's port first.",
+    )
+    parser.add_argument("--users", type=int, default=8, help="Concurrent users.")
+    parser.add_argument(
+        "--seconds", type=float, default=10, help="How long to run for."
+    )
+    parser.add_argument(
+        "--write-ratio",
+        type=float,
+        default=0.1,
+        help="Share of actions that add, edit and delete a task.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    return parser.parse_args(argv)
+
+
+class Workload:
+    """Search terms drawn from the tasks a server holds.
+
+    Args:
+        repo (:obj:`RemoteRepo`): Server connection to sample tasks through.
+
+    Raises:
+        ValueError: If the server has no tasks.
+    """
+
+    def __init__(self, repo):
+        sample, _, _ = repo.search(queries.And(), 0, 200)
+        if not sample:
+            raise ValueError("The server has no tasks to search.")
+        self.dates = [task.date for task in sample]
+        self.words = sorted(
+            {
+                word
+                for task in sample
+                for word in re.findall(r"\w{3,}", task.title.lower())
+            }
+        ) or ["task"]
+
+    def condition(self, rng):
+        """Pick a random search like the CLI's search menu offers.
+
+        Args:
+            rng (:obj:`random.Random`): Random source.
+
+        Returns:
+            (:obj:`queries.Condition`): Query to run.
+        """
+        start = rng.choice(self.dates)
+        end = start + timedelta(days=rng.randint(0, 60))
+        date_range = queries.DateRange(start, end)
+        time_spent = queries.TimeSpent(rng.randint(1, 60), rng.choice([None, 120]))
+        text = queries.TextContains(rng.choice(self.words))
+        pattern = queries.RegexMatch(
+            re.compile("{}|{}".format(rng.choice(self.words), rng.choice(self.words)))
+        )
+        return rng.choice(
+            [date_range, time_spent, text, pattern, queries.And(date_range, time_spent)]
+        )
+
+
+def run_user(url, workload, rng, args, deadline, timings, errors):
+    """Act as one user until the deadline.
+
+    Args:
+        url (str): Server address.
+        workload (:obj:`Workload`): Search terms.
+        rng (:obj:`random.Random`): This user's random source.
+        args (:obj:`argparse.Namespace`): Parsed options.
+        deadline (float): time.perf_counter value to stop at.
+        timings (:obj:`defaultdict` of list): Request latencies by action, shared.
+        errors (list): Unexpected errors, shared.
+    """
+    repo = RemoteRepo(url)
+    try:
+        while time.perf_counter() < deadline:
+            if rng.random() < args.write_ratio:
+                started = time.perf_counter()
+                task = repo.add_record(
+                    {
+                        "date": "01/01/2020",
+                        "title": "load test",
+                        "time_spent": "1",
+                        "notes": "",
+                    }
+                )
+                timings["add"].append(time.perf_counter() - started)
+                started = time.perf_counter()
+                repo.update_record(task, {"time_spent": "2"})
+                timings["edit"].append(time.perf_counter() - started)
+                started = time.perf_counter()
+                repo.delete_record(task)
+                timings["delete"].append(time.perf_counter() - started)
+                continue
+            condition = workload.condition(rng)
+            started = time.perf_counter()
+            tasks, _, _ = repo.search(condition, 0, queries.QueryResult.page_size)
+            timings["search"].append(time.perf_counter() - started)
+            if len(tasks) == queries.QueryResult.page_size:
+                started = time.perf_counter()
+                repo.search(condition, queries.QueryResult.page_size, len(tasks))
+                timings["next page"].append(time.perf_counter() - started)
+    except Exception as err:
+        errors.append(err)
+
+
+def percentile(latencies, share):
+    """Latency below which a share of requests finished.
+
+    Args:
+        latencies (:obj:`list` of float): Sorted latencies in seconds.
+        share (float): Share of requests, e.g. 0.95.
+
+    Returns:
+        (float): Latency in milliseconds.
+    """
+    return latencies[min(len(latencies) - 1, int(len(latencies) * share))] * 1000
+
+
+def report(timings, seconds):
+    """Print throughput and latency percentiles per action.
+
+    Args:
+        timings (:obj:`defaultdict` of list): Request latencies by action.
+        seconds (float): Length of the run.
+    """
+    print(
+        "{:<10} {:>8} {:>8} {:>8} {:>8} {:>8}".format(
+            "action", "requests", "req/s", "p50 ms", "p95 ms", "p99 ms"
+        )
+    )
+    total = 0
+    for action, latencies in sorted(timings.items()):
+        latencies.sort()
+        total += len(latencies)
+        print(
+            "{:<10} {:>8} {:>8.0f} {:>8.1f} {:>8.1f} {:>8.1f}".format(
+                action,
+                len(latencies),
+                len(latencies) / seconds,
+                percentile(latencies, 0.5),
+                percentile(latencies, 0.95),
+                percentile(latencies, 0.99),
+            )
+        )
+    print("{:<10} {:>8} {:>8.0f}".format("total", total, total / seconds))
+
+
+def start_server(url):
+    """Run work_log.py serve for tasks.json in the current directory.
+
+    Args:
+        url (str): Address the server should listen on.
+
+    Returns:
+        (:obj:`subprocess.Popen`): Server process, listening once this returns.
+    """
+    port = RemoteRepo(url).connection.port
+    work_log = os.path.join(os.path.dirname(os.path.abspath(__file__)), "work_log.py")
+    server = subprocess.Popen(
+        [sys.executable, work_log, "--write-behind", "serve", "--port", str(port)]
+    )
+    while True:
+        if server.poll() is not None:
+            raise SystemExit("Server exited with status {}".format(server.returncode))
+        try:
+            RemoteRepo(url).status()
+            return server
+        except OSError:
+            time.sleep(0.1)
+
+
+def main(argv=None):
+    """Run the load test and report the results.
+    """
+    args = parse_args(argv)
+    server = start_server(args.url) if args.serve else None
+    try:
+        workload = Workload(RemoteRepo(args.url))
+        timings = defaultdict(list)
+        errors = []
+        deadline = time.perf_counter() + args.seconds
+        users = [
+            threading.Thread(
+                target=run_user,
+                args=(
+                    args.url,
+                    workload,
+                    random.Random(args.seed + user),
+                    args,
+                    deadline,
+                    timings,
+                    errors,
+                ),
+            )
+            for user in range(args.users)
+        ]
+        started = time.perf_counter()
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        report(timings, time.perf_counter() - started)
+        for err in errors:
+            print("Error: {!r}".format(err))
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGINT)
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Measure the memory each loaded task takes.
+
+Builds tasks the way loading tasks.json does, each with its own title
+string and date, and reports the bytes traced per task for the slotted
+Task against a plain object holding a datetime, as Task used to be.
+
+    .env/bin/python memory_benchmark.py --records 1000000
+"""
+
+import argparse
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+from models import Task
+
+TITLES = ["Standup", "Code review", "Planning", "Support", "Deploy"]
+
+
+class PlainTask:
+    """Task as a plain object with a __dict__ and datetime date, for comparison.
+
+    Args:
+        date (:obj:`datetime.datetime`): Date of task.
+        title (str): Task title.
+        time_spent (int): Time in minutes.
+        notes (str): Optional notes.
+        id (int): Task id.
+    """
+
+    def __init__(self, date, title, time_spent, notes, id=None):
+        self.date = date
+        self.title = title
+        self.time_spent = time_spent
+        self.notes = notes
+        self.id = id
+
+
+def parse_args(argv=None):
+    """Parse command line options.
+
+    Args:
+        argv (:obj:`list` of str): Arguments to parse, defaults to sys.argv.
+
+    Returns:
+        (:obj:`argparse.Namespace`): Parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Measure memory per task")
+    parser.add_argument(
+        "--records", type=int, default=1000000, help="Number of tasks to build."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    return parser.parse_args(argv)
+
+
+def traced_bytes(task_class, count, seed):
+    """Build tasks, tracing the memory they hold.
+
+    Args:
+        task_class (type): Class to build tasks with.
+        count (int): Number of tasks.
+        seed (int): Random seed, the same for each class compared.
+
+    Returns:
+        (int): Bytes held by the tasks once built.
+    """
+    rng = random.Random(seed)
+    first_day = datetime(2015, 1, 1)
+    tracemalloc.start()
+    tasks = []
+    for number in range(count):
+        # Parsing JSON gives each record a new title string, copy to match.
+        title = (rng.choice(TITLES) + " ")[:-1]
+        tasks.append(
+            task_class(
+                first_day + timedelta(days=rng.randint(0, 3000)),
+                title,
+                rng.randint(1, 500),
+                "",
+                number,
+            )
+        )
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held
+
+
+def main(argv=None):
+    """Run the benchmark and report the results.
+    """
+    args = parse_args(argv)
+    print("{:<10} {:>12}".format("task", "bytes/task"))
+    for task_class in (PlainTask, Task):
+        held = traced_bytes(task_class, args.records, args.seed)
+        print("{:<10} {:>12.1f}".format(task_class.__name__, held / args.records))
+
+
+if __name__ == "__main__":
+    main()
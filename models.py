@@ -1,5 +1,176 @@
+import atexit
 import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections.abc import MutableMapping, MutableSequence
+from contextlib import contextmanager
+from datetime import datetime
 from marshmallow import Schema, fields, post_load
+from marshmallow.exceptions import ValidationError
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@contextmanager
+def atomic_write(path, fsync=True, mode="w"):
+    """Open a temporary file that replaces path only once fully written.
+
+    A crash part way through leaves the previous file intact rather than a
+    truncated one. The temporary file is named for the writing process and
+    thread, so programs saving the same file at once don't share one.
+
+    Args:
+        path (str): File to replace.
+        fsync (bool): Force the new file and its directory entry to disk before returning.
+        mode (str): File mode, "wb" for binary files.
+
+    Yields:
+        (:obj:`io.TextIOWrapper`): Writable temporary file.
+    """
+    temp_file = "{}.{}-{}.tmp".format(path, os.getpid(), threading.get_ident())
+    try:
+        with open(temp_file, mode) as data_file:
+            yield data_file
+            if fsync:
+                data_file.flush()
+                os.fsync(data_file.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    if fsync:
+        try:
+            dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        except OSError:  # Directories can't be opened on Windows
+            return
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def file_signature(path):
+    """Identify a version of a file without reading it.
+
+    Atomic saves replace the file and appends change its size, so either
+    gives a new signature.
+
+    Args:
+        path (str): File to check.
+
+    Returns:
+        (int, int, int): Inode, size and modification time in nanoseconds.
+        None: If the file doesn't exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """Hold an advisory lock on a file's lock file while reading or writing it.
+
+    Programs saving the same task file take turns, and readers don't see a
+    half written append. Without fcntl nothing is locked.
+
+    Args:
+        path (str): File to lock, the lock file is path with a .lock suffix.
+        shared (bool): Lock for reading, other readers can hold it at once.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open("{}.lock".format(path), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+
+
+def append_lines(path, lines, fsync=True):
+    """Append lines to a file in one write.
+
+    Args:
+        path (str): File to append to.
+        lines (:obj:`list` of str): Text lines without trailing newlines.
+        fsync (bool): Force the appended lines to disk before returning.
+    """
+    with open(path, "a") as data_file:
+        data_file.write("".join(line + "\n" for line in lines))
+        if fsync:
+            data_file.flush()
+            os.fsync(data_file.fileno())
+
+
+class SourceChanged(Exception):
+    """Raised instead of writing over a store's file that another program changed.
+
+    Args:
+        path (str): Changed file.
+    """
+
+
+def ensure_unchanged(store):
+    """Check nothing else wrote a store's file since the store last read or wrote it.
+
+    Args:
+        store (:obj:`JSONStore`): JSONStore, JournalStore or JSONLinesStore.
+
+    Raises:
+        SourceChanged: If the file's signature no longer matches store.signature.
+    """
+    if file_signature(store.source_file) != store.signature:
+        raise SourceChanged(store.source_file)
+
+
+@contextmanager
+def exclusive_write(store):
+    """Lock a store's file for writing, once nothing else has changed it.
+
+    Args:
+        store (:obj:`JSONStore`): JSONStore, JournalStore or JSONLinesStore.
+
+    Raises:
+        SourceChanged: If another program changed the file since the store
+            last read or wrote it.
+
+    Notes:
+        store.signature is updated once the caller has written.
+    """
+    with file_lock(store.source_file):
+        ensure_unchanged(store)
+        yield
+        store.signature = file_signature(store.source_file)
+
+
+def apply_change(records, change):
+    """Apply a single add, edit or remove operation to a list of records.
+
+    Args:
+        records (list): Records to modify.
+        change (dict): Operation, {"op": "add", "record": record},
+            {"op": "edit", "index": index, "record": record} or
+            {"op": "remove", "index": index}.
+    """
+    if change["op"] == "add":
+        records.append(change["record"])
+    elif change["op"] == "edit":
+        records[change["index"]] = change["record"]
+    elif change["op"] == "remove":
+        last = records.pop()
+        if change["index"] < len(records):
+            records[change["index"]] = last
+    elif change["op"] == "delete":
+        # Journalled before removals moved the last record into their place.
+        del records[change["index"]]
 
 
 class JSONStore:
@@ -7,25 +178,742 @@ class JSONStore:
 
     Args:
         json_file (str): Path to json data file.
+        commit_every (int): Number of changes to batch into each save.
+        fsync (bool): Force each save to disk before returning.
 
     Attributes:
-        data (list of :obj:`dict`): Deserialised JSON.
+        data (list of :obj:`dict`): Deserialised JSON, read when first used.
+        pending (int): Changes made since the last save.
+        source_file (str): File holding the store's records.
+        signature (tuple): file_signature of json_file as last read or saved.
+
+    Notes:
+        Saves write a temporary file and rename it over json_file. With
+        commit_every above 1, up to commit_every - 1 changes only exist in
+        memory until the batch fills or flush is called.
+        A save raises SourceChanged rather than replace a file another
+        program changed since it was read.
     """
 
-    def __init__(self, json_file):
+    streaming = False
+    chunk_size = 1000
+
+    def __init__(self, json_file, commit_every=1, fsync=True):
         self.json_file = json_file
+        self.source_file = json_file
+        self.commit_every = commit_every
+        self.fsync = fsync
+        self.pending = 0
+        self.signature = None
+        self._data = None
 
-        try:
-            with open(self.json_file, "r") as data_file:
-                self.data = json.load(data_file)
-        except FileNotFoundError:
-            self.data = []
+    @property
+    def data(self):
+        """Deserialised JSON, read from json_file on first use."""
+        if self._data is None:
+            signature, data = self.read_source()
+            if self.signature not in (None, signature):
+                raise SourceChanged(self.json_file)
+            self.signature, self._data = signature, data
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+
+    def read_source(self):
+        """Read every record as json_file holds it now, without changing the store.
+
+        Returns:
+            (tuple, list of :obj:`dict`): file_signature of json_file and its records.
+        """
+        with file_lock(self.json_file, shared=True):
+            signature = file_signature(self.json_file)
+            try:
+                with open(self.json_file, "r") as data_file:
+                    return signature, json.load(data_file)
+            except FileNotFoundError:
+                return signature, []
+
+    def reloaded(self, signature, records):
+        """Take records from read_source as current data, dropping batched changes.
+
+        Args:
+            signature (tuple): file_signature the records were read at.
+            records (list of :obj:`dict`): Records read.
+        """
+        self._data = records
+        self.signature = signature
+        self.pending = 0
 
     def save(self):
         """Flush data to disk.
+
+        Records are encoded a chunk at a time, so a save on another thread
+        doesn't hold the interpreter lock for the whole file.
+
+        Raises:
+            SourceChanged: If another program changed json_file since it was read.
+        """
+        data = self.data
+        with exclusive_write(self):
+            with atomic_write(self.json_file, self.fsync) as data_file:
+                data_file.write("[")
+                for start in range(0, len(data), self.chunk_size):
+                    chunk = json.dumps(data[start : start + self.chunk_size])[1:-1]
+                    data_file.write(", " + chunk if start else chunk)
+                data_file.write("]")
+        self.pending = 0
+
+    def flush(self):
+        """Save any batched changes.
+        """
+        if self.pending:
+            self.save()
+
+    def _changed(self):
+        """Count a change, saving once the batch is full.
+        """
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.save()
+
+    def append(self, record):
+        """Add a record, saving once the batch is full.
+
+        Args:
+            record (dict): Serialised task.
+        """
+        self.data.append(record)
+        self._changed()
+
+    def extend(self, records):
+        """Add many records in a single save.
+
+        Args:
+            records (list of :obj:`dict`): Serialised tasks.
+        """
+        self.data.extend(records)
+        self.save()
+
+    def replace(self, index, record):
+        """Replace the record at index, saving once the batch is full.
+
+        Args:
+            index (int): Position of record in data.
+            record (dict): Serialised task.
+        """
+        self.data[index] = record
+        self._changed()
+
+    def remove(self, index):
+        """Remove the record at index, saving once the batch is full.
+
+        The last record moves into its place, so no other record changes position.
+
+        Args:
+            index (int): Position of record in data.
+        """
+        last = self.data.pop()
+        if index < len(self.data):
+            self.data[index] = last
+        self._changed()
+
+    def write_changes(self, changes):
+        """Apply a batch of changes with a single save.
+
+        Args:
+            changes (list of dict): Operations, see apply_change.
+        """
+        data = self.data
+        for change in changes:
+            apply_change(data, change)
+        self.save()
+
+
+class JournalStore:
+    """Append-only journal of task operations with periodic compaction.
+
+    Each add, edit or delete is written as a single JSON line, so changing
+    one record costs one small append rather than a rewrite of every record.
+    The journal is replayed on load and rewritten as a plain list of adds
+    once enough operations have built up.
+
+    Args:
+        json_file (str): Path to json data file, used to seed a new journal and as export target.
+        journal_file (str): Path to journal file, defaults to json_file with a .journal suffix.
+        compact_every (int): Number of superseded journal lines to allow before compacting.
+        fsync (bool): Force each journal write to disk before returning.
+
+    Attributes:
+        data (list of :obj:`dict`): Current state of replayed journal, replayed when first used.
+        source_file (str): File holding the store's records.
+        signature (tuple): file_signature of the journal as last read or written.
+        pending (int): Always 0, changes are journalled as they happen.
+
+    Notes:
+        Writes raise SourceChanged rather than add to a journal another
+        program changed since it was read.
+    """
+
+    streaming = False
+    pending = 0
+
+    def __init__(self, json_file, journal_file=None, compact_every=1000, fsync=True):
+        self.json_file = json_file
+        self.journal_file = journal_file or "{}.journal".format(json_file)
+        self.source_file = self.journal_file
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.journal_lines = 0
+        self.signature = None
+        self._data = None
+        self._unreplayed = 0
+
+        if not os.path.exists(self.journal_file):
+            try:
+                with open(self.json_file, "r") as data_file:
+                    self._data = json.load(data_file)
+            except FileNotFoundError:
+                self._data = []
+            self.compact()
+
+    @property
+    def data(self):
+        """Current state of the journal, replayed on first use."""
+        if self._data is None:
+            with file_lock(self.journal_file, shared=True):
+                if self.signature is not None:
+                    ensure_unchanged(self)
+                self.signature = file_signature(self.journal_file)
+                self._data, self.journal_lines = self._replay()
+            self._unreplayed = 0
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+
+    def _replay(self):
+        """Rebuild data from journal operations.
+
+        Returns:
+            (list of :obj:`dict`, int): Serialised task records and the number
+            of journal lines replayed.
+
+        Notes:
+            A final line without a newline is a torn write from an interrupted
+            append and is discarded.
+        """
+        data = []
+        lines = 0
+        with open(self.journal_file, "r") as journal:
+            for line in journal:
+                if not line.endswith("\n"):
+                    break
+                apply_change(data, json.loads(line))
+                lines += 1
+        return data, lines
+
+    def read_source(self):
+        """Replay the journal as it is now, without changing the store.
+
+        Returns:
+            (tuple, list of :obj:`dict`): file_signature of the journal and its records.
+        """
+        with file_lock(self.journal_file, shared=True):
+            return file_signature(self.journal_file), self._replay()[0]
+
+    def reloaded(self, signature, records):
+        """Take records from read_source as current data.
+
+        Args:
+            signature (tuple): file_signature the records were read at.
+            records (list of :obj:`dict`): Records read.
+        """
+        self._data = records
+        self.signature = signature
+        self.journal_lines = len(records)
+        self._unreplayed = 0
+
+    def write_changes(self, changes):
+        """Append operations to the journal in one write, compacting when due.
+
+        Args:
+            changes (list of dict): Journal operations, see apply_change.
+
+        Notes:
+            Before data is first used the operations are only appended,
+            replaying the journal picks them up. Enough of these replay and
+            compact it.
+
+        Raises:
+            SourceChanged: If another program changed the journal since it was read.
+        """
+        lines = [json.dumps(change) for change in changes]
+        with exclusive_write(self):
+            if self._data is not None:
+                for change in changes:
+                    apply_change(self._data, change)
+            append_lines(self.journal_file, lines, self.fsync)
+        if self._data is None:
+            self._unreplayed += len(lines)
+            if self._unreplayed >= self.compact_every:
+                self.compact()
+            return
+        self.journal_lines += len(lines)
+        if self.journal_lines - len(self._data) >= self.compact_every:
+            self.compact()
+
+    def append(self, record):
+        """Journal a new record.
+
+        Args:
+            record (dict): Serialised task.
+        """
+        self.write_changes([{"op": "add", "record": record}])
+
+    def extend(self, records):
+        """Journal many new records in a single append.
+
+        Args:
+            records (list of :obj:`dict`): Serialised tasks.
+        """
+        with exclusive_write(self):
+            if self._data is not None:
+                self._data.extend(records)
+                self.journal_lines += len(records)
+            append_lines(
+                self.journal_file,
+                (json.dumps({"op": "add", "record": record}) for record in records),
+                self.fsync,
+            )
+
+    def replace(self, index, record):
+        """Journal a replacement of the record at index.
+
+        Args:
+            index (int): Position of record in data.
+            record (dict): Serialised task.
+        """
+        self.write_changes([{"op": "edit", "index": index, "record": record}])
+
+    def remove(self, index):
+        """Journal removal of the record at index.
+
+        The last record moves into its place, so no other record changes position.
+
+        Args:
+            index (int): Position of record in data.
+        """
+        self.write_changes([{"op": "remove", "index": index}])
+
+    def compact(self):
+        """Rewrite the journal as one add per current record.
+        """
+        data = self.data
+        with exclusive_write(self):
+            with atomic_write(self.journal_file, self.fsync) as journal:
+                for record in data:
+                    journal.write(json.dumps({"op": "add", "record": record}) + "\n")
+        self.journal_lines = len(data)
+
+    def save(self):
+        """Flush data to disk.
+        """
+        self.compact()
+
+    def flush(self):
+        """Nothing to do, every change is journalled as it happens.
+        """
+
+    def export(self, json_file=None):
+        """Write current data as a plain JSON task file.
+
+        Args:
+            json_file (str): Destination path, defaults to the seeding json_file.
+        """
+        with atomic_write(json_file or self.json_file, self.fsync) as data_file:
+            data_file.write(json.dumps(self.data))
+
+
+class JSONLinesStore:
+    """Interface to on disk JSON Lines file, one task record per line.
+
+    Records are read one line at a time so they can be validated as they
+    arrive rather than after the whole file is parsed.
+
+    Args:
+        json_file (str): Path to json data file, used to seed a new JSON Lines file.
+        lines_file (str): Path to JSON Lines file, defaults to json_file with a .jsonl extension.
+        fsync (bool): Force each write to disk before returning.
+
+    Attributes:
+        data (list of :obj:`dict`): Records staged for a full save, not populated on load.
+        source_file (str): File holding the store's records.
+        signature (tuple): file_signature of lines_file as last read or written,
+            set by whoever reads it.
+        pending (int): Always 0, changes are written as they happen.
+
+    Notes:
+        Writes raise SourceChanged rather than change a file another program
+        changed since it was read.
+    """
+
+    streaming = True
+    pending = 0
+
+    def __init__(self, json_file, lines_file=None, fsync=True):
+        self.json_file = json_file
+        self.fsync = fsync
+        self.lines_file = lines_file or "{}.jsonl".format(
+            os.path.splitext(json_file)[0]
+        )
+        self.source_file = self.lines_file
+        self.signature = None
+        self.data = []
+
+        if not os.path.exists(self.lines_file):
+            try:
+                with open(self.json_file, "r") as data_file:
+                    self.data = json.load(data_file)
+            except FileNotFoundError:
+                pass
+            self.save()
+
+    def iter_records(self):
+        """Parse records one line at a time.
+
+        Yields:
+            dict: Deserialised task record.
+
+        Raises:
+            JSONDecodeError: If a line is not valid JSON, noting the line number.
+        """
+        with open(self.lines_file, "r") as lines:
+            for line_number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as err:
+                    raise json.JSONDecodeError(
+                        "{} on line {}".format(err.msg, line_number), err.doc, err.pos
+                    )
+
+    def read_source(self):
+        """Read every record as lines_file holds it now.
+
+        Returns:
+            (tuple, list of :obj:`dict`): file_signature of lines_file and its records.
+        """
+        with file_lock(self.lines_file, shared=True):
+            return file_signature(self.lines_file), list(self.iter_records())
+
+    def reloaded(self, signature, records):
+        """Note the file has been read as it is now, records aren't kept.
+
+        Args:
+            signature (tuple): file_signature the records were read at.
+            records (list of :obj:`dict`): Records read.
+        """
+        self.signature = signature
+
+    def _lines(self):
+        """Read record lines, skipping blank ones.
+
+        Yields:
+            str: Record line ending in a newline.
+        """
+        with open(self.lines_file, "r") as lines:
+            for line in lines:
+                if line.strip():
+                    yield line if line.endswith("\n") else line + "\n"
+
+    def _rewrite(self, index, record=None):
+        """Stream the file into a replacement, swapping or dropping one record.
+
+        Args:
+            index (int): Position of record to change.
+            record (dict): Replacement record, or None to remove it and move the
+                last record into its place.
+        """
+        with exclusive_write(self):
+            last_position = None
+            if record is None:
+                for last_position, replacement in enumerate(self._lines()):
+                    pass
+            else:
+                replacement = json.dumps(record) + "\n"
+            with atomic_write(self.lines_file, self.fsync) as new_lines:
+                for position, line in enumerate(self._lines()):
+                    if position == last_position:
+                        continue
+                    new_lines.write(replacement if position == index else line)
+
+    def append(self, record):
+        """Add a record line.
+
+        Args:
+            record (dict): Serialised task.
+        """
+        self.extend([record])
+
+    def extend(self, records):
+        """Add many record lines in a single append.
+
+        Args:
+            records (list of :obj:`dict`): Serialised tasks.
+        """
+        with exclusive_write(self):
+            append_lines(
+                self.lines_file, (json.dumps(record) for record in records), self.fsync
+            )
+
+    def replace(self, index, record):
+        """Replace the record at index.
+
+        Args:
+            index (int): Position of record in file.
+            record (dict): Serialised task.
+        """
+        self._rewrite(index, record)
+
+    def remove(self, index):
+        """Remove the record at index.
+
+        The last record moves into its place, so no other record changes position.
+
+        Args:
+            index (int): Position of record in file.
+        """
+        self._rewrite(index)
+
+    def write_changes(self, changes):
+        """Apply a batch of changes with a single append or rewrite.
+
+        Args:
+            changes (list of dict): Operations, see apply_change.
         """
-        with open(self.json_file, "w") as data_file:
-            json.dump(self.data, data_file)
+        if all(change["op"] == "add" for change in changes):
+            self.extend([change["record"] for change in changes])
+            return
+        with exclusive_write(self):
+            lines = list(self._lines())
+            for change in changes:
+                if "record" in change:
+                    change = dict(change, record=json.dumps(change["record"]) + "\n")
+                apply_change(lines, change)
+            with atomic_write(self.lines_file, self.fsync) as new_lines:
+                new_lines.writelines(lines)
+
+    def save(self):
+        """Write staged data as the whole file.
+        """
+        with exclusive_write(self):
+            with atomic_write(self.lines_file, self.fsync) as lines:
+                for record in self.data:
+                    lines.write(json.dumps(record) + "\n")
+        self.data = []
+
+    def flush(self):
+        """Nothing to do, every change is written as it happens.
+        """
+
+
+class WriteBehindStore:
+    """Store wrapper that writes changes on a background thread.
+
+    Changes are queued and the caller carries on straight away. The writer
+    thread takes every change queued since it last wrote and passes them to
+    the store's write_changes together, so a burst of changes made during a
+    slow save costs one more save rather than one each.
+
+    Args:
+        store (:obj:`JSONStore`): Store to write to, JSONStore, JournalStore or JSONLinesStore.
+
+    Attributes:
+        store (:obj:`JSONStore`): Wrapped store.
+        source_file (str): File holding the store's records.
+
+    Notes:
+        Queued changes only reach the file once the writer gets to them,
+        flush waits for that and also runs when the program exits. An error
+        writing a batch is raised by the next change or flush, and the
+        writer stops until reloaded clears it. A batch refused with
+        SourceChanged is kept for the repository to merge.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.streaming = store.streaming
+        self.source_file = store.source_file
+        self.fsync = store.fsync
+        self._queued = []
+        self._writing = False
+        self._error = None
+        self._changed = threading.Condition()
+        self._writer = None
+
+    @property
+    def data(self):
+        """Store's records, once queued changes are written."""
+        self.flush()
+        return self.store.data
+
+    @data.setter
+    def data(self, data):
+        self.flush()
+        self.store.data = data
+
+    @property
+    def signature(self):
+        """file_signature of the store's file as the store last read or wrote it."""
+        return self.store.signature
+
+    @signature.setter
+    def signature(self, signature):
+        self.store.signature = signature
+
+    @property
+    def pending(self):
+        """Number of changes not yet written to the store's file."""
+        with self._changed:
+            return len(self._queued) + self._writing + self.store.pending
+
+    @contextmanager
+    def paused(self):
+        """Hold back the writer, waiting for any batch it's writing to finish.
+
+        Changes can still be queued while paused, they're written afterwards.
+        """
+        with self._changed:
+            while self._writing:
+                self._changed.wait()
+            yield
+
+    def read_source(self):
+        """Read every record as the store's file holds it now, call while paused.
+
+        Returns:
+            (tuple, list of :obj:`dict`): file_signature of the file and its records.
+        """
+        return self.store.read_source()
+
+    def reloaded(self, signature, records):
+        """Take records from read_source as current, dropping queued changes and errors.
+
+        Args:
+            signature (tuple): file_signature the records were read at.
+            records (list of :obj:`dict`): Records read.
+        """
+        with self._changed:
+            self._queued = []
+            self._error = None
+            self.store.reloaded(signature, records)
+            self._changed.notify_all()
+
+    def iter_records(self):
+        """Parse the store's records one at a time, see JSONLinesStore.
+
+        Returns:
+            (:obj:`iterator` of dict): Deserialised task records.
+        """
+        return self.store.iter_records()
+
+    def _raise_error(self):
+        """Raise the last error the writer hit, called holding _changed.
+        """
+        if self._error is not None:
+            raise self._error
+
+    def _queue(self, changes):
+        """Hand changes to the writer thread, starting it on first use.
+
+        Args:
+            changes (list of dict): Operations, see apply_change.
+        """
+        with self._changed:
+            self._raise_error()
+            self._queued.extend(changes)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_queued, daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+            self._changed.notify_all()
+
+    def _write_queued(self):
+        """Write each batch of queued changes, run by the writer thread.
+        """
+        while True:
+            with self._changed:
+                while not self._queued or self._error is not None:
+                    self._changed.wait()
+                changes, self._queued = self._queued, []
+                self._writing = True
+            error = None
+            try:
+                self.store.write_changes(changes)
+            except Exception as err:  # Raised on the caller's thread instead
+                error = err
+            with self._changed:
+                self._writing = False
+                if error is not None:
+                    self._error = error
+                    if isinstance(error, SourceChanged):
+                        self._queued[:0] = changes
+                self._changed.notify_all()
+
+    def append(self, record):
+        """Queue a new record.
+
+        Args:
+            record (dict): Serialised task.
+        """
+        self._queue([{"op": "add", "record": record}])
+
+    def extend(self, records):
+        """Queue many new records.
+
+        Args:
+            records (list of :obj:`dict`): Serialised tasks.
+        """
+        self._queue([{"op": "add", "record": record} for record in records])
+
+    def replace(self, index, record):
+        """Queue a replacement of the record at index.
+
+        Args:
+            index (int): Position of record in the store.
+            record (dict): Serialised task.
+        """
+        self._queue([{"op": "edit", "index": index, "record": record}])
+
+    def remove(self, index):
+        """Queue removal of the record at index, the last record moves into its place.
+
+        Args:
+            index (int): Position of record in the store.
+        """
+        self._queue([{"op": "remove", "index": index}])
+
+    def save(self):
+        """Write queued changes, then save the store's data in full.
+        """
+        self.flush()
+        self.store.save()
+
+    def flush(self):
+        """Wait until every queued change is written, then flush the store.
+
+        Raises:
+            Exception: Error the writer hit, changes in its batch may not be written.
+        """
+        with self._changed:
+            while (self._queued and self._error is None) or self._writing:
+                self._changed.wait()
+            self._raise_error()
+        self.store.flush()
 
 
 class Task:
@@ -36,22 +924,92 @@ class Task:
         title (str): Task title.
         time_spent (int): Time in minutes.
         notes (str): Optional notes.
+        id (int): Stable identifier, assigned by the repository if None.
 
     Attributes:
         date (:obj:`datetime.datetime`): Date of task.
         title (str): Task title.
         time_spent (int): Time in minutes.
         notes (str): Optional notes.
+        id (int): Stable identifier, unique within a repository and kept across saves.
+
+        version (int): Count of field assignments, changes whenever the task does.
+
+    Notes:
+        Slotted to avoid a per instance __dict__. The date is held as a
+        proleptic Gregorian day number and titles are interned, since the same
+        few titles tend to repeat across a log.
     """
 
-    def __init__(self, date, title, time_spent, notes):
-        self.date = date
-        self.title = title
-        self.time_spent = time_spent
-        self.notes = notes
+    __slots__ = ("_day", "_title", "time_spent", "notes", "id", "version")
+
+    fields = frozenset(["date", "title", "time_spent", "notes"])
+
+    def __init__(self, date, title, time_spent, notes, id=None):
+        # Set slots directly, construction isn't a change to count.
+        set_slot = object.__setattr__
+        set_slot(self, "version", 0)
+        set_slot(self, "_day", date.toordinal())
+        set_slot(self, "_title", sys.intern(title) if isinstance(title, str) else title)
+        set_slot(self, "time_spent", time_spent)
+        set_slot(self, "notes", notes)
+        set_slot(self, "id", id)
+
+    @classmethod
+    def from_ordinal(cls, day, title, time_spent, notes, id):
+        """Build a Task from a stored day number without a datetime round trip.
+
+        Args:
+            day (int): Proleptic Gregorian day number of the task's date.
+            title (str): Task title.
+            time_spent (int): Time in minutes.
+            notes (str): Notes.
+            id (int): Task id.
+
+        Returns:
+            :obj:`Task`: New unchanged Task.
+        """
+        task = cls.__new__(cls)
+        set_slot = object.__setattr__
+        set_slot(task, "version", 0)
+        set_slot(task, "_day", day)
+        set_slot(task, "_title", sys.intern(title))
+        set_slot(task, "time_spent", time_spent)
+        set_slot(task, "notes", notes)
+        set_slot(task, "id", id)
+        return task
+
+    @property
+    def date(self):
+        return datetime.fromordinal(self._day)
+
+    @date.setter
+    def date(self, value):
+        self._day = value.toordinal()
+
+    @property
+    def title(self):
+        return self._title
+
+    @title.setter
+    def title(self, value):
+        self._title = sys.intern(value) if isinstance(value, str) else value
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self.fields:
+            object.__setattr__(self, "version", self.version + 1)
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        # Restore slots directly, version must exist before fields are set.
+        for slot, value in zip(self.__slots__, state):
+            object.__setattr__(self, slot, value)
 
     def __repr__(self):
-        return "<Task(title={self.title!r})>".format(self=self)
+        return "<Task(id={self.id!r}, title={self.title!r})>".format(self=self)
 
 
 class TaskSchema(Schema):
@@ -66,7 +1024,8 @@ class TaskSchema(Schema):
     date = fields.DateTime(format="%d/%m/%Y", required=True)
     title = fields.Str(required=True)
     time_spent = fields.Int(required=True)
-    notes = fields.Str()
+    notes = fields.Str(missing="")
+    id = fields.Int()
 
     @post_load
     def make_task(self, data):
@@ -79,6 +1038,501 @@ class TaskSchema(Schema):
             (:obj:`Task` or :obj:`list` of :obj:`Task`) if a full task record or set of records is passed.
             (:obj:`dict`): Validated dictionary of partial data for validation purposes.
         """
-        if not len(data.keys()) < 4:
+        if Task.fields <= data.keys():
             return Task(**data)
         return dict(**data)
+
+
+class FastTaskLoader:
+    """Schema-free loader and dumper for task records in bulk.
+
+    Applies the same checks as TaskSchema with direct strptime and int
+    conversions, reusing parsed dates since a log only has one per day.
+    Meant for files this app wrote, interactive input and bulk imports
+    still go through TaskSchema.
+
+    Attributes:
+        date_format (str): strptime format of serialised dates.
+    """
+
+    date_format = "%d/%m/%Y"
+    required = ("date", "title", "time_spent")
+    known = frozenset(["date", "title", "time_spent", "notes", "id"])
+
+    def __init__(self):
+        self._dates = {}
+        self._date_strings = {}
+
+    def _date(self, value):
+        """Parse a serialised date, reusing earlier results.
+
+        Args:
+            value (str): Date in date_format.
+
+        Returns:
+            (:obj:`datetime.datetime`): Parsed date.
+
+        Raises:
+            ValueError: If value is not a valid date string.
+        """
+        try:
+            return self._dates[value]
+        except KeyError:
+            if not isinstance(value, str):
+                raise ValueError(value)
+            date = self._dates[value] = datetime.strptime(value, self.date_format)
+            return date
+        except TypeError:
+            raise ValueError(value)
+
+    def load(self, record):
+        """Validate a record and build its Task.
+
+        Args:
+            record (dict): Serialised task.
+
+        Returns:
+            :obj:`Task`: Deserialised task.
+
+        Raises:
+            ValidationError: With TaskSchema style {field: [message]} errors.
+        """
+        if not isinstance(record, dict):
+            raise ValidationError({"_schema": ["Invalid input type."]})
+        errors = {}
+        for field in self.required:
+            if field not in record:
+                errors[field] = ["Missing data for required field."]
+        for field in record.keys() - self.known:
+            errors[field] = ["Unknown field."]
+        date, title, time_spent = (
+            record.get("date"),
+            record.get("title"),
+            record.get("time_spent"),
+        )
+        notes = record.get("notes", "")
+        task_id = record.get("id")
+        if "date" in record:
+            try:
+                date = self._date(date)
+            except ValueError:
+                errors["date"] = ["Not a valid datetime."]
+        if "title" in record and not isinstance(title, str):
+            errors["title"] = ["Not a valid string."]
+        if "time_spent" in record and type(time_spent) is not int:
+            try:
+                if isinstance(time_spent, bool):
+                    raise ValueError(time_spent)
+                time_spent = int(time_spent)
+            except (TypeError, ValueError):
+                errors["time_spent"] = ["Not a valid integer."]
+        if "id" in record and type(task_id) is not int:
+            try:
+                if isinstance(task_id, bool):
+                    raise ValueError(task_id)
+                task_id = int(task_id)
+            except (TypeError, ValueError):
+                errors["id"] = ["Not a valid integer."]
+        if notes is None:
+            errors["notes"] = ["Field may not be null."]
+        elif not isinstance(notes, str):
+            errors["notes"] = ["Not a valid string."]
+        if errors:
+            raise ValidationError(errors)
+        return Task(date, title, time_spent, notes, task_id)
+
+    def load_batch(self, records):
+        """Validate records, keeping valid Tasks and errors apart.
+
+        Args:
+            records (list of :obj:`dict`): Serialised tasks.
+
+        Returns:
+            (:obj:`list` of :obj:`Task`, dict): Valid Tasks and {index: {field: [message]}} errors.
+        """
+        tasks = []
+        errors = {}
+        for position, record in enumerate(records):
+            try:
+                tasks.append(self.load(record))
+            except ValidationError as err:
+                errors[position] = err.messages
+        return tasks, errors
+
+    def load_many(self, records):
+        """Validate records and build their Tasks.
+
+        Args:
+            records (list of :obj:`dict`): Serialised tasks.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Deserialised tasks.
+
+        Raises:
+            ValidationError: With TaskSchema style {index: {field: [message]}} errors.
+        """
+        tasks, errors = self.load_batch(records)
+        if errors:
+            raise ValidationError(errors)
+        return tasks
+
+    def dump(self, task):
+        """Serialise a Task the way TaskSchema does.
+
+        Args:
+            task (:obj:`Task`): Task to serialise.
+
+        Returns:
+            (dict): Serialised task.
+        """
+        date_string = self._date_strings.get(task._day)
+        if date_string is None:
+            date_string = task.date.strftime(self.date_format)
+            self._date_strings[task._day] = date_string
+        return {
+            "id": task.id,
+            "date": date_string,
+            "title": task.title,
+            "time_spent": task.time_spent,
+            "notes": task.notes,
+        }
+
+
+class Snapshot:
+    """Read-only memory mapped binary copy of a store's Tasks.
+
+    Written alongside the task file so later runs can open it instead of
+    parsing and validating every record. Tasks are decoded from the mapping
+    one at a time as they're used.
+
+    Layout, all little endian:
+        header: magic, Task count, next id, then the inode, size and
+            modification time of the source file the snapshot matches.
+        records: one fixed width row per Task in store order holding id,
+            day number, time spent and heap offsets and lengths of title
+            and notes.
+        ids: (id, position) pairs sorted by id, for lookups by id.
+        heap: UTF-8 title and notes text, repeated strings stored once.
+
+    Args:
+        path (str): Snapshot file.
+
+    Attributes:
+        count (int): Number of Tasks.
+        next_id (int): Id the repository's next new Task would be given.
+        source (tuple): file_signature of the source file when written.
+
+    Raises:
+        ValueError: If the file isn't a snapshot in this format.
+    """
+
+    magic = b"WLSNAP01"
+    header = struct.Struct("<8sqqqqq")
+    record = struct.Struct("<qiqIIII")
+    id_entry = struct.Struct("<qq")
+
+    def __init__(self, path):
+        with open(path, "rb") as snapshot_file:
+            self._map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map.size() < self.header.size:
+            raise ValueError("Truncated snapshot {}".format(path))
+        magic, self.count, self.next_id, *source = self.header.unpack_from(self._map)
+        if magic != self.magic:
+            raise ValueError("Not a snapshot {}".format(path))
+        self.source = tuple(source)
+        self._ids_start = self.header.size + self.count * self.record.size
+        self.heap_start = self._ids_start + self.count * self.id_entry.size
+        if self._map.size() < self.heap_start:
+            raise ValueError("Truncated snapshot {}".format(path))
+
+    def close(self):
+        """Unmap the snapshot.
+        """
+        self._map.close()
+
+    def task(self, position):
+        """Decode the Task stored at a position.
+
+        Args:
+            position (int): Record position.
+
+        Returns:
+            :obj:`Task`: New unchanged Task.
+        """
+        task_id, day, time_spent, title_at, title_length, notes_at, notes_length = (
+            self.record.unpack_from(
+                self._map, self.header.size + position * self.record.size
+            )
+        )
+        title_at += self.heap_start
+        notes_at += self.heap_start
+        return Task.from_ordinal(
+            day,
+            self._map[title_at : title_at + title_length].decode(),
+            time_spent,
+            self._map[notes_at : notes_at + notes_length].decode(),
+            task_id,
+        )
+
+    def raw_record(self, position):
+        """Encoded record at a position, for copying into a new snapshot.
+
+        Args:
+            position (int): Record position.
+
+        Returns:
+            (bytes): Fixed width record.
+        """
+        start = self.header.size + position * self.record.size
+        return self._map[start : start + self.record.size]
+
+    def heap(self):
+        """Copy of the string heap.
+
+        Returns:
+            (bytes): Heap text.
+        """
+        return self._map[self.heap_start :]
+
+    def _id_at(self, index):
+        return self.id_entry.unpack_from(
+            self._map, self._ids_start + index * self.id_entry.size
+        )
+
+    def position_of(self, task_id):
+        """Find the position a Task id was stored at.
+
+        Args:
+            task_id (int): Task id.
+
+        Returns:
+            (int): Record position.
+            None: If no stored Task had the id.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._id_at(middle)[0] < task_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            found_id, position = self._id_at(low)
+            if found_id == task_id:
+                return position
+        return None
+
+    def ids(self):
+        """Iterate stored (id, position) pairs in id order.
+
+        Yields:
+            (int, int): Task id and record position.
+        """
+        for index in range(self.count):
+            yield self._id_at(index)
+
+    @classmethod
+    def write(cls, path, tasks, next_id, source, fsync=True):
+        """Write Tasks as a snapshot.
+
+        Records still held undecoded in an earlier snapshot, or decoded but
+        unchanged, are copied across with the earlier heap rather than
+        encoded again.
+
+        Args:
+            path (str): Snapshot file to replace.
+            tasks (:obj:`list` of :obj:`Task`): Tasks in store order, or SnapshotRecords.
+            next_id (int): Id the repository's next new Task would be given.
+            source (tuple): file_signature of the source file the Tasks match.
+            fsync (bool): Force the snapshot to disk before returning.
+        """
+        previous = getattr(tasks, "snapshot", None)
+        heap = bytearray(previous.heap() if previous else b"")
+        reused_heap = len(heap)
+        offsets = {}
+
+        def text_offset(text):
+            encoded = text.encode()
+            offset = offsets.get(encoded)
+            if offset is None:
+                offset = offsets[encoded] = len(heap)
+                heap.extend(encoded)
+            return offset, len(encoded)
+
+        records = bytearray()
+        ids = []
+        for position in range(len(tasks)):
+            raw = tasks.unchanged_record(position) if previous else None
+            if raw is not None:
+                records += raw
+                ids.append((cls.record.unpack_from(raw)[0], position))
+                continue
+            task = tasks[position]
+            records += cls.record.pack(
+                task.id,
+                task._day,
+                task.time_spent,
+                *text_offset(task.title),
+                *text_offset(task.notes),
+            )
+            ids.append((task.id, position))
+        if previous and len(heap) > 2 * reused_heap:
+            # Mostly rewritten, start again without text no record uses.
+            cls.write(path, list(tasks), next_id, source, fsync)
+            return
+        ids.sort()
+        header = cls.header.pack(cls.magic, len(tasks), next_id, *source)
+        with atomic_write(path, fsync, mode="wb") as snapshot_file:
+            snapshot_file.write(header)
+            snapshot_file.write(records)
+            for entry in ids:
+                snapshot_file.write(cls.id_entry.pack(*entry))
+            snapshot_file.write(heap)
+
+
+class SnapshotRecords(MutableSequence):
+    """List of Tasks backed by a Snapshot, decoding each Task on first access.
+
+    Decoded and newly placed Tasks are kept, so every access to a position
+    returns the same Task object until it is replaced.
+
+    Args:
+        snapshot (:obj:`Snapshot`): Open snapshot.
+
+    Attributes:
+        snapshot (:obj:`Snapshot`): Snapshot undecoded positions are read from.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._length = snapshot.count
+        self._tasks = {}
+        self._placed = set()
+
+    def __len__(self):
+        return self._length
+
+    def _position(self, position):
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError("record index out of range")
+        return position
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[index] for index in range(*position.indices(self._length))]
+        position = self._position(position)
+        task = self._tasks.get(position)
+        if task is None:
+            task = self._tasks[position] = self.snapshot.task(position)
+        return task
+
+    def __iter__(self):
+        tasks = self._tasks
+        decode = self.snapshot.task
+        for position in range(self._length):
+            task = tasks.get(position)
+            if task is None:
+                task = tasks[position] = decode(position)
+            yield task
+
+    def __setitem__(self, position, task):
+        position = self._position(position)
+        self._tasks[position] = task
+        self._placed.add(position)
+
+    def __delitem__(self, position):
+        position = self._position(position)
+        for index in range(position, self._length - 1):
+            self[index] = self[index + 1]
+        self.pop()
+
+    def insert(self, position, task):
+        if position < 0:
+            position = max(position + self._length, 0)
+        position = min(position, self._length)
+        self.append(task)
+        for index in range(self._length - 1, position, -1):
+            self[index] = self[index - 1]
+        self[position] = task
+
+    def append(self, task):
+        self._length += 1
+        self[self._length - 1] = task
+
+    def pop(self, position=-1):
+        position = self._position(position)
+        if position != self._length - 1:
+            task = self[position]
+            del self[position]
+            return task
+        task = self[position]
+        self._length -= 1
+        self._tasks.pop(position, None)
+        self._placed.discard(position)
+        return task
+
+    def unchanged_record(self, position):
+        """Encoded snapshot record for a position that still holds it.
+
+        Args:
+            position (int): Record position.
+
+        Returns:
+            (bytes): Record to copy, None if the position holds a placed or edited Task.
+        """
+        if position in self._placed:
+            return None
+        task = self._tasks.get(position)
+        if task is not None and task.version:
+            return None
+        return self.snapshot.raw_record(position)
+
+
+class SnapshotPositions(MutableMapping):
+    """Task id to position map backed by a Snapshot's sorted ids.
+
+    Only ids whose position changed since the snapshot was written are held
+    in memory, the rest are found by binary search in the mapping.
+
+    Args:
+        snapshot (:obj:`Snapshot`): Open snapshot.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._moved = {}
+        self._removed = set()
+        self._length = snapshot.count
+
+    def __getitem__(self, task_id):
+        position = self._moved.get(task_id)
+        if position is not None:
+            return position
+        if task_id not in self._removed:
+            position = self.snapshot.position_of(task_id)
+            if position is not None:
+                return position
+        raise KeyError(task_id)
+
+    def __setitem__(self, task_id, position):
+        if task_id not in self:
+            self._length += 1
+        self._moved[task_id] = position
+        self._removed.discard(task_id)
+
+    def __delitem__(self, task_id):
+        self[task_id]
+        self._moved.pop(task_id, None)
+        self._removed.add(task_id)
+        self._length -= 1
+
+    def __iter__(self):
+        for task_id, _ in self.snapshot.ids():
+            if task_id not in self._removed and task_id not in self._moved:
+                yield task_id
+        yield from self._moved
+
+    def __len__(self):
+        return self._length
@@ -0,0 +1,196 @@
+"""Check long sessions of menu navigation keep a flat stack and steady memory.
+
+Scripts the CLI through a cycle of screens, main menu to search to results
+and back, on a generated task file, sampling the stack depth and traced
+memory every 10000 navigations. Exits non-zero if the stack depth changes
+between samples or traced memory grows by more than --max-growth-kb.
+
+    .env/bin/python navigation_benchmark.py --navigations 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from controllers import TaskController
+from repositories import DataRepo
+
+# Search, text search for "hello", next result, back to search, main menu,
+# search, main menu. Entering the last "g" returns to the first "b".
+CYCLE = ["b", "d", "hello", "n", "r", "g", "b", "g"]
+NAVIGATIONS_PER_CYCLE = 7
+SAMPLE_EVERY = 10000
+
+
+def parse_args(argv=None):
+    """Parse command line options.
+
+    Args:
+        argv (:obj:`list` of str): Arguments to parse, defaults to sys.argv.
+
+    Returns:
+        (:obj:`argparse.Namespace`): Parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark menu navigation")
+    parser.add_argument(
+        "--navigations",
+        type=int,
+        default=100000,
+        help="Screens to move between before quitting.",
+    )
+    parser.add_argument(
+        "--tasks", type=int, default=1000, help="Tasks in the generated task file."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument(
+        "--max-growth-kb",
+        type=int,
+        default=64,
+        help="Traced memory allowed to grow from the first sample to any later one.",
+    )
+    return parser.parse_args(argv)
+
+
+class ScriptedInput:
+    """Stands in for stdin, answering prompts with the navigation cycle.
+
+    Args:
+        navigations (int): Navigations to make before choosing quit.
+
+    Attributes:
+        navigations (int): Navigations made so far.
+        depths (:obj:`list` of int): Stack depth at each sample.
+        memory (:obj:`list` of int): Traced bytes at each sample.
+    """
+
+    def __init__(self, navigations):
+        self.limit = navigations
+        self.lines = 0
+        self.navigations = 0
+        self.depths = []
+        self.memory = []
+
+    def readline(self):
+        if self.navigations >= self.limit:
+            return "c\n"
+        line = CYCLE[self.lines % len(CYCLE)]
+        self.lines += 1
+        if self.lines % len(CYCLE) == 0:
+            self.navigations += NAVIGATIONS_PER_CYCLE
+            if self.navigations % SAMPLE_EVERY < NAVIGATIONS_PER_CYCLE:
+                self.sample()
+        return line + "\n"
+
+    def sample(self):
+        """Record the current stack depth and traced memory.
+        """
+        depth, frame = 0, sys._getframe()
+        while frame:
+            depth += 1
+            frame = frame.f_back
+        self.depths.append(depth)
+        self.memory.append(tracemalloc.get_traced_memory()[0])
+
+
+def write_task_file(path, count, rng):
+    """Write a task file, a third of the tasks with "hello" in the title.
+
+    Args:
+        path (str): File to write.
+        count (int): Number of tasks.
+        rng (:obj:`random.Random`): Source of dates and times.
+    """
+    first_day = date(2015, 1, 1)
+    records = [
+        {
+            "date": (first_day + timedelta(days=rng.randint(0, 3000))).strftime(
+                "%d/%m/%Y"
+            ),
+            "title": ("hello {}" if number % 3 == 0 else "Task {}").format(number),
+            "time_spent": rng.randint(1, 500),
+            "notes": "",
+            "id": number,
+        }
+        for number in range(count)
+    ]
+    with open(path, "w") as task_file:
+        json.dump(records, task_file)
+
+
+def check_samples(depths, memory, max_growth):
+    """Find the samples where navigation stopped being flat.
+
+    Args:
+        depths (:obj:`list` of int): Stack depth at each sample.
+        memory (:obj:`list` of int): Traced bytes at each sample.
+        max_growth (int): Bytes traced memory may grow past the first sample.
+
+    Returns:
+        (:obj:`list` of str): A message for each failed check, empty if all passed.
+    """
+    if not depths:
+        return ["No samples taken, run at least {} navigations.".format(SAMPLE_EVERY)]
+    failures = []
+    if len(set(depths)) > 1:
+        failures.append(
+            "Stack depth changed between samples: {}.".format(
+                ", ".join(map(str, depths))
+            )
+        )
+    growth = max(memory) - memory[0]
+    if growth > max_growth:
+        failures.append(
+            "Traced memory grew {} KB, more than the {} KB allowed.".format(
+                growth // 1024, max_growth // 1024
+            )
+        )
+    return failures
+
+
+def main(argv=None):
+    """Run the benchmark, report the results and check them.
+
+    Raises:
+        SystemExit: If the stack depth or traced memory did not stay level.
+    """
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as work_dir:
+        json_file = os.path.join(work_dir, "tasks.json")
+        write_task_file(json_file, args.tasks, random.Random(args.seed))
+        task_app = TaskController(DataRepo(json_file))
+        task_app.wait_for_records()
+        script = ScriptedInput(args.navigations)
+        stdin, stdout = sys.stdin, sys.stdout
+        sys.stdin = script
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            with open(os.devnull, "w") as sys.stdout:
+                task_app.start()
+        except SystemExit:
+            pass
+        finally:
+            elapsed = time.perf_counter() - started
+            tracemalloc.stop()
+            sys.stdin, sys.stdout = stdin, stdout
+    print(
+        "{} navigations in {:.1f}s, {:.0f} per second".format(
+            script.navigations, elapsed, script.navigations / elapsed
+        )
+    )
+    print("{:>12} {:>12} {:>12}".format("navigations", "stack depth", "traced KB"))
+    for sample, (depth, held) in enumerate(zip(script.depths, script.memory), 1):
+        print("{:>12} {:>12} {:>12}".format(sample * SAMPLE_EVERY, depth, held // 1024))
+    failures = check_samples(script.depths, script.memory, args.max_growth_kb * 1024)
+    if failures:
+        raise SystemExit("\n".join(failures))
+    print("Stack depth and traced memory stayed level.")
+
+
+if __name__ == "__main__":
+    main()
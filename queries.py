@@ -0,0 +1,915 @@
+"""Compound task queries planned against a repository's indexes.
+
+Conditions combine with And and Or. Planning asks the repository how many
+Tasks each condition's index could return, drives the query from the
+cheapest index and checks the remaining conditions cheapest first.
+"""
+
+import heapq
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from collections.abc import Sequence
+from datetime import datetime
+from functools import partial
+from itertools import chain, islice
+from operator import attrgetter
+from indexes import WORD_PATTERN, required_literals, text_fields
+
+
+class Plan:
+    """How one condition of a query will be run.
+
+    Args:
+        label (str): Description of the condition.
+        estimate (int): Most Tasks the condition could match.
+        check (:obj:`callable`): Tests a single Task against the condition.
+        check_cost (float): Relative cost of one check.
+        rows (:obj:`callable`): Returns the matching Tasks from an index, None if
+            the condition can only be checked by scanning.
+        cost (float): Relative cost of fetching rows, in single Task checks.
+        access (str): How rows are found.
+        ordered (bool): Whether rows come back in date order.
+        exact (bool): Whether estimate is the exact number of matches.
+        children (:obj:`list` of :obj:`Plan`): Plans of nested conditions.
+        index_wanted (str): Name of an index not built yet that would have
+            given rows, see run_plan.
+
+    Attributes:
+        role (str): Part played in the parent plan, "driver" or "filter".
+    """
+
+    def __init__(
+        self,
+        label,
+        estimate,
+        check,
+        check_cost=1,
+        rows=None,
+        cost=None,
+        access="check",
+        ordered=False,
+        exact=False,
+        children=(),
+        index_wanted=None,
+    ):
+        self.label = label
+        self.estimate = estimate
+        self.check = check
+        self.check_cost = check_cost
+        self.rows = rows
+        self.cost = cost
+        self.access = access
+        self.ordered = ordered
+        self.exact = exact
+        self.children = list(children)
+        self.index_wanted = index_wanted
+        self.role = None
+
+    def explain(self, depth=0):
+        """Describe the plan and its children.
+
+        Args:
+            depth (int): Indentation level.
+
+        Returns:
+            (:obj:`list` of str): One line per condition.
+        """
+        line = "{}{}: ~{} rows via {}".format(
+            "  " * depth, self.label, self.estimate, self.access
+        )
+        if self.role:
+            line += " [{}]".format(self.role)
+        lines = [line]
+        for child in self.children:
+            lines.extend(child.explain(depth + 1))
+        return lines
+
+
+class Condition:
+    """Base class for query conditions.
+
+    Conditions combine with & and | as well as And and Or.
+
+    Attributes:
+        check_cost (float): Relative cost of checking one Task, cheap checks run first.
+    """
+
+    check_cost = 1
+
+    def matches(self, task):
+        """Check a single Task against the condition.
+
+        Args:
+            task (:obj:`Task`): Task to check.
+
+        Returns:
+            (bool): True if the Task matches.
+        """
+        raise NotImplementedError
+
+    def key(self):
+        """Normalised form of the condition, equal for equivalent queries.
+
+        Returns:
+            (tuple): Hashable cache key.
+        """
+        raise NotImplementedError
+
+    def dump(self):
+        """JSON form of the condition, see load_condition.
+
+        Returns:
+            (list): Condition type followed by its arguments.
+        """
+        raise NotImplementedError
+
+    def plan(self, repo, budget=None):
+        """Decide how to find matching Tasks in a repository.
+
+        Args:
+            repo (:obj:`DataRepo`): Repository to query.
+            budget (float): Cost of the cheapest way found so far to fetch
+                rows for the enclosing query, or None.
+
+        Returns:
+            (:obj:`Plan`): How the condition will be run.
+        """
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+
+class DateRange(Condition):
+    """Tasks dated within a range of days.
+
+    Args:
+        start_date (:obj:`datetime.date`): Earliest date, inclusive.
+        end_date (:obj:`datetime.date`): Latest date, inclusive.
+    """
+
+    def __init__(self, start_date, end_date):
+        # Tasks hold naive midnight datetimes, drop times and time zones to match.
+        self.start = datetime(start_date.year, start_date.month, start_date.day)
+        self.end = datetime(end_date.year, end_date.month, end_date.day)
+
+    def __str__(self):
+        return "date {:%d/%m/%Y} to {:%d/%m/%Y}".format(self.start, self.end)
+
+    def matches(self, task):
+        return self.start <= task.date <= self.end
+
+    def key(self):
+        return ("date", self.start, self.end)
+
+    def dump(self):
+        return ["date", f"{self.start:%d/%m/%Y}", f"{self.end:%d/%m/%Y}"]
+
+    def plan(self, repo, budget=None):
+        start_stamp, end_stamp = self.start.timestamp(), self.end.timestamp()
+        estimate = repo.count_by_date_range(start_stamp, end_stamp)
+        return Plan(
+            str(self),
+            estimate,
+            self.matches,
+            rows=partial(repo.iter_by_date_range, start_stamp, end_stamp),
+            cost=estimate,
+            access="date index",
+            ordered=True,
+            exact=True,
+        )
+
+
+class TimeSpent(Condition):
+    """Tasks with time spent within a range of minutes.
+
+    Args:
+        min_minutes (int): Least time spent, inclusive.
+        max_minutes (int): Most time spent, inclusive, or None for no upper bound.
+    """
+
+    def __init__(self, min_minutes, max_minutes=None):
+        self.min_minutes = min_minutes
+        self.max_minutes = max_minutes
+
+    def __str__(self):
+        if self.max_minutes is None:
+            return "time spent {}+ minutes".format(self.min_minutes)
+        if self.max_minutes == self.min_minutes:
+            return "time spent {} minutes".format(self.min_minutes)
+        return "time spent {}-{} minutes".format(self.min_minutes, self.max_minutes)
+
+    def matches(self, task):
+        return self.min_minutes <= task.time_spent and (
+            self.max_minutes is None or task.time_spent <= self.max_minutes
+        )
+
+    def key(self):
+        return ("time", self.min_minutes, self.max_minutes)
+
+    def dump(self):
+        return ["time", self.min_minutes, self.max_minutes]
+
+    def plan(self, repo, budget=None):
+        estimate = repo.count_by_time_range(self.min_minutes, self.max_minutes)
+        return Plan(
+            str(self),
+            estimate,
+            self.matches,
+            rows=partial(repo.find_by_time_range, self.min_minutes, self.max_minutes),
+            cost=estimate,
+            access="time spent index",
+            exact=True,
+        )
+
+
+class _TextCondition(Condition):
+    """Condition on title and notes narrowed down by a repository text index.
+
+    Subclasses name the index with index_name and access, and look
+    candidates up in candidates.
+
+    Notes:
+        Index lookups are skipped when the enclosing query already has a
+        cheaper way to fetch rows, a lone condition's alternative being a
+        scan. A lookup in a built index is taken to touch a hundredth of the
+        Tasks. Building one costs build_cost checks per Task, less the
+        checks scans have already spent that the index would have saved, so
+        a one-off search scans and the index is built once repeated
+        searches have paid for it.
+    """
+
+    index_name = "text_index"
+    access = "text index"
+    # Cost of indexing one Task, relative to checking one Task.
+    build_cost = 10
+
+    def indexable(self):
+        """Check whether the index could narrow candidates down at all.
+
+        Returns:
+            (bool): False if the condition has nothing to look up.
+        """
+        raise NotImplementedError
+
+    def candidates(self, repo):
+        """Tasks that could match, or None if the index can't narrow them down.
+
+        Args:
+            repo (:obj:`DataRepo`): Repository to query.
+
+        Returns:
+            (set of :obj:`Task`): Candidate Tasks.
+        """
+        raise NotImplementedError
+
+    def lookup_cost(self, repo):
+        """Relative cost of looking up candidates, in single Task checks.
+
+        Args:
+            repo (:obj:`DataRepo`): Repository to query.
+
+        Returns:
+            (float): Estimated cost.
+        """
+        if repo.index_built(self.index_name):
+            return len(repo.records) / 100
+        build_cost = len(repo.records) * self.build_cost
+        return max(build_cost - repo.scan_cost(self.index_name), 0)
+
+    def plan(self, repo, budget=None):
+        if budget is None:
+            budget = len(repo.records) * self.check_cost
+        candidates = None
+        if self.indexable() and budget >= self.lookup_cost(repo):
+            candidates = self.candidates(repo)
+        if candidates is None:
+            return Plan(
+                str(self),
+                len(repo.records),
+                self.matches,
+                self.check_cost,
+                index_wanted=self.index_name if self.indexable() else None,
+            )
+        return Plan(
+            str(self),
+            len(candidates),
+            self.matches,
+            self.check_cost,
+            rows=partial(filter, self.matches, candidates),
+            cost=len(candidates) * self.check_cost,
+            access=self.access,
+        )
+
+
+class TextContains(_TextCondition):
+    """Tasks whose title or notes contain text, ignoring case.
+
+    Args:
+        text (str): Text to search for.
+    """
+
+    check_cost = 2
+
+    def __init__(self, text):
+        self.text = text.lower()
+
+    def __str__(self):
+        return "text contains {!r}".format(self.text)
+
+    def matches(self, task):
+        return any(self.text in value.lower() for value in text_fields(task))
+
+    def key(self):
+        return ("text", self.text)
+
+    def dump(self):
+        return ["text", self.text]
+
+    def indexable(self):
+        return WORD_PATTERN.search(self.text) is not None
+
+    def candidates(self, repo):
+        return repo.text_candidates(self.text)
+
+
+class RegexMatch(_TextCondition):
+    """Tasks whose title or notes match a regular expression.
+
+    Args:
+        pattern (:obj:`re.Pattern`): Compiled regular expression.
+    """
+
+    check_cost = 4
+    index_name = "trigram_index"
+    access = "trigram index"
+    build_cost = 40
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def __str__(self):
+        return "text matches /{}/".format(self.pattern.pattern)
+
+    def matches(self, task):
+        return any(self.pattern.search(value) for value in text_fields(task))
+
+    def key(self):
+        return ("regex", self.pattern.pattern, self.pattern.flags)
+
+    def dump(self):
+        return ["regex", self.pattern.pattern, self.pattern.flags]
+
+    def indexable(self):
+        return bool(required_literals(self.pattern))
+
+    def candidates(self, repo):
+        return repo.regex_candidates(self.pattern)
+
+
+class And(Condition):
+    """Tasks matching every one of several conditions.
+
+    Args:
+        *conditions (:obj:`Condition`): Conditions to combine, every Task matches
+            when there are none.
+    """
+
+    def __init__(self, *conditions):
+        self.conditions = sorted(conditions, key=attrgetter("check_cost"))
+        self.check_cost = sum(condition.check_cost for condition in conditions)
+
+    def __str__(self):
+        return "all of"
+
+    def matches(self, task):
+        return all(condition.matches(task) for condition in self.conditions)
+
+    def key(self):
+        return ("and", frozenset(condition.key() for condition in self.conditions))
+
+    def dump(self):
+        return ["and"] + [condition.dump() for condition in self.conditions]
+
+    def _column_plan(self, repo, children):
+        """Plan a date range and time spent pair as one columnar filter.
+
+        Args:
+            repo (:obj:`DataRepo`): Repository to query.
+            children (:obj:`list` of :obj:`Plan`): Plans of this And's conditions.
+
+        Returns:
+            (:obj:`Plan`): Combined plan replacing the pair.
+            None: If the conditions don't include both.
+        """
+        dates = [
+            (condition, plan)
+            for condition, plan in zip(self.conditions, children)
+            if isinstance(condition, DateRange)
+        ]
+        times = [
+            (condition, plan)
+            for condition, plan in zip(self.conditions, children)
+            if isinstance(condition, TimeSpent)
+        ]
+        if not dates or not times:
+            return None
+        (date_range, date_plan), (time_spent, time_plan) = dates[0], times[0]
+        estimate = min(date_plan.estimate, time_plan.estimate)
+        return Plan(
+            "{} and {}".format(date_range, time_spent),
+            estimate,
+            lambda task: date_plan.check(task) and time_plan.check(task),
+            rows=partial(
+                repo.find_by_filters,
+                date_range.start,
+                date_range.end,
+                time_spent.min_minutes,
+                time_spent.max_minutes,
+            ),
+            cost=repo.filter_cost() + estimate,
+            access="column filter",
+            ordered=True,
+            children=[date_plan, time_plan],
+        )
+
+    def plan(self, repo, budget=None):
+        children = []
+        for condition in self.conditions:
+            child = condition.plan(repo, budget)
+            if child.rows and (budget is None or child.cost < budget):
+                budget = child.cost
+            children.append(child)
+        options = [child for child in children if child.rows]
+        column_plan = self._column_plan(repo, children)
+        if column_plan is not None:
+            options.append(column_plan)
+        driver = min(options, key=attrgetter("cost", "estimate"), default=None)
+        if column_plan is not None and driver is column_plan:
+            children = [column_plan] + [
+                child for child in children if child not in column_plan.children
+            ]
+        filters = sorted(
+            (child for child in children if child is not driver),
+            key=attrgetter("check_cost", "estimate"),
+        )
+        for child in filters:
+            child.role = "filter"
+        check = self._all_of(sorted(children, key=attrgetter("check_cost")))
+        if driver is None:
+            return Plan(
+                str(self),
+                min((child.estimate for child in children), default=len(repo.records)),
+                check,
+                self.check_cost,
+                children=filters,
+            )
+        driver.role = "driver"
+        filter_check = self._all_of(filters)
+        return Plan(
+            str(self),
+            driver.estimate,
+            check,
+            self.check_cost,
+            rows=lambda: filter(filter_check, driver.rows()),
+            cost=driver.cost + driver.estimate * sum(c.check_cost for c in filters),
+            access=driver.access,
+            ordered=driver.ordered,
+            children=[driver] + filters,
+        )
+
+    @staticmethod
+    def _all_of(plans):
+        """Combine plan checks, each Task must pass every one.
+
+        Args:
+            plans (:obj:`list` of :obj:`Plan`): Plans in the order to check them.
+
+        Returns:
+            (:obj:`callable`): Combined check.
+        """
+        checks = [plan.check for plan in plans]
+        return lambda task: all(check(task) for check in checks)
+
+
+class Or(Condition):
+    """Tasks matching any of several conditions.
+
+    Args:
+        *conditions (:obj:`Condition`): Conditions to combine, no Task matches
+            when there are none.
+    """
+
+    def __init__(self, *conditions):
+        self.conditions = sorted(conditions, key=attrgetter("check_cost"))
+        self.check_cost = sum(condition.check_cost for condition in conditions)
+
+    def __str__(self):
+        return "any of"
+
+    def matches(self, task):
+        return any(condition.matches(task) for condition in self.conditions)
+
+    def key(self):
+        return ("or", frozenset(condition.key() for condition in self.conditions))
+
+    def dump(self):
+        return ["or"] + [condition.dump() for condition in self.conditions]
+
+    def plan(self, repo, budget=None):
+        total = len(repo.records)
+        # Anything costing more than a scan isn't worth it, and once one
+        # condition needs a scan the others can't avoid it.
+        budget = total
+        children = []
+        for condition in self.conditions:
+            child = condition.plan(repo, budget)
+            if child.rows is None:
+                budget = 0
+            children.append(child)
+        checks = [child.check for child in children]
+
+        def check(task):
+            return any(child_check(task) for child_check in checks)
+
+        estimate = min(sum(child.estimate for child in children), total)
+        indexed = bool(children) and all(child.rows for child in children)
+        cost = sum(child.cost for child in children) if indexed else total
+        if indexed and cost < total:
+            for child in children:
+                child.role = "driver"
+            return Plan(
+                str(self),
+                estimate,
+                check,
+                self.check_cost,
+                rows=lambda: dict.fromkeys(
+                    chain.from_iterable(child.rows() for child in children)
+                ),
+                cost=cost,
+                access="index union",
+                children=children,
+            )
+        return Plan(str(self), estimate, check, self.check_cost, children=children)
+
+
+class QueryResult(Sequence):
+    """Tasks matching a query in date order, found as they are read.
+
+    Args:
+        repo (:obj:`DataRepo`): Repository queried.
+        plan (:obj:`Plan`): Plan from plan_query.
+
+    Attributes:
+        estimate (int): Most Tasks the query could match.
+
+    Notes:
+        Plans that read rows in date order are consumed a page at a time.
+        Other plans are collected once, the first page picked out with a
+        heap and the rest only sorted if read. When such a plan's candidates
+        are so many that a page of matches is quicker to find by scanning in
+        date order, it is scanned instead.
+        Rows are read from snapshots of the indexes, so tasks added or
+        deleted later don't shift a result part way through being read.
+        A cached result can be read by several threads at once, reads take
+        turns so each row is read from the source once.
+    """
+
+    page_size = 20
+
+    def __init__(self, repo, plan):
+        self._lock = threading.RLock()
+        self.estimate = plan.estimate
+        self._tasks = []
+        self._first_page = None
+        self._length = plan.estimate if plan.exact else None
+        if (
+            plan.rows is None
+            or plan.ordered
+            or scan_is_cheaper(repo, plan, self.page_size)
+        ):
+            self._source = run_plan(repo, plan)
+        else:
+            self._source = None
+            self._tasks = list(plan.rows())
+            self._length = len(self._tasks)
+            self._first_page = heapq.nsmallest(
+                self.page_size, self._tasks, key=attrgetter("date")
+            )
+
+    def _fill(self, count):
+        """Read from the source until count Tasks are held or it runs out.
+
+        Args:
+            count (int): Tasks wanted, None to read them all.
+        """
+        if self._source is not None and count is None:
+            self._tasks.extend(self._source)
+            self._source = None
+            self._length = len(self._tasks)
+        while self._source is not None and len(self._tasks) < count:
+            wanted = max(self.page_size, count - len(self._tasks))
+            page = list(islice(self._source, wanted))
+            self._tasks.extend(page)
+            if len(page) < wanted:
+                self._source = None
+                self._length = len(self._tasks)
+
+    def known_length(self):
+        """Number of matching Tasks if known without reading further.
+
+        Returns:
+            (int): Exact count.
+            None: If more rows would have to be read to count them.
+        """
+        return self._length
+
+    def __len__(self):
+        with self._lock:
+            if self._length is None:
+                self._fill(None)
+            return self._length
+
+    def __bool__(self):
+        with self._lock:
+            self._fill(1)
+            return bool(self._tasks)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[index] for index in range(*position.indices(len(self)))]
+        with self._lock:
+            if position < 0:
+                position += len(self)
+            if self._first_page is not None:
+                if position < len(self._first_page):
+                    return self._first_page[position]
+                # Paged past the first page, sort the rest once.
+                self._tasks.sort(key=attrgetter("date"))
+                self._first_page = None
+            self._fill(position + 1)
+            return self._tasks[position]
+
+
+def load_condition(data):
+    """Build a condition from its JSON form, see Condition.dump.
+
+    Args:
+        data (list): Condition type followed by its arguments, e.g.
+            ["and", ["date", "01/01/2020", "31/01/2020"], ["time", 30, None]].
+
+    Returns:
+        (:obj:`Condition`): Equivalent condition.
+
+    Raises:
+        ValueError: If data isn't a valid condition.
+    """
+    if not isinstance(data, list) or not data:
+        raise ValueError("Conditions are non-empty lists, not {!r}".format(data))
+    kind, args = data[0], data[1:]
+    try:
+        if kind == "date":
+            start, end = (datetime.strptime(value, "%d/%m/%Y") for value in args)
+            return DateRange(start, end)
+        if kind == "time":
+            min_minutes, max_minutes = args
+            if not isinstance(min_minutes, int) or not isinstance(
+                max_minutes, (int, type(None))
+            ):
+                raise ValueError("time spent bounds must be whole minutes")
+            return TimeSpent(min_minutes, max_minutes)
+        if kind == "text":
+            (text,) = args
+            if not isinstance(text, str):
+                raise ValueError("text must be a string")
+            return TextContains(text)
+        if kind == "regex":
+            pattern, flags = args
+            return RegexMatch(re.compile(pattern, flags))
+    except (TypeError, ValueError, re.error) as err:
+        raise ValueError("Invalid {} condition {!r}: {}".format(kind, args, err))
+    if kind == "and":
+        return And(*map(load_condition, args))
+    if kind == "or":
+        return Or(*map(load_condition, args))
+    raise ValueError("Unknown condition type {!r}".format(kind))
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class QueryCache:
+    """Bounded least recently used cache of query results.
+
+    Kept with a repository's indexes, so every added, edited or deleted Task
+    passes through add and remove. Only results whose query matched the
+    Task before or after the change are dropped.
+
+    Args:
+        tasks (:obj:`list` of :obj:`Task`): Unused, results are cached as queries run.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to run the query.
+
+    Notes:
+        Lookups from threads sharing a repository take turns, as marking an
+        entry most recently used reorders the entries.
+    """
+
+    fields = frozenset(["date", "title", "time_spent", "notes"])
+
+    maxsize = 128
+
+    def __init__(self, tasks=()):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Look up a cached result, marking it most recently used.
+
+        Args:
+            key (tuple): Condition key.
+
+        Returns:
+            (:obj:`QueryResult`): Cached result.
+            None: If the query isn't cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, condition, result):
+        """Cache a query result, evicting the least recently used if full.
+
+        Args:
+            key (tuple): Condition key.
+            condition (:obj:`Condition`): Query, kept to check later changes against.
+            result (:obj:`QueryResult`): Matching Tasks.
+        """
+        with self._lock:
+            self._entries[key] = (condition, result)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def add(self, task):
+        """Drop results a new or changed Task now belongs in.
+
+        Args:
+            task (:obj:`Task`): Task after the change.
+        """
+        self._discard_matching(task)
+
+    def remove(self, task):
+        """Drop results a removed or changing Task was part of.
+
+        Args:
+            task (:obj:`Task`): Task before the change.
+        """
+        self._discard_matching(task)
+
+    def _discard_matching(self, task):
+        """Drop results of every cached query the Task matches.
+
+        Args:
+            task (:obj:`Task`): Task to check.
+        """
+        with self._lock:
+            stale = [
+                key
+                for key, (condition, _) in self._entries.items()
+                if condition.matches(task)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop every cached result, keeping the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        """Report cache statistics, as functools.lru_cache does.
+
+        Returns:
+            (:obj:`CacheInfo`): Hits, misses, maxsize and current size.
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+
+def plan_query(repo, condition):
+    """Plan a query against a repository.
+
+    Args:
+        repo (:obj:`DataRepo`): Repository to query.
+        condition (:obj:`Condition`): Query to plan.
+
+    Returns:
+        (:obj:`Plan`): How the query will be run.
+    """
+    plan = condition.plan(repo)
+    if plan.rows is None:
+        plan.access = "scan in date order"
+        plan.ordered = True
+    return plan
+
+
+def scan_is_cheaper(repo, plan, wanted):
+    """Check whether a date order scan would find matches before an unordered plan.
+
+    Args:
+        repo (:obj:`DataRepo`): Repository queried.
+        plan (:obj:`Plan`): Unordered plan.
+        wanted (int): Matches needed before the scan could stop.
+
+    Returns:
+        (bool): True if scanning is estimated to be cheaper.
+    """
+    if not plan.estimate:
+        return False
+    scanned = wanted * len(repo.records) / plan.estimate
+    return scanned * plan.check_cost < plan.cost
+
+
+def _in_date_order(tasks):
+    """Yield Tasks in date order, only ordering them as far as they're read.
+
+    Args:
+        tasks (:obj:`iterable` of :obj:`Task`): Tasks in any order.
+
+    Yields:
+        (:obj:`Task`): Tasks by date, ties in the order given.
+    """
+    heap = [(task.date, number, task) for number, task in enumerate(tasks)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def _note_scan(repo, plan):
+    """Count a scan against the unbuilt indexes its conditions wanted.
+
+    Args:
+        repo (:obj:`DataRepo`): Repository scanned.
+        plan (:obj:`Plan`): Scanning plan.
+    """
+    if plan.index_wanted:
+        repo.note_scan(plan.index_wanted, len(repo.records) * plan.check_cost)
+    for child in plan.children:
+        _note_scan(repo, child)
+
+
+def run_plan(repo, plan):
+    """Find Tasks matching a planned query.
+
+    Args:
+        repo (:obj:`DataRepo`): Repository to query.
+        plan (:obj:`Plan`): Plan from plan_query.
+
+    Returns:
+        (:obj:`iterator` of :obj:`Task`): Matching Tasks in date order. Plans
+        that read rows in date order are checked one Task at a time as the
+        iterator advances. Other plans are run as a date order scan checking
+        each Task when that finds the first page sooner, otherwise their
+        rows are heaped and popped by date as they're read. Scans count
+        towards building the indexes their conditions wanted.
+    """
+    if plan.rows is None:
+        _note_scan(repo, plan)
+        return filter(plan.check, repo.iter_by_date_range())
+    if not plan.ordered and scan_is_cheaper(repo, plan, QueryResult.page_size):
+        return filter(plan.check, repo.iter_by_date_range())
+    if plan.ordered:
+        return iter(plan.rows())
+    return _in_date_order(plan.rows())
+
+
+def run_query(repo, condition):
+    """Find Tasks matching a query, reusing the repository's cached results.
+
+    Args:
+        repo (:obj:`DataRepo`): Repository to query.
+        condition (:obj:`Condition`): Query to run.
+
+    Returns:
+        (:obj:`QueryResult`): Matching Tasks in date order.
+    """
+    key = condition.key()
+    result = repo.query_cache.get(key)
+    if result is None:
+        result = QueryResult(repo, plan_query(repo, condition))
+        repo.query_cache.put(key, condition, result)
+    return result
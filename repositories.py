@@ -1,4 +1,51 @@
-from models import JSONStore, TaskSchema
+import glob
+import heapq
+import json
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from json import JSONDecodeError
+from marshmallow.exceptions import ValidationError
+from indexes import (
+    ColumnStore,
+    DateIndex,
+    TextIndex,
+    TimeSpentIndex,
+    TrigramIndex,
+)
+from models import (
+    FastTaskLoader,
+    JSONStore,
+    Snapshot,
+    SnapshotPositions,
+    SnapshotRecords,
+    SourceChanged,
+    Task,
+    TaskSchema,
+    WriteBehindStore,
+    atomic_write,
+    file_signature,
+)
+from queries import QueryCache
+
+# Ids of the Tasks another program added, changed and deleted, see check_for_changes.
+Merge = namedtuple("Merge", ["added", "changed", "deleted"])
+
+
+class ConflictError(ValidationError):
+    """Change refused or dropped because another program changed the same Task.
+
+    Args:
+        messages (dict): {task id: [message]} for each conflicting Task.
+        merge (:obj:`Merge`): Changes merged by the check that found the conflict.
+    """
+
+    def __init__(self, messages, merge=None):
+        super().__init__(messages)
+        self.merge = merge
 
 
 class DataRepo:
@@ -6,12 +53,245 @@ class DataRepo:
 
     Args:
         json_file (str): File name of JSON object.
+        store (:obj:`type`): Storage class, JSONStore, JournalStore or JSONLinesStore.
+        trusted (bool): Load records with FastTaskLoader instead of TaskSchema.
+        snapshot (bool): Keep a binary snapshot of records alongside json_file.
+        write_behind (bool): Write changes to the store on a background thread.
 
+    Attributes:
+        records (:obj:`list` of :obj:`Task`): Task objects loaded from store.
+        next_id (int): Id the next new Task will be given.
+        snapshot_file (str): Snapshot path, None if snapshots are off.
+        loaded (:obj:`threading.Event`): Set once records have finished loading.
+        date_index (:obj:`DateIndex`): Records sorted by date.
+        time_index (:obj:`TimeSpentIndex`): Records bucketed by time spent.
+        text_index (:obj:`TextIndex`): Records keyed by title and notes words.
+        trigram_index (:obj:`TrigramIndex`): Records keyed by title and notes trigrams.
+        columns (:obj:`ColumnStore`): Columnar copy of records for compound filters.
+        query_cache (:obj:`QueryCache`): Recent query results, dropped as matching records change.
+
+    Notes:
+        Indexes are built from records the first time a query needs them and
+        kept up to date by every change after that. Each keeps Tasks in
+        buckets or rows found by a dict lookup, so a change only touches the
+        changed Task's entries rather than shifting or searching the index.
+        Each record's serialised form is cached against its Task version, so
+        saves only re-serialise Tasks that changed since they were last written.
+        Every Task has an id stored with its record. Records keep the same
+        position in records and in the store, found by id, and a removed
+        record's place is taken by the last one, so edits and deletes don't
+        search for the Task.
+        While the store's file is unchanged since the snapshot was written,
+        records are read from the snapshot as they're used instead of
+        parsing and validating the whole file. The snapshot is rewritten on
+        flush once the file has changed.
+        With write_behind, adding, editing or deleting a Task returns once
+        the change is queued, see WriteBehindStore. Call flush before relying
+        on the store's file.
+        Another program can change the store's file while it's open, see
+        check_for_changes. Every change and flush checks first, and stores
+        refuse to write over a file that changed since they last read it.
     """
 
-    def __init__(self, json_file):
-        self.json_source = JSONStore(json_file)
+    def __init__(
+        self,
+        json_file,
+        store=JSONStore,
+        trusted=False,
+        snapshot=True,
+        write_behind=False,
+    ):
+        self.json_source = store(json_file)
+        if write_behind:
+            self.json_source = WriteBehindStore(self.json_source)
         self.data_schema = TaskSchema()
+        self.trusted = trusted
+        self.fast_loader = FastTaskLoader()
+        self.records = []
+        self.next_id = 1
+        self._positions = {}
+        self._serialized = {}
+        self._unsaved = {}
+        self.snapshot_file = None
+        if snapshot:
+            self.snapshot_file = "{}.snapshot".format(os.path.splitext(json_file)[0])
+        self._snapshot_source = None
+        self.loaded = threading.Event()
+        self.loaded.set()
+        self._load_error = None
+        self._scan_costs = {}
+
+    index_types = {
+        "date_index": DateIndex,
+        "time_index": TimeSpentIndex,
+        "text_index": TextIndex,
+        "trigram_index": TrigramIndex,
+        "columns": ColumnStore,
+        "query_cache": QueryCache,
+    }
+
+    # Readers sharing a server's lock can want the same index at once.
+    _index_lock = threading.RLock()
+
+    def __getattr__(self, name):
+        """Build an index named in index_types over current records on first use.
+        """
+        index_type = type(self).index_types.get(name)
+        if index_type is None:
+            raise AttributeError(name)
+        with self._index_lock:
+            if name in vars(self):
+                return vars(self)[name]
+            index = index_type(self.records)
+            setattr(self, name, index)
+        return index
+
+    @property
+    def indexes(self):
+        """In-memory indexes built so far, maintained alongside records."""
+        return [vars(self)[name] for name in self.index_types if name in vars(self)]
+
+    def index_built(self, name):
+        """Check whether an index named in index_types has been built yet.
+
+        Args:
+            name (str): Index attribute name.
+
+        Returns:
+            (bool): True if the index is in memory.
+        """
+        return name in vars(self)
+
+    def note_scan(self, name, cost):
+        """Count work a scan did that an index named in index_types would have saved.
+
+        Args:
+            name (str): Index attribute name.
+            cost (float): Relative cost of the scan's checks, in single Task checks.
+        """
+        self._scan_costs[name] = self._scan_costs.get(name, 0) + cost
+
+    def scan_cost(self, name):
+        """Total cost of scans an index would have saved, see note_scan.
+
+        Args:
+            name (str): Index attribute name.
+
+        Returns:
+            (float): Relative cost, in single Task checks.
+        """
+        return self._scan_costs.get(name, 0)
+
+    def _reset_indexes(self):
+        """Drop built indexes so they are rebuilt from current records when next used.
+        """
+        for name in self.index_types:
+            vars(self).pop(name, None)
+
+    def _index_task(self, task):
+        """Add a Task to every index.
+
+        Args:
+            task (:obj:`Task`): Task to index.
+        """
+        for index in self.indexes:
+            index.add(task)
+
+    def _unindex_task(self, task):
+        """Remove a Task from every index.
+
+        Args:
+            task (:obj:`Task`): Task to remove.
+        """
+        for index in self.indexes:
+            index.remove(task)
+
+    def _apply_changes(self, task, fields):
+        """Set validated field changes on a Task, reindexing affected fields.
+
+        Args:
+            task (:obj:`Task`): Task to modify.
+            fields (dict): Validated {field: content} changes.
+        """
+        affected = [
+            index for index in self.indexes if not index.fields.isdisjoint(fields)
+        ]
+        for index in affected:
+            index.remove(task)
+        for field, content in fields.items():
+            setattr(task, field, content)
+        for index in affected:
+            index.add(task)
+
+    def _assign_id(self, task):
+        """Give a Task the next unused id.
+
+        Args:
+            task (:obj:`Task`): New Task.
+        """
+        task.id = self.next_id
+        self.next_id += 1
+
+    def _number_records(self):
+        """Map ids to positions in records, numbering Tasks without a usable id.
+
+        Tasks from files written before ids were added have none, and a
+        hand edited file could repeat one. The first Task keeps a repeated id.
+
+        Returns:
+            (:obj:`list` of int): Positions of Tasks given a new id.
+        """
+        self._positions = {}
+        renumbered = []
+        for position, task in enumerate(self.records):
+            if task.id is None or task.id in self._positions:
+                renumbered.append(position)
+            else:
+                self._positions[task.id] = position
+        self.next_id = max(self.next_id, max(self._positions, default=0) + 1)
+        for position in renumbered:
+            self._assign_id(self.records[position])
+            self._positions[self.records[position].id] = position
+        return renumbered
+
+    def _append_record(self, task):
+        """Add a Task to records at the next position.
+
+        Args:
+            task (:obj:`Task`): Task with an id.
+        """
+        self._positions[task.id] = len(self.records)
+        self.records.append(task)
+
+    def _drop_record(self, task):
+        """Remove a Task from records, moving the last Task into its place.
+
+        Args:
+            task (:obj:`Task`): Task to remove.
+
+        Returns:
+            (int): Position the Task had.
+        """
+        position = self._positions.pop(task.id)
+        last = self.records.pop()
+        if last is not task:
+            self.records[position] = last
+            self._positions[last.id] = position
+        return position
+
+    def get_record(self, task_id):
+        """Look up a Task by id.
+
+        Args:
+            task_id (int): Task id.
+
+        Returns:
+            :obj:`Task`: Task with that id.
+
+        Raises:
+            KeyError: If no Task has the id.
+        """
+        return self.records[self._positions[task_id]]
 
     def get_records(self):
         """Load and validate on disk JSON data then deserialise.
@@ -19,8 +299,137 @@ class DataRepo:
         Returns:
             :obj:`list` of :obj:`Task`: Task object(s) representing each available Task record.
 
+        Notes:
+            Streaming stores load on a background thread, the returned list
+            fills as records are validated. Call wait_until_loaded before
+            relying on it. Trusted repositories skip TaskSchema for the
+            precompiled checks in FastTaskLoader. Records without an id are
+            numbered and the store saved once. A current snapshot replaces
+            all of this, its records are decoded as they're used.
+        """
+        snapshot = self._open_snapshot()
+        if snapshot is not None:
+            self.records = SnapshotRecords(snapshot)
+            self._positions = SnapshotPositions(snapshot)
+            self.next_id = snapshot.next_id
+            self._serialized = {}
+            self._snapshot_source = snapshot.source
+            self.json_source.signature = snapshot.source
+            self._reset_indexes()
+            return self.records
+        if self.json_source.streaming:
+            self.records = []
+            self.loaded.clear()
+            threading.Thread(target=self._stream_records, daemon=True).start()
+            return self.records
+        if self.trusted:
+            self.records = self.fast_loader.load_many(self.json_source.data)
+        else:
+            self.records = self.data_schema.load(self.json_source.data, many=True)
+        self._serialized = {
+            task: (task.version, record)
+            for task, record in zip(self.records, self.json_source.data)
+        }
+        renumbered = self._number_records()
+        for position in renumbered:
+            self.json_source.data[position]["id"] = self.records[position].id
+        if renumbered:
+            self.json_source.save()
+        self._reset_indexes()
+        self.write_snapshot()
+        return self.records
+
+    def _open_snapshot(self):
+        """Open the snapshot if it matches the store's file as it is now.
+
+        Returns:
+            (:obj:`Snapshot`): Current snapshot.
+            None: If snapshots are off, or the snapshot is missing, unreadable or out of date.
+        """
+        if not self.snapshot_file:
+            return None
+        source = file_signature(self.json_source.source_file)
+        try:
+            snapshot = Snapshot(self.snapshot_file)
+        except (OSError, ValueError):
+            return None
+        if source is None or snapshot.source != source:
+            snapshot.close()
+            return None
+        return snapshot
+
+    def write_snapshot(self):
+        """Write records to the snapshot if the store's file changed since it was written.
+
+        Notes:
+            Records must match the store's file, so call after the store has
+            saved, as flush does.
         """
-        return self.data_schema.load(self.json_source.data, many=True)
+        if not self.snapshot_file or not self.loaded.is_set() or self._load_error:
+            return
+        source = file_signature(self.json_source.source_file)
+        if source is None or source == self._snapshot_source:
+            return
+        Snapshot.write(
+            self.snapshot_file,
+            self.records,
+            self.next_id,
+            source,
+            getattr(self.json_source, "fsync", True),
+        )
+        self._snapshot_source = source
+
+    def _stream_records(self):
+        """Validate records one at a time as the store parses them.
+
+        Notes:
+            Any JSONDecodeError or ValidationError is kept for
+            wait_until_loaded to raise. Validation errors are keyed by record
+            position, as with a full schema load.
+        """
+        load = self.fast_loader.load if self.trusted else self.data_schema.load
+        self.json_source.signature = file_signature(self.json_source.source_file)
+        try:
+            for position, record in enumerate(self.json_source.iter_records()):
+                try:
+                    self.records.append(load(record))
+                except ValidationError as err:
+                    raise ValidationError({position: err.messages})
+            if self._number_records():
+                self.json_source.data = [self._serialize(task) for task in self.records]
+                self.json_source.save()
+            self._reset_indexes()
+            self.write_snapshot()
+        except (JSONDecodeError, ValidationError) as err:
+            self._load_error = err
+        finally:
+            self.loaded.set()
+
+    def wait_until_loaded(self):
+        """Block until records have finished loading.
+
+        Raises:
+            JSONDecodeError: If the store held invalid JSON.
+            ValidationError: If a record failed schema validation.
+        """
+        self.loaded.wait()
+        if self._load_error:
+            raise self._load_error
+
+    def _serialize(self, task):
+        """Serialise a Task, reusing the cached form if it hasn't changed.
+
+        Args:
+            task (:obj:`Task`): Task to serialise.
+
+        Returns:
+            (dict): Serialised task.
+        """
+        cached = self._serialized.get(task)
+        if cached is None or cached[0] != task.version:
+            cached = (task.version, self.fast_loader.dump(task))
+            self._serialized[task] = cached
+        return cached[1]
 
     def validate_fields(self, fields):
         """Validate an incomplete list of field values for edits.
@@ -30,7 +439,12 @@ class DataRepo:
 
         Returns:
             :obj:`dict`: If valid, {field: content}
+
+        Raises:
+            ValidationError: If a field is invalid or is the Task id.
         """
+        if "id" in fields:
+            raise ValidationError({"id": ["Task ids can't be changed."]})
         return self.data_schema.load(fields, partial=True)
 
     def add_record(self, data):
@@ -43,19 +457,1219 @@ class DataRepo:
             :obj:`Task`: New Task object for added task.
         """
         record_obj = self.data_schema.load(data)
-        self.json_source.data.append(self.data_schema.dump(record_obj))
-        self.json_source.save()
+        self.check_for_changes()
+        self._assign_id(record_obj)
+        self._add_task(record_obj)
+        return record_obj
+
+    def _add_task(self, task):
+        """Store and index a new Task.
+
+        Args:
+            task (:obj:`Task`): Task with an unused id.
+        """
+        self._unsaved.setdefault(task.id, None)
+        self._append_record(task)
+        self._index_task(task)
+        self._write(self.json_source.append, self._serialize(task))
+        self._forget_saved()
+
+    def _write(self, change, *args):
+        """Pass a change to the store, merging if another program just changed its file.
+
+        The change is already made to records and noted as unsaved, so a
+        store refusing to write it over the changed file has it replayed by
+        the merge instead.
+
+        Args:
+            change (:obj:`method`): Store method making the change, e.g. append.
+            *args: Arguments to change.
+        """
+        try:
+            change(*args)
+        except SourceChanged:
+            with getattr(self.json_source, "paused", nullcontext)():
+                self._merge_source()
+
+    def import_records(self, rows, batch_size=10000):
+        """Validate and add many records, saving them in a single write.
+
+        Args:
+            rows (iterable of (int, dict)): Line numbers and records, a record
+                may be a ValidationError for rows that couldn't be parsed.
+            batch_size (int): Number of rows to validate at a time.
+
+        Returns:
+            (:obj:`list` of :obj:`Task`, dict): Imported Tasks and
+            {line number: {field: [message]}} errors for rows that were skipped.
+
+        Notes:
+            Imported Tasks are always given new ids, ids in the rows may
+            belong to another log.
+        """
+        self.check_for_changes()
+        imported = []
+        errors = {}
+        batch = []
+        for line_number, record in rows:
+            if isinstance(record, ValidationError):
+                errors[line_number] = record.messages
+                continue
+            batch.append((line_number, record))
+            if len(batch) >= batch_size:
+                self._import_batch(batch, imported, errors)
+                batch = []
+        self._import_batch(batch, imported, errors)
+        if imported:
+            for task in imported:
+                self._assign_id(task)
+            self._store_imported(imported)
+            for task in imported:
+                self._append_record(task)
+            self._reset_indexes()
+        return imported, errors
+
+    def _import_batch(self, batch, imported, errors):
+        """Validate one batch of import rows with the full schema.
+
+        Args:
+            batch (:obj:`list` of (int, dict)): Line numbers and records.
+            imported (:obj:`list` of :obj:`Task`): Valid Tasks found so far.
+            errors (dict): Errors found so far, keyed by line number.
+
+        Notes:
+            Rows come from outside the app, so they aren't trusted to
+            FastTaskLoader. Tasks for the valid rows of a batch with errors
+            are built from the data the schema already validated.
+        """
+        try:
+            imported.extend(
+                self.data_schema.load([record for _, record in batch], many=True)
+            )
+        except ValidationError as err:
+            for position, messages in err.messages.items():
+                errors[batch[position][0]] = messages
+            imported.extend(
+                self.data_schema.make_task(err.valid_data[position])
+                for position in range(len(batch))
+                if position not in err.messages
+            )
+
+    def _store_imported(self, tasks):
+        """Persist imported Tasks in one write.
+
+        Args:
+            tasks (:obj:`list` of :obj:`Task`): Validated new Tasks.
+        """
+        self.json_source.extend([self._serialize(task) for task in tasks])
+        self._unsaved.update((task.id, None) for task in tasks)
+        self._forget_saved()
+
+    def _held(self, task):
+        """Check a Task is still the one held for its id.
+
+        Args:
+            task (:obj:`Task`): Task to look for.
+
+        Returns:
+            (bool): False if another program deleted it, or replaced it when
+            merged with a Task it added under the same id.
+        """
+        return task.id in self._positions and self.get_record(task.id) is task
+
+    def update_record(self, task, fields):
+        """Apply validated field changes to a Task and save that record.
+
+        Args:
+            task (:obj:`Task`): Task to modify.
+            fields (dict): Validated {field: content} changes.
+
+        Raises:
+            ConflictError: If another program deleted the Task, or changed it
+                since it was last checked for changes.
+        """
+        merge = self.check_for_changes()
+        if not self._held(task):
+            raise ConflictError({task.id: ["Deleted by another program."]}, merge)
+        if merge is not None and task.id in merge.changed:
+            raise ConflictError(
+                {task.id: ["Changed by another program, check it and edit again."]},
+                merge,
+            )
+        self._update_task(task, fields)
+
+    def _update_task(self, task, fields):
+        """Apply validated field changes to a held Task and store its record.
+
+        Args:
+            task (:obj:`Task`): Task to modify.
+            fields (dict): Validated {field: content} changes.
+        """
+        self._unsaved.setdefault(task.id, self._serialize(task))
+        self._apply_changes(task, fields)
+        self._write(
+            self.json_source.replace, self._positions[task.id], self._serialize(task)
+        )
+        self._forget_saved()
+
+    def delete_record(self, task):
+        """Remove a Task and its stored record, if another program hasn't already.
+
+        Args:
+            task (:obj:`Task`): Task to remove.
+
+        Raises:
+            ConflictError: If another program changed the Task since it was
+                last checked for changes.
+        """
+        merge = self.check_for_changes()
+        if not self._held(task):
+            return
+        if merge is not None and task.id in merge.changed:
+            raise ConflictError(
+                {task.id: ["Changed by another program, check it before deleting."]},
+                merge,
+            )
+        self._delete_task(task)
+
+    def _delete_task(self, task):
+        """Remove a held Task and its stored record.
+
+        Args:
+            task (:obj:`Task`): Task to remove.
+        """
+        self._unsaved.setdefault(task.id, self._serialize(task))
+        position = self._drop_record(task)
+        self._unindex_task(task)
+        self._serialized.pop(task, None)
+        self._write(self.json_source.remove, position)
+        self._forget_saved()
+
+    def _forget_saved(self):
+        """Stop tracking unsaved changes once the store has written them all.
+        """
+        if self._unsaved and not self.json_source.pending:
+            self._unsaved = {}
+
+    def source_changed(self):
+        """Check whether the store's file may have changes to merge, without merging.
+
+        Returns:
+            (bool): True if check_for_changes should be called.
+        """
+        if not self.loaded.is_set() or self._load_error:
+            return False
+        return file_signature(self.json_source.source_file) != (
+            self.json_source.signature
+        )
+
+    def check_for_changes(self):
+        """Merge changes another program made to the store's file.
+
+        A file changed since the store last read or wrote it is noticed by its
+        inode, size and modification time.
+        It's parsed again, but only records that differ from the Tasks held
+        are validated, reindexed and stored in place. Changes made here but
+        not yet saved, batched or queued by the store, are then made again on
+        top unless the other program changed the same Task.
+
+        Returns:
+            (:obj:`Merge`): Ids of Tasks the other program added, changed and deleted.
+            None: If the file hasn't changed, or records haven't finished loading.
+
+        Raises:
+            ConflictError: If changes not saved here were to Tasks the other
+                program also changed or deleted. Its version is kept and
+                everything else is merged.
+            ValidationError: If the changed file can't be parsed or holds an
+                invalid record, nothing is merged and writes are refused.
+        """
+        if not self.loaded.is_set() or self._load_error:
+            return None
+        with getattr(self.json_source, "paused", nullcontext)():
+            self._forget_saved()
+            signature = file_signature(self.json_source.source_file)
+            if signature == self.json_source.signature:
+                return None
+            return self._merge_source()
+
+    def _changed_fields(self, task, other):
+        """Find the fields another version of a Task has different values for.
+
+        Args:
+            task (:obj:`Task`): Task held.
+            other (:obj:`Task`): Other version of it.
+
+        Returns:
+            (dict): {field: content} from other where it differs.
+        """
+        return {
+            field: getattr(other, field)
+            for field in Task.fields
+            if getattr(other, field) != getattr(task, field)
+        }
+
+    def _merge_source(self):
+        """Bring records in line with the store's file, then replay unsaved changes.
+
+        Returns:
+            (:obj:`Merge`): Ids of Tasks the other program added, changed and deleted.
+
+        Raises:
+            ConflictError: If an unsaved change conflicts, see check_for_changes.
+            ValidationError: If the file can't be parsed or holds an invalid record.
+        """
+        try:
+            signature, file_records = self.json_source.read_source()
+        except JSONDecodeError as err:
+            raise ValidationError(
+                {"_schema": ["Task file changed by another program: {}".format(err)]}
+            )
+        # A Task added here but not saved isn't the other program's Task
+        # with the same id, it's given a new id when replayed.
+        unsaved_adds = {task_id for task_id, base in self._unsaved.items() if not base}
+        unchecked = {}
+        moved = {}
+        for position, record in enumerate(file_records):
+            if position < len(self.records) and (
+                self._serialize(self.records[position]) == record
+            ):
+                continue
+            # Records shifted along by an insert or delete match a Task
+            # held under their id, and needn't be validated again.
+            try:
+                held = self._positions.get(record["id"])
+            except (KeyError, TypeError):
+                held = None
+            if (
+                held is not None
+                and record["id"] not in unsaved_adds
+                and self._serialize(self.records[held]) == record
+            ):
+                moved[position] = self.records[held]
+            else:
+                unchecked[position] = record
+
+        ours = {}
+        for task_id in self._unsaved:
+            task = self.get_record(task_id) if task_id in self._positions else None
+            ours[task_id] = (task, task and self._serialize(task))
+        moving = set(unchecked).union(
+            moved, range(len(file_records), len(self.records))
+        )
+        displaced = {
+            self.records[position].id: self.records[position]
+            for position in moving
+            if position < len(self.records)
+        }
+        placed = {}
+        for position, task in moved.items():
+            if displaced.pop(task.id, None) is task:
+                placed[position] = task
+            else:
+                # Copied to a second position, or the Task didn't move.
+                unchecked[position] = file_records[position]
+        load = self.fast_loader.load if self.trusted else self.data_schema.load
+        loaded = {}
+        for position, record in sorted(unchecked.items()):
+            try:
+                loaded[position] = load(record)
+            except ValidationError as err:
+                raise ValidationError({position: err.messages})
+        placed_ids = {task.id for task in placed.values()}
+        added = []
+        changed = []
+        for position, task in loaded.items():
+            current = None
+            if task.id not in unsaved_adds:
+                current = displaced.pop(task.id, None)
+            if current is not None:
+                fields = self._changed_fields(current, task)
+                if fields:
+                    self._apply_changes(current, fields)
+                    changed.append(current)
+                task = current
+            else:
+                held = None if task.id is None else self._positions.get(task.id)
+                if task.id in placed_ids or (held is not None and held not in moving):
+                    task.id = None
+                added.append(task)
+            placed[position] = task
+            placed_ids.add(task.id)
+        deleted = list(displaced.values())
+        for task in deleted:
+            self._unindex_task(task)
+            self._serialized.pop(task, None)
+            del self._positions[task.id]
+
+        for position, task in sorted(placed.items()):
+            if position < len(self.records):
+                self.records[position] = task
+            else:
+                self.records.append(task)
+        while len(self.records) > len(file_records):
+            self.records.pop()
+        renumbered = []
+        for position, task in placed.items():
+            if task.id is None:
+                renumbered.append(position)
+            else:
+                self._positions[task.id] = position
+                self._serialized[task] = (task.version, file_records[position])
+        self.next_id = max(
+            [self.next_id] + [task.id + 1 for task in placed.values() if task.id]
+        )
+        for position in renumbered:
+            self._assign_id(self.records[position])
+            self._positions[self.records[position].id] = position
+        for task in added:
+            self._index_task(task)
+        self.json_source.reloaded(signature, file_records)
+        for position in renumbered:
+            self.json_source.replace(position, self._serialize(self.records[position]))
+
+        unsaved, self._unsaved = self._unsaved, {}
+        merge = Merge(
+            {task.id for task in added} - unsaved.keys(),
+            {task.id for task in changed} - unsaved.keys(),
+            {task.id for task in deleted} - unsaved.keys(),
+        )
+        conflicts = {}
+        for task_id, base in unsaved.items():
+            task, mine = ours[task_id]
+            current = self.get_record(task_id) if task_id in self._positions else None
+            theirs = current and self._serialize(current)
+            if theirs == mine or (task is None and base is None):
+                # Unchanged, or added here and deleted again before saving.
+                continue
+            if theirs != base and base is not None:
+                conflicts[task_id] = [
+                    "{} by another program before changes here were saved.".format(
+                        "Deleted" if current is None else "Changed"
+                    )
+                ]
+            elif theirs != base:
+                # Both added a Task under the same id, the other program's keeps it.
+                self._assign_id(task)
+                self._add_task(task)
+            elif mine is None:
+                self._delete_task(current)
+            elif current is None:
+                self._add_task(task)
+            else:
+                self._update_task(
+                    current, self._changed_fields(current, self.fast_loader.load(mine))
+                )
+        if conflicts:
+            raise ConflictError(conflicts, merge)
+        return merge
+
+    def flush(self):
+        """Write out any changes the store is batching, then the snapshot.
+
+        Raises:
+            ConflictError: If another program changed Tasks with unsaved
+                changes, see check_for_changes. The rest are written by
+                flushing again.
+        """
+        while True:
+            self.check_for_changes()
+            try:
+                self.json_source.flush()
+                break
+            except SourceChanged:
+                # Changed again since the check, merge that too.
+                if not self.loaded.is_set():
+                    raise
+        self._forget_saved()
+        self.write_snapshot()
+
+    def export(self, json_file):
+        """Write every Task to a plain JSON task file, as tasks.json is stored.
+
+        Args:
+            json_file (str): File to write, replaced if it exists.
+
+        Returns:
+            (int): Number of Tasks written.
+
+        Notes:
+            Changes are flushed first. Stores with their own export, i.e.
+            JournalStore, write the file themselves.
+        """
+        self.flush()
+        store = getattr(self, "json_source", None)
+        export = getattr(getattr(store, "store", store), "export", None)
+        if export is not None:
+            export(json_file)
+        else:
+            records = [self.fast_loader.dump(task) for task in self.records]
+            with atomic_write(json_file) as data_file:
+                data_file.write(json.dumps(records))
+        return len(self.records)
+
+    def find_by_date_range(self, start_stamp, end_stamp):
+        """Find Tasks dated within a range of timestamps.
+
+        Args:
+            start_stamp (float): Earliest timestamp, inclusive.
+            end_stamp (float): Latest timestamp, inclusive.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks in date order.
+        """
+        return self.date_index.range(start_stamp, end_stamp)
+
+    def iter_by_date_range(self, start_stamp=None, end_stamp=None):
+        """Iterate Tasks in date order as they are read from the date index.
+
+        Args:
+            start_stamp (float): Earliest timestamp, inclusive, or None for no lower bound.
+            end_stamp (float): Latest timestamp, inclusive, or None for no upper bound.
+
+        Returns:
+            :obj:`iterator` of :obj:`Task`: Matching Tasks in date order.
+        """
+        return self.date_index.iter_range(start_stamp, end_stamp)
+
+    def find_by_time_spent(self, minutes):
+        """Find Tasks with an exact time spent.
+
+        Args:
+            minutes (int): Time spent in minutes.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks.
+        """
+        return self.time_index.exact(minutes)
+
+    def find_by_time_range(self, min_minutes, max_minutes=None):
+        """Find Tasks with time spent within a range.
+
+        Args:
+            min_minutes (int): Least time spent, inclusive.
+            max_minutes (int): Most time spent, inclusive, or None for no upper bound.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks.
+        """
+        return self.time_index.range(min_minutes, max_minutes)
+
+    def find_by_filters(
+        self, start_date=None, end_date=None, min_minutes=None, max_minutes=None
+    ):
+        """Find Tasks matching a date range and time spent range together.
+
+        Args:
+            start_date (:obj:`datetime.date`): Earliest date, inclusive.
+            end_date (:obj:`datetime.date`): Latest date, inclusive.
+            min_minutes (int): Least time spent, inclusive.
+            max_minutes (int): Most time spent, inclusive.
+
+        Returns:
+            :obj:`indexes.TaskRows`: Matching Tasks in date order, looked up as read.
+        """
+        return self.columns.filter(start_date, end_date, min_minutes, max_minutes)
+
+    def count_by_date_range(self, start_stamp, end_stamp):
+        """Count Tasks dated within a range of timestamps.
+
+        Args:
+            start_stamp (float): Earliest timestamp, inclusive.
+            end_stamp (float): Latest timestamp, inclusive.
+
+        Returns:
+            (int): Number of matching Tasks.
+        """
+        return self.date_index.count(start_stamp, end_stamp)
+
+    def count_by_time_range(self, min_minutes, max_minutes=None):
+        """Count Tasks with time spent within a range.
+
+        Args:
+            min_minutes (int): Least time spent, inclusive.
+            max_minutes (int): Most time spent, inclusive, or None for no upper bound.
+
+        Returns:
+            (int): Number of matching Tasks.
+        """
+        return self.time_index.count(min_minutes, max_minutes)
+
+    def filter_cost(self):
+        """Relative cost of a find_by_filters call, in single Task checks.
+
+        Returns:
+            (float): Estimated cost.
+        """
+        return len(self.records) * ColumnStore.row_cost
+
+    def text_candidates(self, text):
+        """Narrow down Tasks whose title or notes could contain text.
+
+        Args:
+            text (str): Lowercase search text.
+
+        Returns:
+            (set of :obj:`Task`): Candidate Tasks, or None if text has no words to look up.
+        """
+        return self.text_index.candidates(text)
+
+    def regex_candidates(self, pattern):
+        """Narrow down Tasks whose title or notes could match a regular expression.
+
+        Args:
+            pattern (:obj:`re.Pattern`): Compiled regular expression.
+
+        Returns:
+            (set of :obj:`Task`): Candidate Tasks, or None if pattern has no usable literals.
+        """
+        return self.trigram_index.candidates(pattern)
+
+
+class SQLiteRepo(DataRepo):
+    """Repository backed by an indexed SQLite database.
+
+    Args:
+        db_file (str): Path to SQLite database file.
+        json_file (str): Optional JSON task file to migrate from when the database is empty.
+
+    Attributes:
+        records (:obj:`list` of :obj:`Task`): Task objects loaded from the database.
+        text_index (:obj:`TextIndex`): Records keyed by title and notes words.
+        trigram_index (:obj:`TrigramIndex`): Records keyed by title and notes trigrams.
+        query_cache (:obj:`QueryCache`): Recent query results, dropped as matching records change.
+
+    Notes:
+        Date and time spent queries use the database's own indexes, so only
+        the text indexes are kept in memory. Task ids are row ids.
+    """
+
+    def __init__(self, db_file, json_file=None):
+        self.db_file = db_file
+        # A server answers requests on their own threads, reads sharing the
+        # repository under its lock, so the connection is shared. sqlite3
+        # serialises calls on a connection.
+        self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        self.data_schema = TaskSchema()
+        self.fast_loader = FastTaskLoader()
+        self.records = []
+        self.next_id = 1
+        self._positions = {}
+        self.loaded = threading.Event()
+        self.loaded.set()
+        self._load_error = None
+        self._scan_costs = {}
+        with self.connection:
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    date TEXT NOT NULL,
+                    date_stamp INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    time_spent INTEGER NOT NULL,
+                    notes TEXT NOT NULL DEFAULT ''
+                );
+                CREATE INDEX IF NOT EXISTS tasks_date ON tasks (date_stamp);
+                CREATE INDEX IF NOT EXISTS tasks_time_spent ON tasks (time_spent);
+                CREATE INDEX IF NOT EXISTS tasks_title ON tasks (title);
+                """
+            )
+        if json_file and not self._row_count():
+            self.migrate_json(json_file)
+
+    index_types = {
+        "text_index": TextIndex,
+        "trigram_index": TrigramIndex,
+        "query_cache": QueryCache,
+    }
+
+    def _row_count(self):
+        """Count stored task rows.
+
+        Returns:
+            (int): Number of rows in tasks table.
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def _row_values(self, task):
+        """Serialise a Task into column values.
+
+        Args:
+            task (:obj:`Task`): Task to serialise.
+
+        Returns:
+            (tuple): date, date_stamp, title, time_spent and notes column values.
+        """
+        record = self.fast_loader.dump(task)
+        return (
+            record["date"],
+            int(task.date.timestamp()),
+            record["title"],
+            record["time_spent"],
+            record.get("notes", ""),
+        )
+
+    def _assign_id(self, task):
+        """Clear a new Task's id, the database assigns one when it is inserted.
+
+        Args:
+            task (:obj:`Task`): New Task.
+        """
+        task.id = None
+
+    def _insert(self, task):
+        """Insert a Task row, keeping its id or taking the row id as its id.
+
+        Args:
+            task (:obj:`Task`): Task to insert.
+        """
+        cursor = self.connection.execute(
+            "INSERT INTO tasks (id, date, date_stamp, title, time_spent, notes) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (task.id,) + self._row_values(task),
+        )
+        task.id = cursor.lastrowid
+
+    def _tasks_for(self, query, params):
+        """Map the ids returned by a query to loaded Task objects.
+
+        Args:
+            query (str): SQL selecting task ids.
+            params (tuple): Query parameters.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks in query order.
+        """
+        return [
+            self.get_record(row_id)
+            for (row_id,) in self.connection.execute(query, params)
+        ]
+
+    def migrate_json(self, json_file):
+        """One-shot import of an existing JSON task file.
+
+        Args:
+            json_file (str): Path to JSON task file.
+
+        Raises:
+            ValidationError: If any JSON record fails schema validation.
+
+        Notes:
+            Record ids are kept as row ids, records without one or repeating
+            one are given the next row id.
+        """
+        records = [
+            dict({"notes": ""}, **record) for record in JSONStore(json_file).data
+        ]
+        tasks = self.data_schema.load(records, many=True)
+        taken = set()
+        for task in tasks:
+            if task.id in taken:
+                task.id = None
+            taken.add(task.id)
+        with self.connection:
+            for task in sorted(tasks, key=lambda task: task.id is None):
+                self._insert(task)
+
+    def _store_imported(self, tasks):
+        """Insert imported Tasks in one transaction.
+
+        Args:
+            tasks (:obj:`list` of :obj:`Task`): Validated new Tasks.
+        """
+        with self.connection:
+            for task in tasks:
+                self._insert(task)
+
+    def get_records(self):
+        """Load and validate stored rows then deserialise.
+
+        Rows were written by this repository, so they load through
+        FastTaskLoader rather than TaskSchema.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Task object(s) representing each available Task record.
+        """
+        rows = self.connection.execute(
+            "SELECT id, date, title, time_spent, notes FROM tasks ORDER BY id"
+        ).fetchall()
+        row_data = [
+            {
+                "id": row_id,
+                "date": date,
+                "title": title,
+                "time_spent": time_spent,
+                "notes": notes,
+            }
+            for row_id, date, title, time_spent, notes in rows
+        ]
+        self.records = self.fast_loader.load_many(row_data)
+        self._number_records()
+        self._reset_indexes()
+        return self.records
+
+    def add_record(self, data):
+        """Create new Task record and insert into the database.
+
+        Args:
+            data (dict): {field: content} task data for serialisation and object mapping.
+
+        Returns:
+            :obj:`Task`: New Task object for added task.
+        """
+        record_obj = self.data_schema.load(data)
+        self._assign_id(record_obj)
+        with self.connection:
+            self._insert(record_obj)
+        self._append_record(record_obj)
+        self._index_task(record_obj)
         return record_obj
 
-    def save_changes(self, updated_collection):
-        """Flush data changes to disk.
+    def update_record(self, task, fields):
+        """Apply validated field changes to a Task and update its row.
 
         Args:
-            updated_collection (:obj:`list` of :obj:`Task`): Task controller's task list for serialisation.
+            task (:obj:`Task`): Task to modify.
+            fields (dict): Validated {field: content} changes.
+        """
+        self._apply_changes(task, fields)
+        with self.connection:
+            self.connection.execute(
+                "UPDATE tasks SET date = ?, date_stamp = ?, title = ?, "
+                "time_spent = ?, notes = ? WHERE id = ?",
+                self._row_values(task) + (task.id,),
+            )
+
+    def delete_record(self, task):
+        """Remove a Task and its row.
+
+        Args:
+            task (:obj:`Task`): Task to remove.
+        """
+        self._drop_record(task)
+        self._unindex_task(task)
+        with self.connection:
+            self.connection.execute("DELETE FROM tasks WHERE id = ?", (task.id,))
+
+    def flush(self):
+        """Nothing to do, every change is committed as it happens.
+        """
+
+    def source_changed(self):
+        """Nothing to merge, see check_for_changes.
+
+        Returns:
+            (bool): False.
+        """
+        return False
+
+    def check_for_changes(self):
+        """Nothing to merge, SQLite serialises writers to the database itself.
+
+        Returns:
+            None: Always.
+        """
+        return None
+
+    def find_by_date_range(self, start_stamp, end_stamp):
+        """Find Tasks dated within a range of timestamps using the date index.
+
+        Args:
+            start_stamp (float): Earliest timestamp, inclusive.
+            end_stamp (float): Latest timestamp, inclusive.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks in date order.
+        """
+        return self._tasks_for(
+            "SELECT id FROM tasks WHERE date_stamp BETWEEN ? AND ? ORDER BY date_stamp",
+            (start_stamp, end_stamp),
+        )
+
+    def iter_by_date_range(self, start_stamp=None, end_stamp=None):
+        """Iterate Tasks in date order as rows are read from the date index.
+
+        Args:
+            start_stamp (float): Earliest timestamp, inclusive, or None for no lower bound.
+            end_stamp (float): Latest timestamp, inclusive, or None for no upper bound.
+
+        Yields:
+            :obj:`Task`: Matching Tasks in date order.
+        """
+        clauses = []
+        params = []
+        for operator, value in ((">=", start_stamp), ("<=", end_stamp)):
+            if value is not None:
+                clauses.append("date_stamp {} ?".format(operator))
+                params.append(value)
+        where = " AND ".join(clauses) or "1"
+        cursor = self.connection.execute(
+            "SELECT id FROM tasks WHERE {} ORDER BY date_stamp".format(where),
+            tuple(params),
+        )
+        for (row_id,) in cursor:
+            # Rows deleted since the query started have no Task any more.
+            position = self._positions.get(row_id)
+            if position is not None:
+                yield self.records[position]
+
+    def find_by_time_spent(self, minutes):
+        """Find Tasks with an exact time spent using the time_spent index.
+
+        Args:
+            minutes (int): Time spent in minutes.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks in date order.
+        """
+        return self._tasks_for(
+            "SELECT id FROM tasks WHERE time_spent = ? ORDER BY date_stamp", (minutes,)
+        )
+
+    def find_by_time_range(self, min_minutes, max_minutes=None):
+        """Find Tasks with time spent within a range using the time_spent index.
+
+        Args:
+            min_minutes (int): Least time spent, inclusive.
+            max_minutes (int): Most time spent, inclusive, or None for no upper bound.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks in date order.
+        """
+        if max_minutes is None:
+            return self._tasks_for(
+                "SELECT id FROM tasks WHERE time_spent >= ? ORDER BY date_stamp",
+                (min_minutes,),
+            )
+        return self._tasks_for(
+            "SELECT id FROM tasks WHERE time_spent BETWEEN ? AND ? ORDER BY date_stamp",
+            (min_minutes, max_minutes),
+        )
+
+    def find_by_filters(
+        self, start_date=None, end_date=None, min_minutes=None, max_minutes=None
+    ):
+        """Find Tasks matching a date range and time spent range together.
+
+        Args:
+            start_date (:obj:`datetime.date`): Earliest date, inclusive.
+            end_date (:obj:`datetime.date`): Latest date, inclusive.
+            min_minutes (int): Least time spent, inclusive.
+            max_minutes (int): Most time spent, inclusive.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Matching Tasks in date order.
+        """
+        clauses = []
+        params = []
+        for column, operator, value in (
+            ("date_stamp", ">=", start_date and start_date.timestamp()),
+            ("date_stamp", "<=", end_date and end_date.timestamp()),
+            ("time_spent", ">=", min_minutes),
+            ("time_spent", "<=", max_minutes),
+        ):
+            if value is not None:
+                clauses.append("{} {} ?".format(column, operator))
+                params.append(value)
+        where = " AND ".join(clauses) or "1"
+        return self._tasks_for(
+            "SELECT id FROM tasks WHERE {} ORDER BY date_stamp".format(where),
+            tuple(params),
+        )
+
+    def _count(self, query, params):
+        """Run a COUNT query.
+
+        Args:
+            query (str): SQL counting task rows.
+            params (tuple): Query parameters.
+
+        Returns:
+            (int): Number of matching rows.
+        """
+        return self.connection.execute(query, params).fetchone()[0]
+
+    def count_by_date_range(self, start_stamp, end_stamp):
+        """Count Tasks dated within a range of timestamps using the date index.
+
+        Args:
+            start_stamp (float): Earliest timestamp, inclusive.
+            end_stamp (float): Latest timestamp, inclusive.
+
+        Returns:
+            (int): Number of matching Tasks.
+        """
+        return self._count(
+            "SELECT COUNT(*) FROM tasks WHERE date_stamp BETWEEN ? AND ?",
+            (start_stamp, end_stamp),
+        )
+
+    def count_by_time_range(self, min_minutes, max_minutes=None):
+        """Count Tasks with time spent within a range using the time_spent index.
+
+        Args:
+            min_minutes (int): Least time spent, inclusive.
+            max_minutes (int): Most time spent, inclusive, or None for no upper bound.
+
+        Returns:
+            (int): Number of matching Tasks.
+        """
+        if max_minutes is None:
+            return self._count(
+                "SELECT COUNT(*) FROM tasks WHERE time_spent >= ?", (min_minutes,)
+            )
+        return self._count(
+            "SELECT COUNT(*) FROM tasks WHERE time_spent BETWEEN ? AND ?",
+            (min_minutes, max_minutes),
+        )
+
+    def filter_cost(self):
+        """Relative cost of a find_by_filters call, in single Task checks.
+
+        Returns:
+            (float): Nothing beyond the matches, SQLite applies the filters
+            with its own indexes.
+        """
+        return 0
+
+
+def load_shard(shard_file, trusted=False):
+    """Parse and validate one shard file, run in a worker process.
+
+    Args:
+        shard_file (str): Path to JSON shard.
+        trusted (bool): Load with FastTaskLoader instead of TaskSchema.
+
+    Returns:
+        (:obj:`list` of :obj:`Task`, dict): Tasks in date order and None, or
+        None and validation error messages.
+
+    Raises:
+        JSONDecodeError: If the shard is not valid JSON, naming the shard.
+    """
+    try:
+        with open(shard_file, "r") as data_file:
+            data = json.load(data_file)
+    except JSONDecodeError as err:
+        raise JSONDecodeError(
+            "{} in shard {}".format(err.msg, shard_file), err.doc, err.pos
+        )
+    try:
+        if trusted:
+            tasks = FastTaskLoader().load_many(data)
+        else:
+            tasks = TaskSchema().load(data, many=True)
+    except ValidationError as err:
+        return None, err.messages
+    tasks.sort(key=lambda task: task.date)
+    return tasks, None
+
+
+class ShardedRepo(DataRepo):
+    """Repository spread over several JSON task files loaded in parallel.
+
+    Every *.json file in shard_dir is a shard in today's tasks.json format,
+    for example one per month or one per user. Shards are parsed and
+    validated in a process pool and merged in date order.
+
+    Args:
+        shard_dir (str): Directory of JSON shard files.
+        json_file (str): Optional JSON task file to split into monthly shards when shard_dir is missing.
+        trusted (bool): Load shards with FastTaskLoader instead of TaskSchema.
+        workers (int): Worker processes for loading, defaults to the CPU count.
+
+    Attributes:
+        records (:obj:`list` of :obj:`Task`): Task objects from every shard in date order.
+        shards (:obj:`dict`): Shard file path to its Tasks.
+
+    Notes:
+        New tasks go to the shard for their month. Edited tasks stay in the
+        shard they were loaded from, so per user layouts keep working.
+    """
+
+    def __init__(self, shard_dir, json_file=None, trusted=False, workers=None):
+        self.shard_dir = shard_dir
+        self.data_schema = TaskSchema()
+        self.trusted = trusted
+        self.fast_loader = FastTaskLoader()
+        self.workers = workers
+        self.records = []
+        self.next_id = 1
+        self._positions = {}
+        self._serialized = {}
+        self.shards = {}
+        self.shard_of = {}
+        self.loaded = threading.Event()
+        self.loaded.set()
+        self._load_error = None
+        self._scan_costs = {}
+        if not os.path.isdir(shard_dir):
+            os.makedirs(shard_dir)
+            if json_file and os.path.exists(json_file):
+                self.migrate_json(json_file)
+
+    def _shard_for(self, task):
+        """Shard file a new Task belongs in.
+
+        Args:
+            task (:obj:`Task`): Task to place.
+
+        Returns:
+            (str): Path of the monthly shard for the Task's date.
+        """
+        return os.path.join(self.shard_dir, "{:%Y-%m}.json".format(task.date))
+
+    def migrate_json(self, json_file):
+        """One-shot split of an existing JSON task file into monthly shards.
+
+        Args:
+            json_file (str): Path to JSON task file.
+
+        Raises:
+            ValidationError: If any JSON record fails schema validation.
 
         Notes:
-            Serialises Task objects to list of dicts in JSON object's data attribute.
-            Serialises to JSON on disk.
+            Records without an id, or repeating one, are numbered as on a
+            first load.
+        """
+        self.records = self.data_schema.load(JSONStore(json_file).data, many=True)
+        self._number_records()
+        for task in self.records:
+            shard_file = self._shard_for(task)
+            self.shards.setdefault(shard_file, []).append(task)
+            self.shard_of[task] = shard_file
+        for shard_file in self.shards:
+            self._write_shard(shard_file)
+
+    def _write_shard(self, shard_file):
+        """Serialise one shard's Tasks to disk.
+
+        Args:
+            shard_file (str): Path of shard to write.
+        """
+        with atomic_write(shard_file) as data_file:
+            data_file.write(
+                json.dumps(
+                    [self._serialize(task) for task in self.shards.get(shard_file, [])]
+                )
+            )
+
+    def get_records(self):
+        """Load and validate every shard in a process pool then merge by date.
+
+        Returns:
+            :obj:`list` of :obj:`Task`: Task object(s) representing each available Task record.
+
+        Raises:
+            ValidationError: With errors keyed by shard file.
+            JSONDecodeError: If a shard is not valid JSON.
+        """
+        shard_files = sorted(glob.glob(os.path.join(self.shard_dir, "*.json")))
+        trusted = [self.trusted] * len(shard_files)
+        if len(shard_files) > 1:
+            with ProcessPoolExecutor(self.workers) as pool:
+                results = list(pool.map(load_shard, shard_files, trusted))
+        else:
+            results = list(map(load_shard, shard_files, trusted))
+        errors = {
+            shard_file: messages
+            for shard_file, (_, messages) in zip(shard_files, results)
+            if messages
+        }
+        if errors:
+            raise ValidationError(errors)
+        self.shards = {
+            shard_file: tasks for shard_file, (tasks, _) in zip(shard_files, results)
+        }
+        self.shard_of = {
+            task: shard_file
+            for shard_file, tasks in self.shards.items()
+            for task in tasks
+        }
+        self.records = list(
+            heapq.merge(*self.shards.values(), key=lambda task: task.date)
+        )
+        renumbered = self._number_records()
+        touched = {self.shard_of[self.records[position]] for position in renumbered}
+        for shard_file in touched:
+            self._write_shard(shard_file)
+        self._reset_indexes()
+        return self.records
+
+    def add_record(self, data):
+        """Create new Task record and save its shard.
+
+        Args:
+            data (dict): {field: content} task data for serialisation and object mapping.
+
+        Returns:
+            :obj:`Task`: New Task object for added task.
+        """
+        record_obj = self.data_schema.load(data)
+        self._assign_id(record_obj)
+        shard_file = self._shard_for(record_obj)
+        self.shards.setdefault(shard_file, []).append(record_obj)
+        self.shard_of[record_obj] = shard_file
+        self._write_shard(shard_file)
+        self._append_record(record_obj)
+        self._index_task(record_obj)
+        return record_obj
+
+    def _store_imported(self, tasks):
+        """Add imported Tasks to their monthly shards, writing each shard once.
+
+        Args:
+            tasks (:obj:`list` of :obj:`Task`): Validated new Tasks.
+        """
+        touched = set()
+        for task in tasks:
+            shard_file = self._shard_for(task)
+            self.shards.setdefault(shard_file, []).append(task)
+            self.shard_of[task] = shard_file
+            touched.add(shard_file)
+        for shard_file in touched:
+            self._write_shard(shard_file)
+
+    def update_record(self, task, fields):
+        """Apply validated field changes to a Task and save its shard.
+
+        Args:
+            task (:obj:`Task`): Task to modify.
+            fields (dict): Validated {field: content} changes.
+        """
+        self._apply_changes(task, fields)
+        self._write_shard(self.shard_of[task])
+
+    def delete_record(self, task):
+        """Remove a Task and save its shard.
+
+        Args:
+            task (:obj:`Task`): Task to remove.
+        """
+        shard_file = self.shard_of.pop(task)
+        self.shards[shard_file].remove(task)
+        self._drop_record(task)
+        self._unindex_task(task)
+        self._serialized.pop(task, None)
+        self._write_shard(shard_file)
+
+    def flush(self):
+        """Nothing to do, every change rewrites its shard as it happens.
+        """
+
+    def source_changed(self):
+        """Nothing to merge, see check_for_changes.
+
+        Returns:
+            (bool): False.
+        """
+        return False
+
+    def check_for_changes(self):
+        """Shard files aren't watched for changes by other programs.
+
+        Returns:
+            None: Always.
         """
-        self.json_source.data = self.data_schema.dump(updated_collection, many=True)
-        self.json_source.save()
+        return None
@@ -0,0 +1,464 @@
+"""Local HTTP/JSON work log server.
+
+One repository is loaded and shared by every client, so readers reuse its
+records, indexes and cached query results instead of each loading the task
+file. Requests are answered on their own threads. Status, task lookups,
+searches and plans share the repository, while adds, edits, deletes and
+merging another program's changes take it alone, see ReadWriteLock. There
+is no connection pooling, each RemoteRepo keeps one kept-alive connection,
+so a user's requests arrive one at a time and concurrency comes from users.
+
+Routes, request and response bodies are JSON:
+    GET /status -> {"tasks": int}
+    POST /search {"query": condition, "offset": 0, "limit": 20, "count": false}
+        -> {"tasks": [task], "length": int or null, "estimate": int}
+    POST /explain {"query": condition} -> {"plan": [str]}
+    POST /tasks {field: value} -> {"task": task}
+    GET /tasks/<id> -> {"task": task}
+    PATCH /tasks/<id> {field: value} -> {"task": task}
+    DELETE /tasks/<id> -> {"deleted": id}
+
+Conditions are in the form Condition.dump gives, tasks as the task file
+stores them. Errors are {"errors": {field: [message]}}, with status 500 for
+an unexpected server error.
+
+PATCH and DELETE take an optional If-Match header holding the record_tag of
+the task as the client last read it. If the task has changed since, through
+another client or another program changing the task file, the change is
+refused with status 409. Without the header the last change wins.
+"""
+
+import gc
+import hashlib
+import json
+import re
+import signal
+import threading
+import traceback
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from marshmallow.exceptions import ValidationError
+import queries
+from controllers import TaskController
+from repositories import ConflictError
+
+TASK_PATH = re.compile(r"^/tasks/(\d+)$")
+
+
+def record_tag(record):
+    """Tag a version of a task, for If-Match headers.
+
+    Args:
+        record (dict): Task as the server sends it.
+
+    Returns:
+        (str): Hex digest of the record's JSON with sorted keys.
+    """
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode()).hexdigest()
+
+
+class RequestError(Exception):
+    """Request the server can't answer.
+
+    Args:
+        status (int): HTTP status to reply with.
+        errors (dict): {field: [message]} errors to report.
+    """
+
+    def __init__(self, status, errors):
+        super().__init__(errors)
+        self.status = status
+        self.errors = errors
+
+
+class ReadWriteLock:
+    """Lock shared by any number of readers or held by one writer.
+
+    Notes:
+        A waiting writer stops new readers taking the lock, so a steady
+        stream of searches can't hold changes off. Neither side is
+        reentrant, a thread holding the lock mustn't take it again.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def reading(self):
+        """Hold the lock alongside other readers for the block."""
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        """Hold the lock alone for the block."""
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class TaskRequestHandler(BaseHTTPRequestHandler):
+    """Answer one client connection's requests against the server's repository.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't hold the body back
+    # waiting for the client to acknowledge the headers.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Skip per-request logging, it costs more than answering small requests.
+        """
+
+    def _read_json(self):
+        """Parse the request body.
+
+        Returns:
+            Deserialised JSON, None for an empty body.
+
+        Raises:
+            RequestError: If the body isn't valid JSON.
+        """
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError as err:
+            raise RequestError(400, {"_schema": [str(err)]})
+
+    def _send_json(self, status, body):
+        """Reply with a JSON body, keeping the connection open unless it's closing.
+
+        Args:
+            status (int): HTTP status.
+            body: JSON serialisable reply.
+        """
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _dispatch(self, routes):
+        """Run the route matching the request path and send its reply.
+
+        Args:
+            routes (dict): {path: method} for fixed paths, "task" for /tasks/<id>.
+        """
+        try:
+            self._merge_changes()
+            match = TASK_PATH.match(self.path)
+            if match and "task" in routes:
+                status, body = routes["task"](int(match.group(1)))
+            elif self.path in routes:
+                status, body = routes[self.path]()
+            else:
+                raise RequestError(404, {"_schema": ["Unknown path."]})
+        except RequestError as err:
+            status, body = err.status, {"errors": err.errors}
+        except ConflictError as err:
+            status, body = 409, {"errors": err.messages}
+        except ValidationError as err:
+            status, body = 400, {"errors": err.messages}
+        except Exception as err:
+            # Reply rather than drop the connection, and report the error
+            # where the server was started, as socketserver does.
+            traceback.print_exc()
+            message = "Server error: {}".format(err)
+            status, body = 500, {"errors": {"_schema": [message]}}
+            # The request body may be unread, it can't be kept alive.
+            self.close_connection = True
+        self._send_json(status, body)
+
+    def _merge_changes(self):
+        """Merge changes another program made to the task file before answering.
+
+        Raises:
+            ValidationError: If the changed task file can't be read.
+        """
+        # Checked first without the lock, so requests only take it alone when
+        # there is something to merge.
+        if not self.server.data_repo.source_changed():
+            return
+        with self.server.lock.writing():
+            try:
+                self.server.data_repo.check_for_changes()
+            except ConflictError:
+                # The other program's versions are kept, and the queued
+                # changes they replace may not be this request's to report.
+                pass
+
+    def do_GET(self):
+        self._dispatch({"/status": self.status, "task": self.get_task})
+
+    def do_POST(self):
+        self._dispatch(
+            {"/search": self.search, "/explain": self.explain, "/tasks": self.add_task}
+        )
+
+    def do_PATCH(self):
+        self._dispatch({"task": self.update_task})
+
+    def do_DELETE(self):
+        self._dispatch({"task": self.delete_task})
+
+    def _request_query(self):
+        """Read the request's condition.
+
+        Returns:
+            (dict, :obj:`queries.Condition`): Request body and its query.
+
+        Raises:
+            RequestError: If the query is missing or invalid.
+        """
+        request = self._read_json()
+        if not isinstance(request, dict) or "query" not in request:
+            raise RequestError(400, {"query": ["Missing data for required field."]})
+        try:
+            return request, queries.load_condition(request["query"])
+        except ValueError as err:
+            raise RequestError(400, {"query": [str(err)]})
+
+    def _task(self, task_id):
+        """Find a Task by id, called holding the server's lock.
+
+        Args:
+            task_id (int): Task id.
+
+        Returns:
+            (:obj:`Task`): Task with the id.
+
+        Raises:
+            RequestError: If no Task has the id.
+        """
+        try:
+            return self.server.data_repo.get_record(task_id)
+        except KeyError:
+            raise RequestError(404, {"id": ["No task with id {}.".format(task_id)]})
+
+    def _check_unchanged(self, task):
+        """Refuse a change to a task that changed since the client read it.
+
+        Called holding the server's lock to write.
+
+        Args:
+            task (:obj:`Task`): Task to change.
+
+        Raises:
+            ConflictError: If the request's If-Match tag isn't the task's.
+        """
+        expected = self.headers.get("If-Match")
+        if expected is not None and expected.strip('"') != record_tag(self._dump(task)):
+            raise ConflictError(
+                {task.id: ["Changed since it was read, check it and try again."]}
+            )
+
+    def _dump(self, task):
+        """Serialise a Task for a reply, called holding the server's lock.
+
+        Args:
+            task (:obj:`Task`): Task to serialise.
+
+        Returns:
+            (dict): Task as the task file stores it.
+        """
+        return self.server.data_repo.fast_loader.dump(task)
+
+    def search(self):
+        """Read one page of a query's results.
+
+        Returns:
+            (int, dict): Status and page of matching tasks in date order.
+        """
+        request, condition = self._request_query()
+        offset = request.get("offset", 0)
+        limit = request.get("limit", queries.QueryResult.page_size)
+        for field, value in (("offset", offset), ("limit", limit)):
+            if not isinstance(value, int) or value < 0:
+                raise RequestError(400, {field: ["Not a valid page position."]})
+        with self.server.lock.reading():
+            result = self.server.controller.run_query(condition)
+            tasks = []
+            if result is None:
+                length, estimate = 0, 0
+            else:
+                for position in range(offset, offset + limit):
+                    try:
+                        tasks.append(self._dump(result[position]))
+                    except IndexError:
+                        break
+                length = len(result) if request.get("count") else result.known_length()
+                estimate = result.estimate
+        return 200, {"tasks": tasks, "length": length, "estimate": estimate}
+
+    def explain(self):
+        """Plan a query without running it.
+
+        Returns:
+            (int, dict): Status and lines of the plan, see Plan.explain.
+        """
+        _, condition = self._request_query()
+        with self.server.lock.reading():
+            plan = self.server.controller.plan_query(condition)
+        return 200, {"plan": plan.explain()}
+
+    def status(self):
+        """Report the server is up.
+
+        Returns:
+            (int, dict): Status and number of tasks held.
+        """
+        with self.server.lock.reading():
+            return 200, {"tasks": len(self.server.data_repo.records)}
+
+    def get_task(self, task_id):
+        """Read a task by id.
+
+        Args:
+            task_id (int): Task id.
+
+        Returns:
+            (int, dict): Status and task.
+        """
+        with self.server.lock.reading():
+            return 200, {"task": self._dump(self._task(task_id))}
+
+    def add_task(self):
+        """Validate and add a new task.
+
+        Returns:
+            (int, dict): Status and added task, with its id.
+
+        Raises:
+            ValidationError: If the task is invalid.
+        """
+        data = self._read_json()
+        with self.server.lock.writing():
+            return 201, {"task": self._dump(self.server.data_repo.add_record(data))}
+
+    def update_task(self, task_id):
+        """Validate and apply field changes to a task.
+
+        Args:
+            task_id (int): Task id.
+
+        Returns:
+            (int, dict): Status and changed task.
+
+        Raises:
+            ConflictError: If the task changed since the client read it.
+            ValidationError: If a field is invalid.
+        """
+        fields = self._read_json()
+        if not isinstance(fields, dict):
+            raise ValidationError({"_schema": ["Invalid input type."]})
+        valid_data = self.server.data_repo.validate_fields(fields)
+        with self.server.lock.writing():
+            task = self._task(task_id)
+            self._check_unchanged(task)
+            self.server.data_repo.update_record(task, valid_data)
+            return 200, {"task": self._dump(task)}
+
+    def delete_task(self, task_id):
+        """Remove a task.
+
+        Args:
+            task_id (int): Task id.
+
+        Returns:
+            (int, dict): Status and id of the removed task.
+
+        Raises:
+            ConflictError: If the task changed since the client read it.
+        """
+        with self.server.lock.writing():
+            task = self._task(task_id)
+            self._check_unchanged(task)
+            self.server.data_repo.delete_record(task)
+        return 200, {"deleted": task_id}
+
+
+class TaskServer(ThreadingHTTPServer):
+    """HTTP server sharing one loaded repository between its clients.
+
+    Args:
+        address ((str, int)): Host and port to listen on.
+        data_repo (:obj:`DataRepo`): Repository to serve, loaded before serving.
+
+    Attributes:
+        controller (:obj:`TaskController`): Runs queries against data_repo.
+        lock (:obj:`ReadWriteLock`): Held while a request reads or changes data_repo.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, data_repo):
+        self.data_repo = data_repo
+        self.controller = TaskController(data_repo)
+        self.controller.wait_for_records()
+        # Loaded tasks last as long as the server, stop full collections
+        # rescanning them, which stalls every request for seconds at 1M tasks.
+        gc.freeze()
+        self.lock = ReadWriteLock()
+        super().__init__(address, TaskRequestHandler)
+
+    def serve_until_stopped(self):
+        """Serve requests until interrupted, then write out any batched changes.
+
+        Stops on Ctrl-C or SIGTERM, call from the main thread.
+        """
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server_close()
+            with self.lock.writing():
+                self._save_changes()
+
+    def _save_changes(self):
+        """Flush data_repo on the way out, reporting rather than raising failures.
+
+        Notes:
+            Stores write through a temporary file, so a failed flush leaves
+            the task file as it was. Tasks another program also changed keep
+            its version and the rest are flushed again, see DataRepo.flush.
+        """
+        try:
+            try:
+                self.data_repo.flush()
+            except ConflictError as err:
+                print(
+                    "Tasks {} were changed by another program, its versions were "
+                    "kept.".format(", ".join(map(str, sorted(err.messages))))
+                )
+                self.data_repo.flush()
+        except (ConflictError, ValidationError, OSError) as err:
+            print("Couldn't save changes, the task file was left as it was.")
+            print("Error: {}".format(err))
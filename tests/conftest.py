@@ -0,0 +1,35 @@
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def task_record(number, **fields):
+    """Build a task record as tasks.json stores it.
+
+    Args:
+        number (int): Makes the title and dates differ between records.
+        **fields: Fields to set instead of the defaults.
+
+    Returns:
+        (dict): Task record.
+    """
+    record = {
+        "date": "{:02d}/{:02d}/2020".format(number % 28 + 1, number % 12 + 1),
+        "title": "task {}".format(number),
+        "time_spent": number % 60 + 1,
+        "notes": "",
+    }
+    record.update(fields)
+    return record
+
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    """Run the test in an empty directory holding a 20 task tasks.json."""
+    monkeypatch.chdir(tmp_path)
+    with open("tasks.json", "w") as task_file:
+        json.dump([task_record(number) for number in range(20)], task_file)
+    return tmp_path
@@ -0,0 +1,83 @@
+import pytest
+from marshmallow.exceptions import ValidationError
+from client import RemoteRepo, RemoteTaskController
+from repositories import ConflictError, DataRepo
+from test_server import serving
+
+
+def test_delete_of_deleted_task_is_refused(work_dir):
+    with serving(DataRepo("tasks.json")) as client:
+        task = client.get_record(3)
+        client.delete_record(task)
+        with pytest.raises(ValidationError) as raised:
+            client.delete_record(task)
+        assert raised.value.messages == {"id": ["No task with id 3."]}
+
+
+def test_conflict_is_raised(work_dir, monkeypatch):
+    data_repo = DataRepo("tasks.json")
+
+    def conflicting_delete(task):
+        raise ConflictError({task.id: ["Changed by another program."]})
+
+    with serving(data_repo) as client:
+        monkeypatch.setattr(data_repo, "delete_record", conflicting_delete)
+        with pytest.raises(ConflictError) as raised:
+            client.delete_record(client.get_record(3))
+        assert raised.value.messages == {"3": ["Changed by another program."]}
+
+
+def test_lost_server_returns_to_main_menu(work_dir, capsys):
+    with serving(DataRepo("tasks.json")) as client:
+        controller = RemoteTaskController(client)
+    assert controller.show_screen(lambda: client.get_record(1)) == controller.main_menu
+    assert "Lost connection to the work log server" in capsys.readouterr().out
+
+
+def test_unreachable_server_raises_os_error():
+    with pytest.raises(OSError):
+        RemoteRepo("http://127.0.0.1:9").status()
+
+
+def test_stale_edit_is_refused_and_refreshed(work_dir):
+    with serving(DataRepo("tasks.json")) as first:
+        second = RemoteRepo("http://127.0.0.1:{}".format(first.connection.port))
+        task = first.get_record(3)
+        second.update_record(second.get_record(3), {"title": "theirs"})
+        with pytest.raises(ConflictError):
+            first.update_record(task, {"title": "mine"})
+        assert task.title == "theirs"
+        first.update_record(task, {"title": "mine"})
+        assert second.get_record(3).title == "mine"
+
+
+def test_stale_delete_is_refused(work_dir):
+    with serving(DataRepo("tasks.json")) as first:
+        second = RemoteRepo("http://127.0.0.1:{}".format(first.connection.port))
+        task = first.get_record(3)
+        second.update_record(second.get_record(3), {"time_spent": "99"})
+        with pytest.raises(ConflictError):
+            first.delete_record(task)
+        assert task.time_spent == 99
+        first.delete_record(task)
+        with pytest.raises(KeyError):
+            second.get_record(3)
+
+
+def test_edit_after_task_file_change_is_refused(work_dir):
+    with serving(DataRepo("tasks.json")) as client:
+        task = client.get_record(3)
+        other = DataRepo("tasks.json", snapshot=False)
+        other.get_records()
+        other.update_record(other.get_record(3), other.validate_fields({"title": "x"}))
+        with pytest.raises(ConflictError):
+            client.update_record(task, {"title": "mine"})
+        assert task.title == "x"
+
+
+def test_untagged_change_overwrites(work_dir):
+    with serving(DataRepo("tasks.json")) as client:
+        client.update_record(client.get_record(3), {"title": "theirs"})
+        status, reply = client.request("PATCH", "/tasks/3", {"title": "script"})
+        assert status == 200
+        assert reply["task"]["title"] == "script"
@@ -0,0 +1,120 @@
+import glob
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import pytest
+from conftest import task_record
+
+RECORDS = 5000
+
+# Replaces one record per step, so the file after step n is known exactly.
+# With pause_chunk, the first save after pause_steps steps stops part way
+# through writing its temporary file.
+CHILD = """
+import json, time
+from models import JSONStore
+store = JSONStore("tasks.json", commit_every={commit_every})
+store.data
+if {pause_chunk}:
+    dumps = json.dumps
+    chunks = []
+
+    def pausing_dumps(*args, **kwargs):
+        if step >= {pause_steps}:
+            chunks.append(None)
+            if len(chunks) == {pause_chunk}:
+                print("paused", flush=True)
+                time.sleep(60)
+        return dumps(*args, **kwargs)
+
+    json.dumps = pausing_dumps
+print("ready", flush=True)
+step = 0
+while True:
+    position = step % len(store.data)
+    store.replace(position, dict(store.data[position], title="step {{}}".format(step)))
+    step += 1
+"""
+
+
+def run_child(commit_every, pause_chunk=0, pause_steps=0):
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            CHILD.format(
+                commit_every=commit_every,
+                pause_chunk=pause_chunk,
+                pause_steps=pause_steps,
+            ),
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(__file__))),
+    )
+
+
+def state_after(steps):
+    """Records the child has saved after a number of steps."""
+    records = [task_record(number) for number in range(RECORDS)]
+    for step in range(max(0, steps - RECORDS), steps):
+        records[step % RECORDS]["title"] = "step {}".format(step)
+    return records
+
+
+def check_saved_state(commit_every):
+    """Check tasks.json is whole and holds the state after a complete save."""
+    with open("tasks.json") as task_file:
+        records = json.load(task_file)
+    steps = [
+        int(record["title"].split()[1])
+        for record in records
+        if record["title"].startswith("step")
+    ]
+    saved_steps = max(steps) + 1 if steps else 0
+    assert saved_steps % commit_every == 0
+    assert records == state_after(saved_steps)
+    return saved_steps
+
+
+@pytest.fixture
+def task_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open("tasks.json", "w") as records:
+        json.dump([task_record(number) for number in range(RECORDS)], records)
+
+
+@pytest.mark.parametrize("commit_every", [1, 4])
+def test_kill_while_writing_keeps_previous_file(task_file, commit_every):
+    child = run_child(commit_every, pause_chunk=3, pause_steps=3 * commit_every)
+    try:
+        assert child.stdout.readline() == "ready\n"
+        assert child.stdout.readline() == "paused\n"
+        assert glob.glob("tasks.json.*.tmp"), "the save should be part written"
+    finally:
+        os.kill(child.pid, signal.SIGKILL)
+        child.wait()
+    assert check_saved_state(commit_every) == 3 * commit_every
+
+
+@pytest.mark.parametrize("commit_every", [1, 4])
+def test_kill_at_any_moment_leaves_old_or_new_file(task_file, commit_every):
+    rng = random.Random(commit_every)
+    saved = []
+    for _ in range(8):
+        child = run_child(commit_every)
+        try:
+            assert child.stdout.readline() == "ready\n"
+            time.sleep(rng.uniform(0.01, 0.2))
+        finally:
+            os.kill(child.pid, signal.SIGKILL)
+            child.wait()
+        saved.append(check_saved_state(commit_every))
+        # Each run starts again from step 0.
+        with open("tasks.json", "w") as records:
+            json.dump(state_after(0), records)
+    assert max(saved) > 0
@@ -0,0 +1,117 @@
+import random
+from datetime import datetime, timedelta
+from indexes import ColumnStore, DateIndex, TimeSpentIndex
+from models import Task
+
+FIRST_DAY = datetime(2020, 1, 1)
+
+
+def make_task(rng, number):
+    return Task(
+        FIRST_DAY + timedelta(days=rng.randrange(60)),
+        "task {}".format(number),
+        rng.randint(1, 100),
+        "",
+        number,
+    )
+
+
+def brute_force(tasks, start_date, end_date, min_minutes, max_minutes):
+    """Tasks within the bounds by checking each one, by date then id."""
+    return sorted(
+        (
+            task
+            for task in tasks
+            if start_date <= task.date <= end_date
+            and min_minutes <= task.time_spent <= max_minutes
+        ),
+        key=lambda task: (task.date, task.id),
+    )
+
+
+def test_column_store_follows_adds_and_removes():
+    rng = random.Random(9)
+    tasks = [make_task(rng, number) for number in range(300)]
+    columns = ColumnStore(tasks)
+    for number in range(300, 600):
+        if rng.random() < 0.5:
+            task = make_task(rng, number)
+            tasks.append(task)
+            columns.add(task)
+        else:
+            task = tasks.pop(rng.randrange(len(tasks)))
+            columns.remove(task)
+        assert len(columns) == len(tasks)
+        if number % 25 == 0:
+            start = FIRST_DAY + timedelta(days=rng.randrange(30))
+            bounds = (start, start + timedelta(days=20), 20, 70)
+            result = columns.filter(*bounds)
+            assert sorted(result, key=lambda task: (task.date, task.id)) == (
+                brute_force(tasks, *bounds)
+            )
+            dates = [task.date for task in result]
+            assert dates == sorted(dates)
+
+
+def test_open_result_keeps_its_rows():
+    rng = random.Random(4)
+    tasks = [make_task(rng, number) for number in range(50)]
+    columns = ColumnStore(tasks)
+    result = columns.filter(min_minutes=1)
+    expected = list(result)
+    for task in tasks[:10]:
+        columns.remove(task)
+    columns.add(make_task(rng, 50))
+    assert list(result) == expected
+    assert len(columns.filter(min_minutes=1)) == 41
+
+
+def test_date_and_time_indexes_follow_adds_and_removes():
+    rng = random.Random(2)
+    tasks = [make_task(rng, number) for number in range(300)]
+    dates, times = DateIndex(tasks), TimeSpentIndex(tasks)
+    for number in range(300, 600):
+        if rng.random() < 0.5:
+            task = make_task(rng, number)
+            tasks.append(task)
+            dates.add(task)
+            times.add(task)
+        else:
+            task = tasks.pop(rng.randrange(len(tasks)))
+            dates.remove(task)
+            times.remove(task)
+    assert len(dates) == len(tasks)
+    # Same day Tasks stay in the order they were indexed.
+    assert dates.range(None, None) == sorted(tasks, key=lambda task: task.date)
+    start, end = FIRST_DAY + timedelta(days=10), FIRST_DAY + timedelta(days=20)
+    in_range = [task for task in tasks if start <= task.date <= end]
+    assert dates.count(start.timestamp(), end.timestamp()) == len(in_range)
+    assert list(dates.iter_range(start.timestamp(), end.timestamp())) == sorted(
+        in_range, key=lambda task: task.date
+    )
+    assert sorted(times.range(20, 30), key=lambda task: task.id) == sorted(
+        (task for task in tasks if 20 <= task.time_spent <= 30),
+        key=lambda task: task.id,
+    )
+    assert times.count(20, 30) == len(times.range(20, 30))
+
+
+def test_iter_range_reads_buckets_as_it_goes():
+    rng = random.Random(6)
+    tasks = sorted(
+        (make_task(rng, number) for number in range(100)),
+        key=lambda task: task.date,
+    )
+    dates = DateIndex(tasks)
+    results = dates.iter_range()
+    first = next(results)
+    assert first is tasks[0]
+    last_day = [task for task in tasks if task.date == tasks[-1].date]
+    for task in last_day:
+        dates.remove(task)
+    dates.remove(first)
+    added = Task(tasks[-1].date, "added", 5, "", 100)
+    dates.add(added)
+    assert [first] + list(results) == (
+        [task for task in tasks if task.date != tasks[-1].date] + [added]
+    )
@@ -0,0 +1,89 @@
+import json
+import re
+from operator import attrgetter
+import pytest
+import queries
+from conftest import task_record
+from repositories import DataRepo
+
+
+@pytest.fixture
+def fresh_repo(tmp_path, monkeypatch):
+    """Repository of 2000 tasks, most titled "common" and a few "rare"."""
+    monkeypatch.chdir(tmp_path)
+    with open("tasks.json", "w") as task_file:
+        json.dump(
+            [
+                task_record(number, title="rare" if number % 500 == 0 else "common")
+                for number in range(2000)
+            ],
+            task_file,
+        )
+    data_repo = DataRepo("tasks.json")
+    data_repo.get_records()
+    return data_repo
+
+
+@pytest.fixture
+def data_repo(fresh_repo):
+    """The same repository with its text index built."""
+    fresh_repo.text_index
+    return fresh_repo
+
+
+def in_date_order(data_repo, condition):
+    """Tasks matching a condition, found by checking each one."""
+    return sorted(filter(condition.matches, data_repo.records), key=attrgetter("date"))
+
+
+@pytest.mark.parametrize(
+    "condition",
+    [
+        queries.TextContains("common"),
+        queries.TimeSpent(1, 50),
+        queries.Or(queries.TimeSpent(5, 5), queries.TimeSpent(10, 60)),
+    ],
+)
+def test_unordered_plan_streams_from_date_scan(data_repo, condition, monkeypatch):
+    plan = queries.plan_query(data_repo, condition)
+    assert plan.rows is not None and not plan.ordered
+
+    def fetch_all_rows():
+        raise AssertionError("Rows fetched before the first result")
+
+    monkeypatch.setattr(plan, "rows", fetch_all_rows)
+    assert list(queries.run_plan(data_repo, plan)) == in_date_order(
+        data_repo, condition
+    )
+
+
+@pytest.mark.parametrize(
+    "condition", [queries.TextContains("rare"), queries.TimeSpent(7, 7)]
+)
+def test_narrow_unordered_plan_is_ordered_by_date(data_repo, condition):
+    plan = queries.plan_query(data_repo, condition)
+    assert not plan.ordered
+    assert not queries.scan_is_cheaper(data_repo, plan, queries.QueryResult.page_size)
+    assert list(queries.run_plan(data_repo, plan)) == in_date_order(
+        data_repo, condition
+    )
+
+
+@pytest.mark.parametrize(
+    "condition, index_name",
+    [
+        (queries.TextContains("rare"), "text_index"),
+        (queries.RegexMatch(re.compile("rare")), "trigram_index"),
+    ],
+)
+def test_index_is_built_once_scans_pay_for_it(fresh_repo, condition, index_name):
+    expected = in_date_order(fresh_repo, condition)
+    for scans in range(1, 50):
+        plan = queries.plan_query(fresh_repo, condition)
+        assert list(queries.run_plan(fresh_repo, plan)) == expected
+        if fresh_repo.index_built(index_name):
+            break
+    assert scans == condition.build_cost // condition.check_cost
+    plan = queries.plan_query(fresh_repo, condition)
+    assert plan.access == condition.access
+    assert sorted(plan.rows(), key=attrgetter("date")) == expected
@@ -0,0 +1,252 @@
+import json
+import os
+from functools import partial
+import pytest
+from conftest import task_record
+from importers import read_csv, read_jsonl
+from models import JournalStore, JSONLinesStore, JSONStore, SnapshotRecords
+from repositories import ConflictError, DataRepo, ShardedRepo
+
+STORES = {
+    "json": JSONStore,
+    "json batched": partial(JSONStore, commit_every=4),
+    "journal": JournalStore,
+    "jsonl": JSONLinesStore,
+}
+
+
+def open_repo(store=JSONStore, **options):
+    """Open tasks.json and wait for its records to load."""
+    data_repo = DataRepo("tasks.json", store=store, **options)
+    data_repo.get_records()
+    data_repo.wait_until_loaded()
+    return data_repo
+
+
+def contents(data_repo):
+    """Each Task's fields, by id."""
+    return {
+        task.id: (task.date, task.title, task.time_spent, task.notes)
+        for task in data_repo.records
+    }
+
+
+def retitle(data_repo, task_id, title):
+    """Change a Task's title."""
+    data_repo.update_record(
+        data_repo.get_record(task_id), data_repo.validate_fields({"title": title})
+    )
+
+
+@pytest.mark.parametrize("store", sorted(STORES))
+def test_store_round_trip(work_dir, store):
+    data_repo = open_repo(STORES[store])
+    added = data_repo.add_record(
+        {"date": "01/01/2021", "title": "added", "time_spent": "5", "notes": "new"}
+    )
+    data_repo.update_record(
+        data_repo.get_record(3), data_repo.validate_fields({"title": "edited"})
+    )
+    data_repo.delete_record(data_repo.get_record(7))
+    data_repo.flush()
+    expected = contents(data_repo)
+    assert len(expected) == 20
+    assert expected[added.id][1:] == ("added", 5, "new")
+
+    reopened = open_repo(STORES[store], snapshot=False)
+    assert contents(reopened) == expected
+    assert reopened.get_record(3).title == "edited"
+    with pytest.raises(KeyError):
+        reopened.get_record(7)
+
+
+@pytest.mark.parametrize("store", sorted(STORES))
+def test_ids_are_kept_across_deletes(work_dir, store):
+    data_repo = open_repo(STORES[store])
+    before = contents(data_repo)
+    for task_id in (1, 5, 20):
+        data_repo.delete_record(data_repo.get_record(task_id))
+    for task_id in (1, 5, 20):
+        del before[task_id]
+    assert contents(data_repo) == before
+    for task_id in before:
+        assert data_repo.get_record(task_id).id == task_id
+
+    added = data_repo.add_record(
+        {"date": "01/01/2021", "title": "added", "time_spent": "5", "notes": ""}
+    )
+    assert added.id == 21
+    data_repo.flush()
+    reopened = open_repo(STORES[store], snapshot=False)
+    assert contents(reopened) == contents(data_repo)
+    next_task = reopened.add_record(
+        {"date": "01/01/2021", "title": "next", "time_spent": "5", "notes": ""}
+    )
+    assert next_task.id == 22
+
+
+@pytest.mark.parametrize("store", sorted(STORES))
+def test_snapshot_reopen(work_dir, store):
+    data_repo = open_repo(STORES[store])
+    data_repo.flush()
+    assert os.path.exists("tasks.snapshot")
+    expected = contents(data_repo)
+
+    reopened = open_repo(STORES[store])
+    assert isinstance(reopened.records, SnapshotRecords)
+    assert contents(reopened) == expected
+    assert [task.title for task in reopened.find_by_time_range(5, 6)] == [
+        "task 4",
+        "task 5",
+    ]
+    reopened.update_record(
+        reopened.get_record(3), reopened.validate_fields({"title": "edited"})
+    )
+    reopened.delete_record(reopened.get_record(7))
+    reopened.flush()
+
+    again = open_repo(STORES[store])
+    assert isinstance(again.records, SnapshotRecords)
+    assert contents(again) == contents(open_repo(STORES[store], snapshot=False))
+    assert again.get_record(3).title == "edited"
+    with pytest.raises(KeyError):
+        again.get_record(7)
+
+
+def test_snapshot_of_changed_file_is_not_used(work_dir):
+    open_repo().flush()
+    with open("tasks.json") as task_file:
+        records = json.load(task_file)
+    records[0]["title"] = "changed"
+    with open("tasks.json", "w") as task_file:
+        json.dump(records, task_file)
+
+    reopened = open_repo()
+    assert not isinstance(reopened.records, SnapshotRecords)
+    assert reopened.get_record(records[0]["id"]).title == "changed"
+
+
+@pytest.mark.parametrize("store", sorted(STORES))
+def test_external_changes_are_merged(work_dir, store):
+    data_repo = open_repo(STORES[store])
+    data_repo.flush()
+    other = open_repo(STORES[store], snapshot=False)
+    retitle(other, 3, "theirs")
+    other.delete_record(other.get_record(4))
+    added = other.add_record(
+        {"date": "01/01/2021", "title": "their task", "time_spent": "5", "notes": ""}
+    )
+    other.flush()
+
+    merge = data_repo.check_for_changes()
+    assert (merge.added, merge.changed, merge.deleted) == ({added.id}, {3}, {4})
+    assert contents(data_repo) == contents(other)
+    assert [task.id for task in data_repo.text_index.candidates("theirs")] == [3]
+    assert data_repo.check_for_changes() is None
+
+
+@pytest.mark.parametrize("store", sorted(STORES))
+def test_stale_changes_are_refused(work_dir, store):
+    data_repo = open_repo(STORES[store])
+    data_repo.flush()
+    mine, gone = data_repo.get_record(3), data_repo.get_record(4)
+    other = open_repo(STORES[store], snapshot=False)
+    retitle(other, 3, "theirs")
+    other.delete_record(other.get_record(4))
+    other.flush()
+
+    with pytest.raises(ConflictError) as raised:
+        data_repo.update_record(mine, data_repo.validate_fields({"title": "mine"}))
+    assert list(raised.value.messages) == [3]
+    assert mine.title == "theirs"
+    with pytest.raises(ConflictError):
+        data_repo.update_record(gone, data_repo.validate_fields({"title": "mine"}))
+    data_repo.update_record(mine, data_repo.validate_fields({"title": "mine"}))
+    data_repo.flush()
+    assert open_repo(STORES[store], snapshot=False).get_record(3).title == "mine"
+
+
+def test_unsaved_changes_are_replayed_on_merge(work_dir):
+    data_repo = open_repo(partial(JSONStore, commit_every=10))
+    retitle(data_repo, 7, "mine 7")
+    retitle(data_repo, 8, "mine 8")
+    data_repo.delete_record(data_repo.get_record(9))
+    other = open_repo(snapshot=False)
+    retitle(other, 7, "their 7")
+    retitle(other, 9, "their 9")
+
+    with pytest.raises(ConflictError) as raised:
+        data_repo.flush()
+    assert sorted(raised.value.messages) == [7, 9]
+    data_repo.flush()
+    saved = open_repo(snapshot=False)
+    assert [saved.get_record(task_id).title for task_id in (7, 8, 9)] == [
+        "their 7",
+        "mine 8",
+        "their 9",
+    ]
+
+
+def test_shifted_records_are_matched_by_id(work_dir):
+    data_repo = open_repo()
+    tasks = {task.id: task for task in data_repo.records}
+    with open("tasks.json") as task_file:
+        records = json.load(task_file)
+    deleted = records.pop(10)
+    records.insert(0, task_record(100, title="hand"))
+    with open("tasks.json", "w") as task_file:
+        json.dump(records, task_file)
+
+    merge = data_repo.check_for_changes()
+    assert (merge.changed, merge.deleted) == (set(), {deleted["id"]})
+    hand = data_repo.records[0]
+    assert merge.added == {hand.id} and hand.id == 21
+    for task in data_repo.records[1:]:
+        assert tasks[task.id] is task
+    with open("tasks.json") as task_file:
+        assert json.load(task_file)[0]["id"] == 21
+
+
+def test_import_validates_with_schema(work_dir):
+    with open("import.csv", "w") as csv_file:
+        csv_file.write(
+            "date,title,time_spent,notes\n"
+            "01/02/2021,first,5,\n"
+            "31/02/2021,bad date,5,\n"
+            "02/02/2021,second,ten,\n"
+            "03/02/2021,third,15,noted\n"
+        )
+    with open("import.jsonl", "w") as jsonl_file:
+        jsonl_file.write(
+            '{"date": "04/02/2021", "title": "fourth", "time_spent": 1, "id": 3}\n'
+            '{"date": "04/02/2021", "title": "fifth", "time_spent": 1, "extra": 1}\n'
+            "[1, 2]\n"
+            "{\n"
+        )
+    data_repo = open_repo()
+    imported, errors = data_repo.import_records(read_csv("import.csv"), batch_size=3)
+    assert [(task.title, task.notes) for task in imported] == [
+        ("first", ""),
+        ("third", "noted"),
+    ]
+    assert errors == {
+        3: {"date": ["Not a valid datetime."]},
+        4: {"time_spent": ["Not a valid integer."]},
+    }
+    imported, errors = data_repo.import_records(read_jsonl("import.jsonl"))
+    assert [(task.id, task.title) for task in imported] == [(23, "fourth")]
+    assert sorted(errors) == [2, 3, 4]
+    assert errors[2] == {"extra": ["Unknown field."]}
+    assert errors[3] == {"_schema": ["Invalid input type."]}
+    data_repo.flush()
+    assert len(open_repo(snapshot=False).records) == 23
+
+
+def test_json_file_is_split_into_shards(work_dir):
+    expected = contents(open_repo(snapshot=False))
+    data_repo = ShardedRepo("tasks", json_file="tasks.json", workers=1)
+    data_repo.get_records()
+    assert contents(data_repo) == expected
+    assert sorted(os.listdir("tasks")) == [
+        "2020-{:02d}.json".format(month) for month in range(1, 13)
+    ]
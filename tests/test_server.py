@@ -0,0 +1,178 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+import pytest
+from marshmallow.exceptions import ValidationError
+import queries
+from client import RemoteRepo
+from models import JournalStore, JSONLinesStore
+from repositories import DataRepo, ShardedRepo, SQLiteRepo
+from server import ReadWriteLock, TaskServer
+
+BACKENDS = {
+    "json": partial(DataRepo, "tasks.json"),
+    "json write behind": partial(DataRepo, "tasks.json", write_behind=True),
+    "journal": partial(DataRepo, "tasks.json", store=JournalStore),
+    "jsonl": partial(DataRepo, "tasks.json", store=JSONLinesStore),
+    "sqlite": partial(SQLiteRepo, "tasks.db", json_file="tasks.json"),
+    "sharded": partial(ShardedRepo, "tasks", json_file="tasks.json", workers=1),
+}
+
+
+@contextmanager
+def serving(data_repo):
+    """Serve a repository on a free localhost port until the block ends.
+
+    Yields:
+        (:obj:`RemoteRepo`): Client for the server.
+    """
+    server = TaskServer(("127.0.0.1", 0), data_repo)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield RemoteRepo("http://127.0.0.1:{}".format(server.server_address[1]))
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+        data_repo.flush()
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_serves_every_operation(work_dir, backend):
+    with serving(BACKENDS[backend]()) as client:
+        assert client.status() == {"tasks": 20}
+        tasks, length, _ = client.search(queries.TextContains("task 7"), 0, 20, True)
+        assert [task.title for task in tasks] == ["task 7"]
+        assert length == 1
+
+        task = client.add_record(
+            {"date": "01/01/2021", "title": "served", "time_spent": "5", "notes": ""}
+        )
+        assert client.get_record(task.id).title == "served"
+        client.update_record(task, client.validate_fields({"title": "edited"}))
+        assert task.title == "edited"
+        tasks, _, _ = client.search(queries.TextContains("edited"), 0, 20)
+        assert [found.id for found in tasks] == [task.id]
+
+        client.delete_record(task)
+        with pytest.raises(KeyError):
+            client.get_record(task.id)
+        assert client.status() == {"tasks": 20}
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_served_changes_are_saved(work_dir, backend):
+    with serving(BACKENDS[backend]()) as client:
+        task = client.add_record(
+            {"date": "01/01/2021", "title": "kept", "time_spent": "5", "notes": ""}
+        )
+    reopened = BACKENDS[backend]()
+    reopened.get_records()
+    reopened.wait_until_loaded()
+    assert reopened.get_record(task.id).title == "kept"
+
+
+def test_unexpected_error_is_answered(work_dir, monkeypatch):
+    data_repo = DataRepo("tasks.json")
+
+    def failing_add(data):
+        raise OSError("No space left on device")
+
+    with serving(data_repo) as client:
+        monkeypatch.setattr(data_repo, "add_record", failing_add)
+        status, reply = client.request(
+            "POST",
+            "/tasks",
+            {"date": "01/01/2021", "title": "lost", "time_spent": "5", "notes": ""},
+        )
+        assert status == 500
+        assert reply["errors"]["_schema"] == [
+            "Server error: No space left on device"
+        ]
+        assert client.status() == {"tasks": 20}
+
+
+def test_writer_waits_for_readers_and_holds_off_new_ones():
+    lock = ReadWriteLock()
+    events = []
+
+    def write():
+        with lock.writing():
+            events.append("write")
+
+    def read():
+        with lock.reading():
+            events.append("late read")
+
+    with lock.reading():
+        with lock.reading():
+            writer = threading.Thread(target=write)
+            writer.start()
+            while not lock._writers_waiting:
+                time.sleep(0.001)
+            reader = threading.Thread(target=read)
+            reader.start()
+            reader.join(0.1)
+            assert events == []
+    writer.join()
+    reader.join()
+    assert events == ["write", "late read"]
+
+
+def test_reads_are_answered_while_another_read_holds_the_lock(work_dir):
+    server = TaskServer(("127.0.0.1", 0), DataRepo("tasks.json"))
+    url = "http://127.0.0.1:{}".format(server.server_address[1])
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    added = []
+
+    def add():
+        added.append(
+            RemoteRepo(url).add_record(
+                {"date": "01/01/2021", "title": "added", "time_spent": "5", "notes": ""}
+            )
+        )
+
+    try:
+        client = RemoteRepo(url)
+        with server.lock.reading():
+            assert client.status() == {"tasks": 20}
+            assert client.get_record(3).title == "task 2"
+            writer = threading.Thread(target=add)
+            writer.start()
+            writer.join(0.2)
+            assert not added
+        writer.join()
+        assert client.status() == {"tasks": 21}
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+
+
+@pytest.mark.parametrize(
+    "error",
+    [OSError("No space left on device"), ValidationError({0: ["Invalid record."]})],
+)
+def test_failed_flush_on_stop_is_reported(work_dir, monkeypatch, capsys, error):
+    server = TaskServer(("127.0.0.1", 0), DataRepo("tasks.json"))
+    with open("tasks.json") as task_file:
+        before = task_file.read()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    def failing_flush():
+        raise error
+
+    monkeypatch.setattr(server, "serve_forever", interrupted)
+    monkeypatch.setattr(server.data_repo, "flush", failing_flush)
+    server.serve_until_stopped()
+    assert capsys.readouterr().out.splitlines() == [
+        "Couldn't save changes, the task file was left as it was.",
+        "Error: {}".format(error),
+    ]
+    with open("tasks.json") as task_file:
+        assert task_file.read() == before
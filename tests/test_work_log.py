@@ -0,0 +1,53 @@
+import json
+import pytest
+import work_log
+from conftest import task_record
+from repositories import DataRepo
+
+
+@pytest.mark.parametrize("store", ["json", "journal", "jsonl", "sqlite", "sharded"])
+def test_export_writes_every_task(work_dir, store, capsys):
+    data_repo = DataRepo("tasks.json")
+    data_repo.get_records()
+    expected = [data_repo.fast_loader.dump(task) for task in data_repo.records]
+    work_log.main(["--store", store, "export", "exported.json"])
+    assert capsys.readouterr().out == "Exported 20 tasks to exported.json.\n"
+    with open("exported.json") as exported:
+        records = json.load(exported)
+    assert sorted(records, key=lambda record: record["id"]) == expected
+
+
+def test_export_includes_journalled_changes(work_dir):
+    work_log.main(["--store", "journal", "export"])
+    data_repo = DataRepo("tasks.json", store=work_log.JournalStore)
+    data_repo.get_records()
+    data_repo.add_record(task_record(50))
+    data_repo.delete_record(data_repo.get_record(1))
+    work_log.main(["--store", "journal", "export"])
+    with open("tasks.json") as exported:
+        titles = [record["title"] for record in json.load(exported)]
+    assert len(titles) == 20
+    assert "task 50" in titles and "task 0" not in titles
+
+
+def test_export_is_refused_with_connect(capsys):
+    work_log.main(["--connect", "http://127.0.0.1:9", "export"])
+    assert "not with --connect" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("command", [["search", "--text", "task"], ["export"]])
+def test_invalid_json_names_the_file(work_dir, command, capsys):
+    with open("tasks.json", "a") as task_file:
+        task_file.write("{")
+    work_log.main(["--no-snapshot"] + command)
+    report = capsys.readouterr().out.splitlines()
+    assert report[0] == "Invalid JSON file tasks.json detected."
+    assert report[1].startswith("JSON error: Extra data")
+
+
+def test_date_and_date_range_are_refused_together(capsys):
+    with pytest.raises(SystemExit):
+        work_log.parse_args(
+            ["search", "--date", "01/01/2020", "--date-range", "01/01/2020", "02/01/2020"]
+        )
+    assert "not allowed with argument" in capsys.readouterr().err
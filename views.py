@@ -1,10 +1,107 @@
+import sys
+
 import pendulum
 
+
+def split_time_range(time_search):
+    """Split a time spent search into its bounds.
+
+    Args:
+        time_search (str): An exact duration ("30"), a range ("30-90") or a minimum ("30+").
+
+    Returns:
+        (min_time, max_time) (str, str): Bounds, max_time is None for no upper bound.
+    """
+    time_search = time_search.strip()
+    if time_search.endswith("+"):
+        return time_search[:-1], None
+    if "-" in time_search:
+        min_time, _, max_time = time_search.partition("-")
+        return min_time, max_time
+    return time_search, time_search
+
+
+def write_screen(*sections, prompt=""):
+    """Write a screen to the terminal in a single buffered write.
+
+    Args:
+        *sections (str): Blocks of text, each printed on its own lines. Empty blocks are skipped.
+        prompt (str): Input prompt to follow the sections on the same write.
+    """
+    sys.stdout.write("".join(section + "\n" for section in sections if section) + prompt)
+    sys.stdout.flush()
+
+
+def format_error(error):
+    """Format a message to show above a view.
+
+    Args:
+        error (str): Error message, if any.
+
+    Returns:
+        (str): Highlighted message, empty if there is no error.
+    """
+    if not error:
+        return ""
+    return "\n** {} **\n".format(error)
+
+
+def format_validation_error(error):
+    """Format schema validation errors to show above a view.
+
+    Args:
+        error (:obj:`ValidationError`): Schema validation exception, if any.
+
+    Returns:
+        (str): Error report, empty if there is no error.
+    """
+    if not error:
+        return ""
+    return "\n** ERROR **\n{}\n\nPlease try again".format(
+        "\n".join(f"{k}: {' '.join(v)}" for k, v in error.messages.items())
+    )
+
+
+class Template:
+    """View layout prepared once for repeated rendering.
+
+    Args:
+        layout (str): Layout in str.format syntax.
+
+    Attributes:
+        layout (str): Layout in str.format syntax.
+        render (:obj:`method`): Format the layout with positional arguments.
+    """
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.render = layout.format
+        self._rendered = {}
+
+    def render_cached(self, *args):
+        """Format the layout, reusing earlier output for the same arguments.
+
+        Args:
+            *args (str): Hashable layout arguments, e.g. choice keys.
+
+        Returns:
+            (str): Formatted layout.
+        """
+        try:
+            return self._rendered[args]
+        except KeyError:
+            text = self._rendered[args] = self.render(*args)
+            return text
+
+
 class View:
     """View base class.
 
+    Subclasses set layout as a class attribute, it is compiled into a
+    :obj:`Template` once per class.
+
     Args:
-        layout (str): Text to display for current view.
+        layout (str): Text to display for current view, defaults to the class layout.
         choices (:obj:`dict` of :obj:`str`): User choices for current view.
         prompt (str): Prompt styling for user input.
 
@@ -12,9 +109,19 @@ class View:
         prompt (str): User input prompt prefix.
     """
 
+    layout = ""
+    template = Template(layout)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "layout" in cls.__dict__:
+            cls.template = Template(cls.layout)
+
     def __init__(self, layout, choices, prompt):
-        self._layout = layout
+        if layout != self.template.layout:
+            self.template = Template(layout)
         self.choices = choices
+        self._choice_keys = tuple(sorted(choices))
         self.prompt = prompt
 
     def handle_choice(self, choice):
@@ -40,7 +147,23 @@ class View:
         Returns:
             Formatted string (str)
         """
-        return self._layout.format(*sorted(self.choices))
+        return self.template.render_cached(*self._choice_keys)
+
+    def ask(self, *sections):
+        """Write a screen and prompt until a valid choice is entered.
+
+        Args:
+            *sections (str): Blocks of text to show above the prompt.
+
+        Returns:
+            user_input (str): Valid choice.
+        """
+        write_screen(*sections, prompt=self.prompt)
+        user_input = self.handle_choice(input().lower())
+        while user_input.startswith("Invalid"):
+            write_screen(user_input, prompt=self.prompt)
+            user_input = self.handle_choice(input().lower())
+        return user_input
 
     def present_view(self, error: str = None):
         """Prints view layout to screen and prompts for input.
@@ -51,14 +174,7 @@ class View:
         Returns:
             user_input (str)
         """
-        if error:
-            print("\n** {} **\n".format(error))
-        print(self.render_layout())
-        user_input = self.handle_choice(input(self.prompt).lower())
-        while user_input.startswith("Invalid"):
-            print(user_input)
-            user_input = self.handle_choice(input(self.prompt).lower())
-        return user_input
+        return self.ask(format_error(error), self.render_layout())
 
 
 class MainView(View):
@@ -70,26 +186,25 @@ class MainView(View):
         prompt (str): User input prompt prefix.
     """
 
-    def __init__(self, choices):
-        self._layout = """WORKLOG
+    layout = """WORKLOG
         What would you like to do?
         {}) Add new entry
         {}) Search existing entries
         {}) Quit program"""
 
-        self.choices = choices
-
-        self.prompt = "Choice> "
-        super().__init__(self._layout, self.choices, self.prompt)
+    def __init__(self, choices):
+        super().__init__(self.layout, choices, "Choice> ")
 
 
 class NewTaskView(View):
     """View presented when adding a new task."""
 
-    def __init__(self):
-        self._layout = """NEW TASK
+    layout = """NEW TASK
         """
 
+    def __init__(self):
+        super().__init__(self.layout, {}, "")
+
     def present_view(self, confirmation=False, error=None):
         """Prints formatted view to user.
 
@@ -104,13 +219,7 @@ class NewTaskView(View):
         if confirmation:
             input("The entry has been added.  Press Enter to continue")
             return
-        if error:
-            print(
-                "\n** ERROR **\n{}\n\nPlease try again".format(
-                    "\n".join(f"{k}: {' '.join(v)}" for k, v in error.messages.items())
-                )
-            )
-        print(self._layout)
+        write_screen(format_validation_error(error), self.layout)
         task = {
             "date": input("Enter date (DD/MM/YYYY): "),
             "title": input("Task Title: "),
@@ -127,20 +236,18 @@ class SearchView(View):
         choices (:obj:`dict`): Key mappings for layout.
     """
 
-    def __init__(self, choices):
-        self._layout = """SEARCH
+    layout = """SEARCH
         Choose your search method:
         {}) Exact Date
         {}) Range of Dates
         {}) Time Spent
         {}) Exact Text Search
         {}) Regex Pattern
+        {}) Date Range and Time Spent
         {}) Return to menu"""
 
-        self.choices = choices
-
-        self.prompt = "Search Method> "
-        super().__init__(self._layout, self.choices, self.prompt)
+    def __init__(self, choices):
+        super().__init__(self.layout, choices, "Search Method> ")
 
     def exact_date(self):
         """Collects input intended for a fixed date search.
@@ -166,11 +273,15 @@ class SearchView(View):
     def time_spent_lookup(self):
         """Collects input intended for a search by time spent.
 
+        Accepts an exact duration ("30"), a range ("30-90") or a minimum ("30+").
+
         Returns:
-            (str): User inputted number.
+            (min_time, max_time) (str, str): User inputted bounds, max_time is None for no upper bound.
         """
-        time_search = input("Enter the duration to search for (minutes): ")
-        return time_search
+        time_search = input(
+            "Enter the duration to search for (minutes, e.g. 30, 30-90 or 30+): "
+        )
+        return split_time_range(time_search)
 
     def exact_match(self):
         """Collects input intended for a fixed text search.
@@ -195,18 +306,23 @@ class ResultView(View):
     """Displays search results and prompts for user input.
 
     Args:
-        result (:obj:`list` of :obj:`Task`): Result from successful search query.
+        result (:obj:`queries.QueryResult`): Result from successful search query.
+
+    Notes:
+        Only the shown Task is read from the result, the total is shown as an
+        estimate until the result has been counted.
     """
 
-    def __init__(self, result):
-        self.result = result
-        self._layout = """RESULT
+    layout = """RESULT
         Date: {2.date:%d/%m/%Y}
         Title: {2.title}
         Time Spent: {2.time_spent}
         Notes: {2.notes}
         
         Result {0} of {1}"""
+
+    def __init__(self, result):
+        self.result = result
         self.page = 0
 
         self._options = {
@@ -217,27 +333,29 @@ class ResultView(View):
             "r": self.go_back,
         }
 
-        if len(self.result) > 1:
-            self.prompt = (
-                "[N]ext, [P]revious, [E]dit, [D]elete, [R]eturn to search menu> "
-            )
+        if self.has_item(1):
+            prompt = "[N]ext, [P]revious, [E]dit, [D]elete, [R]eturn to search menu> "
         else:
-            self.prompt = "[E]dit, [D]elete, [R]eturn to search menu> "
-        super().__init__(self._layout, self._options, self.prompt)
+            prompt = "[E]dit, [D]elete, [R]eturn to search menu> "
+        super().__init__(self.layout, self._options, prompt)
 
     def present_view(self):
-        """Print formatted view to screen and collect next user input
+        """Print formatted view to screen and collect user input until an action is chosen.
+
+        Paging choices move between results in a loop, so a long paging session
+        doesn't grow the call stack.
 
         Returns:
-            :obj:`method`: Adjusts pagination and re-presents view.
-            :obj:`Task`: If "e" or "d" chosen, returns Task to be mutated.
+            (str, :obj:`Task`): If "e" or "d" chosen, choice and Task to be mutated.
+            (None, None): If "r" chosen.
         """
-        print(self.render_layout(self.page, self.result[self.page]))
-        user_input = self.handle_choice(input(self.prompt).lower())
-        while user_input.startswith("Invalid"):
-            print(user_input)
-            user_input = self.handle_choice(input(self.prompt).lower())
-        return self._options[user_input]()
+        while True:
+            user_input = self.ask(
+                self.render_layout(self.page, self.result[self.page])
+            )
+            action = self._options[user_input]()
+            if action is not None:
+                return action
 
     def render_layout(self, page, task):
         """Pass pagination information and task to layout.
@@ -247,33 +365,41 @@ class ResultView(View):
             task (:obj:`Task`): Current task to be viewed.
 
         Returns:
-            _layout (str): Formatted layout string.
+            (str): Formatted layout string.
         """
-        return self._layout.format(page + 1, len(self.result), task)
+        total = self.result.known_length()
+        if total is None:
+            total = "~{}".format(self.result.estimate)
+        return self.template.render(page + 1, total, task)
 
-    def next_item(self):
-        """Advance result view one page.
+    def has_item(self, page):
+        """Check whether the result reaches a page.
+
+        Args:
+            page (int): Index position in Task list.
 
         Returns:
-            present_view (:obj:`str`) Updated page view and user input.
+            (bool): True if there is a Task at page.
         """
-        if self.page + 1 > len(self.result) - 1:
-            self.page = 0
-        else:
+        try:
+            self.result[page]
+        except IndexError:
+            return False
+        return True
+
+    def next_item(self):
+        """Advance result view one page, wrapping to the first."""
+        if self.has_item(self.page + 1):
             self.page += 1
-        return self.present_view()
+        else:
+            self.page = 0
 
     def prev_item(self):
-        """Reverse result view one page.
-
-        Returns:
-            present_view (:obj:`str`) Updated page view and user input.
-        """
+        """Reverse result view one page, wrapping to the last."""
         if self.page - 1 < 0:
             self.page = len(self.result) - 1
         else:
             self.page -= 1
-        return self.present_view()
 
     def edit_item(self):
         """Request task edit.
@@ -302,15 +428,16 @@ class EditView(View):
         task (:obj:`Task`): Specific task to modify.
     """
 
-    def __init__(self, task):
-        self.task = task
-        self._layout = """EDIT
+    layout = """EDIT
         {0}) Date: {5.date:%d/%m/%Y}
         {1}) Title: {5.title}
         {2}) Time Spent: {5.time_spent}
         {3}) Notes: {5.notes}
         {4}) Back to results"""
 
+    def __init__(self, task):
+        self.task = task
+
         self._options = {
             "a": self.edit_date,
             "b": self.edit_title,
@@ -319,9 +446,7 @@ class EditView(View):
             "e": self.go_back,
         }
 
-        self.prompt = "Choose the item to edit> "
-
-        super().__init__(self._layout, self._options, self.prompt)
+        super().__init__(self.layout, self._options, "Choose the item to edit> ")
 
     def present_view(self, error=None):
         """Print view and prompt for input.
@@ -332,27 +457,17 @@ class EditView(View):
         Returns:
             (str): User inputted choice.
         """
-        if error:
-            print(
-                "\n** ERROR **\n{}\n\nPlease try again".format(
-                    "\n".join(f"{k}: {' '.join(v)}" for k, v in error.messages.items())
-                )
-            )
-        print(self.render_layout())
-        user_input = self.handle_choice(input(self.prompt).lower())
-        while user_input.startswith("Invalid"):
-            print(user_input)
-            user_input = self.handle_choice(input(self.prompt).lower())
+        user_input = self.ask(format_validation_error(error), self.render_layout())
         return self._options[user_input]()
 
     def render_layout(self):
         """Format layout string for presentation.
 
         Returns:
-            _layout (str): Formatted view output.
+            (str): Formatted view output.
 
         """
-        return self._layout.format(*self._options.keys(), self.task)
+        return self.template.render(*self._choice_keys, self.task)
 
     def edit_date(self):
         """Collect new date.
@@ -2,23 +2,383 @@
 
 Author: Alex Boag-Munroe"""
 
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from functools import partial
 from json.decoder import JSONDecodeError
+from marshmallow.exceptions import ValidationError
+import queries
+import views
+from client import RemoteRepo, RemoteTaskController
 from controllers import TaskController
-from repositories import DataRepo
+from importers import READERS
+from models import JournalStore, JSONLinesStore, JSONStore
+from repositories import DataRepo, ShardedRepo, SQLiteRepo
+from server import TaskServer
 
+STORES = {"json": JSONStore, "journal": JournalStore, "jsonl": JSONLinesStore}
 
-def main():
-    """App initialisation.
+
+def parse_args(argv=None):
+    """Parse command line options.
+
+    Args:
+        argv (:obj:`list` of str): Arguments to parse, defaults to sys.argv.
+
+    Returns:
+        (:obj:`argparse.Namespace`): Parsed options.
+    """
+    parser = argparse.ArgumentParser(description="CLI Task Logger")
+    parser.add_argument(
+        "--store",
+        choices=sorted(STORES) + ["sharded", "sqlite"],
+        default="json",
+        help="Storage backend for task data.",
+    )
+    parser.add_argument(
+        "--trusted",
+        action="store_true",
+        help="Load task files written by this app without full schema validation.",
+    )
+    parser.add_argument(
+        "--commit-every",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Batch N changes into each save of tasks.json (json store only).",
+    )
+    parser.add_argument(
+        "--no-fsync",
+        action="store_true",
+        help="Skip forcing writes to disk, faster but less durable.",
+    )
+    parser.add_argument(
+        "--write-behind",
+        action="store_true",
+        help="Save changes on a background thread so prompts don't wait for them.",
+    )
+    parser.add_argument(
+        "--no-snapshot",
+        action="store_true",
+        help="Always load the task file instead of its binary snapshot.",
+    )
+    parser.add_argument(
+        "--connect",
+        metavar="URL",
+        help="Use the work log server at URL, e.g. http://127.0.0.1:8000.",
+    )
+    commands = parser.add_subparsers(dest="command")
+    import_parser = commands.add_parser(
+        "import", help="Add tasks from a CSV or JSON Lines file in one write."
+    )
+    import_parser.add_argument("file", help="CSV or JSON Lines file to import.")
+    import_parser.add_argument(
+        "--format",
+        choices=sorted(READERS),
+        help="File format, defaults to the file extension.",
+    )
+    import_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=10000,
+        help="Number of rows to validate at a time.",
+    )
+    export_parser = commands.add_parser(
+        "export", help="Write every task to a plain JSON task file."
+    )
+    export_parser.add_argument(
+        "file",
+        nargs="?",
+        default="tasks.json",
+        help="File to write, defaults to tasks.json.",
+    )
+    serve_parser = commands.add_parser(
+        "serve", help="Share the task file with other users over local HTTP."
+    )
+    serve_parser.add_argument(
+        "--host", default="127.0.0.1", help="Address to listen on."
+    )
+    serve_parser.add_argument(
+        "--port", type=int, default=8000, help="Port to listen on."
+    )
+    search_parser = commands.add_parser(
+        "search", help="Print tasks matching the given options as they are found."
+    )
+    dates = search_parser.add_mutually_exclusive_group()
+    dates.add_argument("--date", metavar="DD/MM/YYYY", help="Exact date.")
+    dates.add_argument(
+        "--date-range",
+        nargs=2,
+        metavar=("START", "END"),
+        help="Start and end dates in DD/MM/YYYY format, inclusive.",
+    )
+    search_parser.add_argument(
+        "--time", metavar="MINUTES", help="Time spent, e.g. 30, 30-90 or 30+."
+    )
+    search_parser.add_argument(
+        "--text", help="Text the title or notes contain, ignoring case."
+    )
+    search_parser.add_argument(
+        "--regex", help="Regex the title or notes match, ignoring case."
+    )
+    search_parser.add_argument(
+        "--any",
+        action="store_true",
+        help="Print tasks matching any option instead of all of them.",
+    )
+    search_parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Print how the search would be run instead of its results.",
+    )
+    search_parser.add_argument(
+        "--format",
+        choices=["jsonl", "text"],
+        default="text",
+        help="Output tab separated text or one JSON task object per line.",
+    )
+    return parser.parse_args(argv)
+
+
+def open_repo(args):
+    """Create the repository selected by command line options.
+
+    Args:
+        args (:obj:`argparse.Namespace`): Parsed options.
+
+    Returns:
+        (:obj:`DataRepo`): Repository for task data, a RemoteRepo with --connect.
+        None: If the task file or database is invalid, or the server can't be reached.
     """
     json_file = "tasks.json"
+    db_file = "tasks.db"
+    shard_dir = "tasks"
+    if args.connect:
+        try:
+            data_repo = RemoteRepo(args.connect)
+            data_repo.status()
+        except (OSError, ValueError) as err:
+            print("Can't connect to work log server {}.".format(args.connect))
+            print("Error: {}".format(err))
+            return None
+        return data_repo
     try:
-        data_interface = DataRepo(json_file)
+        if args.store == "sqlite":
+            return SQLiteRepo(db_file, json_file=json_file)
+        if args.store == "sharded":
+            return ShardedRepo(shard_dir, json_file=json_file, trusted=args.trusted)
+        store = partial(STORES[args.store], fsync=not args.no_fsync)
+        if args.store == "json":
+            store = partial(store, commit_every=args.commit_every)
+        return DataRepo(
+            json_file,
+            store=store,
+            trusted=args.trusted,
+            snapshot=not args.no_snapshot,
+            write_behind=args.write_behind,
+        )
     except JSONDecodeError as err:
-        print("Invalid JSON file {} detected.".format(json_file))
-        print("JSON error: {}".format(err))
+        report_invalid_json(json_file, err)
+    except sqlite3.DatabaseError as err:
+        print("Invalid database file {} detected.".format(db_file))
+        print("Database error: {}".format(err))
+    return None
+
+
+def report_invalid_json(json_file, err):
+    """Report a task file that isn't valid JSON.
+
+    Args:
+        json_file (str): Path of the invalid file.
+        err (:obj:`JSONDecodeError`): Error raised reading it.
+    """
+    print("Invalid JSON file {} detected.".format(json_file))
+    print("JSON error: {}".format(err))
+
+
+def task_file(data_interface):
+    """Path of the file a local repository reads its tasks from.
+
+    Args:
+        data_interface (:obj:`DataRepo`): Repository from open_repo.
+
+    Returns:
+        (str): Store file, or shard directory for a ShardedRepo.
+        None: For a RemoteRepo, or a repository without a task file.
+    """
+    store = getattr(data_interface, "json_source", None)
+    if store is not None:
+        return store.source_file
+    return getattr(data_interface, "shard_dir", None)
+
+
+def make_controller(data_interface):
+    """Create the controller for a local or remote repository.
+
+    Args:
+        data_interface (:obj:`DataRepo`): Repository from open_repo.
+
+    Returns:
+        (:obj:`TaskController`): Controller, a RemoteTaskController for a server.
+    """
+    if isinstance(data_interface, RemoteRepo):
+        return RemoteTaskController(data_interface)
+    return TaskController(data_interface)
+
+
+def serve_tasks(data_interface, args):
+    """Serve the repository to other users until interrupted.
+
+    Args:
+        data_interface (:obj:`DataRepo`): Repository to share.
+        args (:obj:`argparse.Namespace`): Parsed options.
+    """
+    try:
+        server = TaskServer((args.host, args.port), data_interface)
+    except OSError as err:
+        print("Can't listen on {}:{}: {}".format(args.host, args.port, err))
         return
-    task_app = TaskController(data_interface)
-    task_app.start()
+    print(
+        "Serving work log on http://{}:{}, Ctrl-C to stop.".format(args.host, args.port)
+    )
+    server.serve_until_stopped()
+
+
+def import_tasks(data_interface, args):
+    """Bulk import tasks from a file, reporting rows that fail validation.
+
+    Args:
+        data_interface (:obj:`DataRepo`): Repository to import into.
+        args (:obj:`argparse.Namespace`): Parsed options.
+    """
+    try:
+        data_interface.get_records()
+        data_interface.wait_until_loaded()
+    except ValidationError as err:
+        print("Problem with source data: {}".format(err))
+        return
+    file_format = args.format or os.path.splitext(args.file)[1].lstrip(".").lower()
+    if file_format not in READERS:
+        print("Unknown import format {!r}, use --format.".format(file_format))
+        return
+    rows = READERS[file_format](args.file)
+    imported, errors = data_interface.import_records(rows, batch_size=args.batch_size)
+    for line_number, messages in sorted(errors.items()):
+        print("Line {}: {}".format(line_number, messages))
+    print(
+        "Imported {} tasks, skipped {} invalid rows.".format(len(imported), len(errors))
+    )
+    data_interface.flush()
+
+
+def export_tasks(data_interface, args):
+    """Write every task to a plain JSON task file, e.g. to leave the journal store.
+
+    Args:
+        data_interface (:obj:`DataRepo`): Repository to export.
+        args (:obj:`argparse.Namespace`): Parsed options.
+    """
+    try:
+        data_interface.get_records()
+        data_interface.wait_until_loaded()
+        exported = data_interface.export(args.file)
+    except ValidationError as err:
+        print("Problem with source data: {}".format(err))
+        return
+    print("Exported {} tasks to {}.".format(exported, args.file))
+
+
+def search_tasks(data_interface, args):
+    """Stream tasks matching search options to stdout in date order.
+
+    Args:
+        data_interface (:obj:`DataRepo`): Repository to search.
+        args (:obj:`argparse.Namespace`): Parsed options.
+    """
+    task_app = make_controller(data_interface)
+    conditions = []
+    date_range = args.date_range or (args.date and (args.date, args.date))
+    if date_range:
+        date_range = task_app.parse_date_range(*date_range)
+        if not date_range:
+            exit(1)
+        conditions.append(queries.DateRange(*date_range))
+    if args.time:
+        time_range = task_app.parse_time_range(*views.split_time_range(args.time))
+        if not time_range:
+            exit(1)
+        conditions.append(queries.TimeSpent(*time_range))
+    if args.text:
+        conditions.append(queries.TextContains(args.text))
+    if args.regex:
+        pattern = task_app.parse_pattern(args.regex)
+        if not pattern:
+            exit(1)
+        conditions.append(queries.RegexMatch(pattern))
+    if args.any and conditions:
+        condition = queries.Or(*conditions)
+    else:
+        condition = queries.And(*conditions)
+    if args.explain:
+        task_app.wait_for_records()
+        print("\n".join(task_app.plan_query(condition).explain()))
+        return
+    if args.format == "jsonl":
+
+        def format_task(task):
+            return json.dumps(data_interface.fast_loader.dump(task))
+
+    else:
+        format_task = "{0.date:%d/%m/%Y}\t{0.time_spent}\t{0.title}\t{0.notes}".format
+    try:
+        for task in task_app.stream_search(condition):
+            sys.stdout.write(format_task(task) + "\n")
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # Reader stopped early, e.g. piped into head. Point stdout at devnull so
+        # the interpreter's final flush doesn't fail too.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except OSError as err:
+        # With --connect, pages are read from the server as they're printed.
+        print("Lost connection to the work log server: {}".format(err), file=sys.stderr)
+        exit(1)
+
+
+def main(argv=None):
+    """App initialisation.
+    """
+    args = parse_args(argv)
+    if args.command in ("import", "export", "serve") and args.connect:
+        print("Run {} where the task file is, not with --connect.".format(args.command))
+        return
+    data_interface = open_repo(args)
+    if not data_interface:
+        return
+    try:
+        if args.command == "import":
+            import_tasks(data_interface, args)
+            return
+        if args.command == "export":
+            export_tasks(data_interface, args)
+            return
+        if args.command == "serve":
+            serve_tasks(data_interface, args)
+            return
+        if args.command == "search":
+            search_tasks(data_interface, args)
+            return
+        task_app = make_controller(data_interface)
+        task_app.start()
+    except JSONDecodeError as err:
+        # Tasks load lazily, so an invalid file is found by the command or
+        # session reading it rather than by open_repo.
+        json_file = task_file(data_interface)
+        if json_file is None:
+            raise
+        report_invalid_json(json_file, err)
 
 
 if __name__ == "__main__":